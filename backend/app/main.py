@@ -1,9 +1,19 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+from backend.db.connection import db
+from backend.db.query_stats import query_stats
 
-app = FastAPI(title="P&A System API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Al apagar se cierra el pool async de MySQL
+    await db.close()
+
+app = FastAPI(title="P&A System API", version="1.0.0", lifespan=lifespan)
 
 # --- Temporal Client Setup (Mock for now, will connect to Server) ---
 # from temporalio.client import Client
@@ -25,6 +35,19 @@ class DailyReport(BaseModel):
 async def health_check():
     return {"status": "ok", "service": "backend-api"}
 
+@app.get("/admin/db/query-stats")
+async def get_query_stats():
+    """
+    Estadísticas de consultas del proceso: p50/p95/p99 por sentencia normalizada
+    y últimas consultas lentas (umbral DB_SLOW_QUERY_MS).
+    """
+    return {"queries": query_stats.snapshot(), "slow": query_stats.slow_queries()}
+
+@app.get("/admin/db/pool")
+async def get_pool_metrics():
+    """Tamaño y saturación del pool async (MYSQL_POOL_MIN / MYSQL_POOL_MAX)."""
+    return db.metrics()
+
 @app.post("/signals/generic")
 async def send_signal(signal: ProjectSignal):
     """
@@ -1,54 +1,184 @@
 """Database connection management"""
+import asyncio
 import os
+import time
 import aiomysql
+from contextlib import asynccontextmanager
 from typing import Optional
+from .query_stats import query_stats
 
 
 class Database:
     """Database connection manager"""
-    
-    def __init__(self):
+
+    def __init__(self, minsize: Optional[int] = None, maxsize: Optional[int] = None):
         self.pool: Optional[aiomysql.Pool] = None
-    
+        # Pool sizing (env MYSQL_POOL_MIN / MYSQL_POOL_MAX) and recycle of stale connections
+        self.minsize = minsize if minsize is not None else int(os.getenv("MYSQL_POOL_MIN", 1))
+        self.maxsize = maxsize if maxsize is not None else int(os.getenv("MYSQL_POOL_MAX", 10))
+        self.pool_recycle = int(os.getenv("MYSQL_POOL_RECYCLE", 3600))
+        self._connect_lock = asyncio.Lock()
+        # Saturation metrics
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._acquires = 0
+        self._waits = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+
     async def connect(self):
         """Create database connection pool"""
-        self.pool = await aiomysql.create_pool(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "pna_user"),
-            password=os.getenv("MYSQL_PASSWORD", "pna_pass"),
-            db=os.getenv("MYSQL_DATABASE", "pna_system"),
-            autocommit=True,
-            minsize=1,
-            maxsize=10
-        )
-    
+        async with self._connect_lock:
+            if self.pool:
+                return
+            self.pool = await aiomysql.create_pool(
+                host=os.getenv("MYSQL_HOST", "localhost"),
+                port=int(os.getenv("MYSQL_PORT", 3306)),
+                user=os.getenv("MYSQL_USER", "pna_user"),
+                password=os.getenv("MYSQL_PASSWORD", "pna_pass"),
+                db=os.getenv("MYSQL_DATABASE", "pna_system"),
+                autocommit=True,
+                minsize=self.minsize,
+                maxsize=self.maxsize,
+                pool_recycle=self.pool_recycle
+            )
+
     async def close(self):
         """Close database connection pool"""
         if self.pool:
             self.pool.close()
             await self.pool.wait_closed()
-    
+            self.pool = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Acquire a pooled connection, recording wait time and pool saturation"""
+        if not self.pool:
+            await self.connect()
+        saturated = self.pool.freesize == 0 and self.pool.size >= self.maxsize
+        start = time.perf_counter()
+        conn = await self.pool.acquire()
+        waited_ms = (time.perf_counter() - start) * 1000.0
+        self._acquires += 1
+        if saturated:
+            self._waits += 1
+        self._wait_ms_total += waited_ms
+        self._wait_ms_max = max(self._wait_ms_max, waited_ms)
+        self._in_use += 1
+        self._peak_in_use = max(self._peak_in_use, self._in_use)
+        try:
+            yield conn
+        finally:
+            self._in_use -= 1
+            self.pool.release(conn)
+
     async def execute(self, query: str, params=None):
-        """Execute a query"""
-        async with self.pool.acquire() as conn:
+        """
+        Execute a statement and return its (closed) cursor, as before:
+        rowcount and lastrowid stay readable after the connection is released
+        """
+        async with self.acquire() as conn:
             async with conn.cursor() as cur:
-                await cur.execute(query, params or ())
+                with query_stats.track(query) as timer:
+                    await cur.execute(query, params or ())
+                    timer.rows = cur.rowcount
                 return cur
-    
+
+    async def executemany(self, query: str, params_seq) -> int:
+        """Execute a statement for every parameter set in one transaction (multi-row INSERT)"""
+        params_seq = list(params_seq)
+        if not params_seq:
+            return 0
+        async with self.transaction() as cur:
+            with query_stats.track(query) as timer:
+                await cur.executemany(query, params_seq)
+                timer.rows = cur.rowcount
+            return cur.rowcount
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Transactional batch on a single connection: yields a DictCursor,
+        commits on exit and rolls back if the block raises.
+        """
+        async with self.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    yield cur
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+
     async def fetch_one(self, query: str, params=None):
         """Fetch one row"""
-        async with self.pool.acquire() as conn:
+        async with self.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(query, params or ())
-                return await cur.fetchone()
-    
+                with query_stats.track(query) as timer:
+                    await cur.execute(query, params or ())
+                    row = await cur.fetchone()
+                    timer.rows = 1 if row else 0
+                return row
+
     async def fetch_all(self, query: str, params=None):
         """Fetch all rows"""
-        async with self.pool.acquire() as conn:
+        async with self.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(query, params or ())
-                return await cur.fetchall()
+                with query_stats.track(query) as timer:
+                    await cur.execute(query, params or ())
+                    rows = await cur.fetchall()
+                    timer.rows = len(rows)
+                return rows
+
+    async def iterate(self, query: str, params=None, chunk_size: int = 1000):
+        """
+        Async iteration over an unbuffered SSDictCursor: rows are read chunk_size
+        at a time and never materialized. If the consumer stops early, the
+        connection still has unread packets and is closed instead of reused.
+        """
+        async with self.acquire() as conn:
+            completed = False
+            # No "async with": closing an unbuffered cursor drains the pending rows
+            cur = await conn.cursor(aiomysql.SSDictCursor)
+            try:
+                with query_stats.track(query) as timer:
+                    timer.rows = 0
+                    await cur.execute(query, params or ())
+                    while True:
+                        rows = await cur.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        timer.rows += len(rows)
+                        timer.pause()
+                        for row in rows:
+                            yield row
+                        timer.resume()
+                completed = True
+            finally:
+                if completed:
+                    await cur.close()
+                else:
+                    # Abandoned mid-result: the pool drops closed connections on release
+                    conn.close()
+
+    def metrics(self) -> dict:
+        """Pool size and saturation metrics"""
+        size = self.pool.size if self.pool else 0
+        free = self.pool.freesize if self.pool else 0
+        return {
+            "minsize": self.minsize,
+            "maxsize": self.maxsize,
+            "size": size,
+            "free": free,
+            "in_use": self._in_use,
+            "peak_in_use": self._peak_in_use,
+            "saturation": round(self._in_use / self.maxsize, 2) if self.maxsize else 0.0,
+            "acquires": self._acquires,
+            "waits": self._waits,
+            "avg_wait_ms": round(self._wait_ms_total / self._acquires, 2) if self._acquires else 0.0,
+            "max_wait_ms": round(self._wait_ms_max, 2),
+        }
 
 
 # Global database instance
@@ -0,0 +1,14 @@
+-- Migration: 010_audit_checkpoints.sql
+-- Goal: Incremental verification of the audit hash chain
+-- Principles: Signed checkpoints, verify only events added since the last one
+
+CREATE TABLE IF NOT EXISTS audit_checkpoints (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    id_evento INT NOT NULL,              -- Last verified audit_events.id
+    hash_evento VARCHAR(64) NOT NULL,    -- Chain hash at that event
+    firma VARCHAR(64) NOT NULL,          -- HMAC-SHA256(id_evento:hash_evento)
+    modo VARCHAR(20) NOT NULL,           -- FULL, INCREMENTAL
+    eventos_verificados INT NOT NULL DEFAULT 0,
+    timestamp_utc TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_evento (id_evento)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,7 @@
+-- Migration: 011_audit_query_indexes.sql
+-- Goal: Indexed, paginated audit queries (filters pushed down to MySQL)
+-- Notes: InnoDB secondary indexes carry the PK, so ORDER BY id DESC
+--        with an equality filter is resolved from the index itself.
+
+CREATE INDEX idx_usuario ON audit_events (id_usuario);
+CREATE INDEX idx_timestamp ON audit_events (timestamp_utc);
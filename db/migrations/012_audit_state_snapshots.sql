@@ -0,0 +1,14 @@
+-- Migration: 012_audit_state_snapshots.sql
+-- Goal: Point-in-time reconstruction of entity state from the audit log
+-- Principles: Periodic materialized snapshots + short replay of later DATA_CHANGE deltas
+
+CREATE TABLE IF NOT EXISTS audit_state_snapshots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    entidad VARCHAR(50) NOT NULL,
+    entidad_id VARCHAR(50) NOT NULL,
+    id_evento INT NOT NULL,              -- audit_events.id after which the state was taken
+    timestamp_utc TIMESTAMP NOT NULL,    -- Timestamp of that event
+    estado JSON NOT NULL,                -- Full materialized state
+    UNIQUE KEY uq_entidad_evento (entidad, entidad_id, id_evento),
+    INDEX idx_entidad_tiempo (entidad, entidad_id, timestamp_utc)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
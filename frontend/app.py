@@ -98,6 +98,10 @@ def main_router():
         from views import admin_master_data
         admin_master_data.render_view()
         
+    elif page == 'Rendimiento BD':
+        from views import admin_db_stats
+        admin_db_stats.render_view()
+
     elif page == 'Auditoría':
         from views import global_audit
         global_audit.render_view()
@@ -58,7 +58,10 @@ def render_sidebar():
                     st.warning(f"{sync_count} cambios pendientes de sincronización")
                     if st.button("Sincronizar Ahora", use_container_width=True, type="primary"):
                         with st.spinner("Sincronizando..."):
-                            success, msg = api.synchronize()
+                            success, msg = api.synchronize(
+                                user_id=st.session_state.get('username', 'system'),
+                                user_role=role or 'system'
+                            )
                             if success: st.success(msg)
                             else: st.error(msg)
                             st.rerun()
@@ -168,3 +171,6 @@ def render_menu_native(role, current_page):
         if st.button("Datos Maestros Financieros", use_container_width=True, type="primary" if current_page == 'Datos Maestros Financieros' else "secondary"):
             st.session_state['current_page'] = 'Datos Maestros Financieros'
             st.rerun()
+        if st.button("Rendimiento BD", use_container_width=True, type="primary" if current_page == 'Rendimiento BD' else "secondary"):
+            st.session_state['current_page'] = 'Rendimiento BD'
+            st.rerun()
@@ -321,7 +321,7 @@ class AIService:
                 # --- AUDITORÍA RECIENTE (TIMELINE) ---
                 audit_svc = _get_audit_service()
                 if audit_svc:
-                    events = audit_svc.get_all_events()[:5] # Últimos 5
+                    events = audit_svc.query_events(limit=5)['events'] # Últimos 5
                     if events:
                         lines.append("\n## ÚLTIMA ACTIVIDAD DEL SISTEMA (Auditoría):")
                         for ev in events:
@@ -1,15 +1,22 @@
-import json, os
+import os
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Any
 
+from .local_store import LocalDocument
+
 class AsignacionOperativaService:
     
     # @deprecated - Ahora se obtiene dinámicamente desde financial_service
     # VALORES_CONTRACTUALES = {'X-123': 185000.00, 'A-321': 185000.00, 'Z-789': 185000.00, 'M-555': 185000.00, 'P-001': 195000.00}
     
+    # Colección del store local: (clave primaria, columnas indexadas); config se guarda entera
+    LOCAL_NAMESPACE = "asignacion_operativa"
+    LOCAL_SCHEMA = {"asignaciones": ("id_asignacion", ["id_expediente", "fecha_operativa", "id_recurso"])}
+
     def __init__(self):
         self.mock_data_path = os.path.join(os.path.dirname(__file__), "asignacion_operativa_mock_data.json")
         self._mock_data = None
+        self._doc = None
         self._financial_service = None
     
     def _get_financial_service(self):
@@ -24,16 +31,17 @@ class AsignacionOperativaService:
 
     def _load_mock_data(self):
         if self._mock_data is None:
-            if os.path.exists(self.mock_data_path):
-                with open(self.mock_data_path, "r", encoding="utf-8") as f:
-                    self._mock_data = json.load(f)
-            else:
-                self._mock_data = {"asignaciones": [], "config": {"ultimo_id": 0, "version": "1.0"}}
+            self._mock_data = self._local_doc().load(defaults={"config": {"ultimo_id": 0, "version": "1.0"}})
         return self._mock_data
 
+    def _local_doc(self):
+        # Store local SQLite; el JSON de mock_data_path sólo se importa como semilla
+        if self._doc is None:
+            self._doc = LocalDocument(self.LOCAL_NAMESPACE, self.LOCAL_SCHEMA, seed_path=self.mock_data_path)
+        return self._doc
+
     def _save_mock_data(self):
-        with open(self.mock_data_path, "w", encoding="utf-8") as f:
-            json.dump(self._mock_data, f, indent=4, default=str, ensure_ascii=False)
+        self._local_doc().save(self._mock_data)
 
     def create_asignacion(self, data: Dict) -> Dict:
         data = data.copy()
@@ -55,6 +63,7 @@ class AsignacionOperativaService:
         data['id_asignacion'] = mock['config']['ultimo_id'] + 1
         data['ts_registro'] = datetime.now().isoformat()
         mock['asignaciones'].append(data)
+        self._local_doc().mark('asignaciones', data)
         mock['config']['ultimo_id'] = data['id_asignacion']
         self._save_mock_data()
         
@@ -68,8 +77,10 @@ class AsignacionOperativaService:
         return False
 
     def get_asignaciones_por_expediente(self, id_expediente: str) -> List[Dict]:
-        mock = self._load_mock_data()
-        asignaciones = [a for a in mock['asignaciones'] if a['id_expediente'] == id_expediente]
+        if self._mock_data is None:
+            asignaciones = self._local_doc().find("asignaciones", id_expediente=id_expediente)
+        else:
+            asignaciones = [a for a in self._mock_data['asignaciones'] if a['id_expediente'] == id_expediente]
         return sorted(asignaciones, key=lambda x: x['fecha_operativa'])
 
     def get_resumen_costos_por_expediente(self, id_expediente: str) -> Dict:
@@ -0,0 +1,71 @@
+import hashlib
+import json
+
+DELTA_FORMAT = "delta-v1"
+
+
+class DeltaMismatchError(ValueError):
+    """El estado sobre el que se aplica un delta (o el resultado) no coincide con sus digests."""
+
+
+def canonical_json(value):
+    """Serialización canónica (claves ordenadas, sin espacios) usada para digests de estado."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def state_digest(state):
+    """SHA256 de la forma canónica de un estado completo (None para estado inexistente)."""
+    if state is None:
+        return None
+    return hashlib.sha256(canonical_json(state).encode('utf-8')).hexdigest()
+
+
+def is_delta(payload):
+    return isinstance(payload, dict) and payload.get("formato") == DELTA_FORMAT
+
+
+def encode_delta(prev_state, new_state, include_base=False):
+    """
+    Diff estructurado (a nivel de clave) entre dos estados completos.
+    set: claves nuevas o modificadas con su valor nuevo; unset: claves eliminadas.
+    base_digest/state_digest permiten comprobar que la reconstrucción es exacta.
+    include_base agrega el estado previo completo (keyframe) cuando la historia
+    auditada no alcanza para reconstruirlo.
+    """
+    prev_state = prev_state or {}
+    new_state = new_state or {}
+    changed = {
+        k: v for k, v in new_state.items()
+        if k not in prev_state or canonical_json(prev_state[k]) != canonical_json(v)
+    }
+    delta = {
+        "formato": DELTA_FORMAT,
+        "set": changed,
+        "unset": sorted(k for k in prev_state if k not in new_state),
+        "base_digest": state_digest(prev_state) if prev_state else None,
+        "state_digest": state_digest(new_state),
+    }
+    if include_base and prev_state:
+        delta["base"] = prev_state
+    return delta
+
+
+def apply_delta(state, delta, verify=True):
+    """
+    Aplica un delta sobre el estado previo y retorna el nuevo estado completo.
+    Con verify=True comprueba base_digest contra el estado previo (salvo que el
+    delta traiga su base) y state_digest contra el resultado; un evento faltante
+    o aplicado fuera de orden levanta DeltaMismatchError.
+    """
+    if "base" in delta:
+        new_state = dict(delta["base"])
+    else:
+        if verify and (state_digest(state) if state else None) != delta.get("base_digest"):
+            raise DeltaMismatchError("El estado previo no coincide con el base_digest del delta")
+        new_state = dict(state or {})
+    for key in delta.get("unset", []):
+        new_state.pop(key, None)
+    new_state.update(delta.get("set", {}))
+    if verify and state_digest(new_state) != delta.get("state_digest"):
+        raise DeltaMismatchError("El estado reconstruido no coincide con el state_digest del delta")
+    return new_state
@@ -0,0 +1,272 @@
+import heapq
+import json
+import os
+import re
+import struct
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+
+class AuditIndex:
+    """
+    Índices secundarios en memoria sobre el log de auditoría mock.
+    Cada evento ocupa una posición en arreglos paralelos (id, timestamp,
+    ubicación física, atributos filtrables) y las listas de posiciones por
+    valor permiten resolver una página sin recorrer el log completo.
+    Los filtros por prefijo usan la lista ordenada de valores del campo (bisect)
+    y unen las listas de posiciones de los valores que empiezan con el prefijo.
+    El log es cronológico, por lo que id y timestamp crecen juntos.
+    """
+
+    FIELDS = ("tipo_evento", "id_usuario", "entidad", "entidad_id")
+
+    def __init__(self):
+        self.ids = []
+        self.timestamps = []
+        self.locations = []
+        self.attrs = []
+        self.postings = {field: {} for field in self.FIELDS}
+        # Valores distintos ordenados por campo; se rearma cuando aparece uno nuevo
+        self._sorted_values = {}
+
+    @staticmethod
+    def _norm(value):
+        # Igual que la collation utf8mb4 de MySQL: comparación case-insensitive
+        return str(value).strip().lower() if value is not None else None
+
+    @staticmethod
+    def _ts_key(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+
+    def add(self, event, location):
+        pos = len(self.ids)
+        self.ids.append(event['id'])
+        self.timestamps.append(self._ts_key(event.get('timestamp_utc')))
+        self.locations.append(location)
+        attrs = tuple(self._norm(event.get(field)) for field in self.FIELDS)
+        self.attrs.append(attrs)
+        for field, value in zip(self.FIELDS, attrs):
+            plist = self.postings[field].get(value)
+            if plist is None:
+                plist = self.postings[field][value] = []
+                self._sorted_values.pop(field, None)
+            plist.append(pos)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _prefix_postings(self, field, prefix):
+        """Posiciones (ascendentes) de los eventos cuyo valor del campo empieza con prefix."""
+        values = self._sorted_values.get(field)
+        if values is None:
+            values = self._sorted_values[field] = sorted(v for v in self.postings[field] if v is not None)
+        lists = []
+        for value in values[bisect_left(values, prefix):]:
+            if not value.startswith(prefix):
+                break
+            lists.append(self.postings[field][value])
+        if len(lists) == 1:
+            return lists[0]
+        return list(heapq.merge(*lists))
+
+    def query(self, filters=None, since=None, until=None, before_id=None, limit=20, prefix_fields=()):
+        """
+        Retorna (ubicaciones, next_cursor) de los eventos más recientes que cumplen
+        los filtros, en orden descendente de id. before_id es el cursor de página.
+        Los campos de prefix_fields se comparan por prefijo; el resto, por igualdad.
+        """
+        filters = {f: self._norm(v) for f, v in (filters or {}).items() if v not in (None, "")}
+
+        hi = len(self.ids)
+        if before_id is not None:
+            hi = bisect_left(self.ids, before_id)
+        if until is not None:
+            hi = min(hi, bisect_right(self.timestamps, self._ts_key(until)))
+        lo = bisect_left(self.timestamps, self._ts_key(since)) if since is not None else 0
+
+        if filters:
+            # Se recorre la lista de posiciones más corta y se validan los demás filtros
+            lists = []
+            for field, value in filters.items():
+                if field in prefix_fields:
+                    plist = self._prefix_postings(field, value)
+                else:
+                    plist = self.postings[field].get(value)
+                if not plist:
+                    return [], None
+                lists.append((len(plist), field, plist))
+            _, driver_field, plist = min(lists, key=lambda x: x[0])
+            checks = [(self.FIELDS.index(f), v, f in prefix_fields)
+                      for f, v in filters.items() if f != driver_field]
+            candidates = (plist[k] for k in range(bisect_left(plist, hi) - 1, -1, -1))
+        else:
+            checks = []
+            candidates = iter(range(hi - 1, -1, -1))
+
+        matched = []
+        for pos in candidates:
+            if pos < lo:
+                break
+            attrs = self.attrs[pos]
+            if all(attrs[i] == v or (prefix and attrs[i] is not None and attrs[i].startswith(v))
+                   for i, v, prefix in checks):
+                matched.append(pos)
+                if len(matched) > limit:
+                    break
+
+        next_cursor = None
+        if len(matched) > limit:
+            matched = matched[:limit]
+            next_cursor = self.ids[matched[-1]]
+        return [self.locations[pos] for pos in matched], next_cursor
+
+
+class WellTimelineIndex:
+    """
+    Línea de tiempo materializada por pozo sobre el log de auditoría mock.
+    Un archivo por pozo con registros de ancho fijo (id_evento, offset) en orden
+    ascendente: la página más reciente se lee desde el final del archivo y el
+    cursor se resuelve por búsqueda binaria, sin tocar el log global.
+    """
+
+    RECORD = struct.Struct(">QQ")
+    WATERMARK_FILE = "_watermark"
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._last_ids = {}
+
+    def _path(self, entity_id):
+        # Case-insensitive, igual que la collation de MySQL y que AuditIndex
+        name = re.sub(r"[^a-z0-9_.-]", "_", str(entity_id).strip().lower())
+        return os.path.join(self.base_dir, f"{name}.tl")
+
+    def _count(self, path):
+        return os.path.getsize(path) // self.RECORD.size if os.path.exists(path) else 0
+
+    def _read_record(self, fh, pos):
+        fh.seek(pos * self.RECORD.size)
+        return self.RECORD.unpack(fh.read(self.RECORD.size))
+
+    def last_id(self, entity_id):
+        path = self._path(entity_id)
+        if path not in self._last_ids:
+            count = self._count(path)
+            if count:
+                with open(path, 'rb') as fh:
+                    self._last_ids[path] = self._read_record(fh, count - 1)[0]
+            else:
+                self._last_ids[path] = 0
+        return self._last_ids[path]
+
+    def add(self, event, offset):
+        """Agrega un evento de POZO a su línea de tiempo (idempotente ante re-indexado)."""
+        if event.get('entidad') != 'POZO' or not event.get('entidad_id'):
+            return
+        if event['id'] <= self.last_id(event['entidad_id']):
+            return
+        path = self._path(event['entidad_id'])
+        with open(path, 'ab') as fh:
+            fh.write(self.RECORD.pack(event['id'], offset))
+        self._last_ids[path] = event['id']
+
+    def watermark(self):
+        path = os.path.join(self.base_dir, self.WATERMARK_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        return 0
+
+    def save_watermark(self, event_id):
+        path = os.path.join(self.base_dir, self.WATERMARK_FILE)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(str(event_id))
+        os.replace(path + ".tmp", path)
+
+    def page(self, entity_id, before_id=None, limit=None):
+        """
+        Retorna ([(id_evento, offset), ...], next_cursor) en orden descendente.
+        limit=None devuelve la línea de tiempo completa del pozo.
+        """
+        path = self._path(entity_id)
+        count = self._count(path)
+        if not count:
+            return [], None
+        with open(path, 'rb') as fh:
+            hi = count
+            if before_id is not None:
+                lo, hi = 0, count
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if self._read_record(fh, mid)[0] < before_id:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+            start = 0 if limit is None else max(0, hi - limit)
+            fh.seek(start * self.RECORD.size)
+            data = fh.read((hi - start) * self.RECORD.size)
+        records = [self.RECORD.unpack_from(data, i * self.RECORD.size)
+                   for i in range(hi - start)]
+        records.reverse()
+        next_cursor = records[-1][0] if records and start > 0 else None
+        return records, next_cursor
+
+
+class StateSnapshotIndex:
+    """
+    Snapshots materializados del estado completo de cada entidad (modo mock).
+    Un archivo JSONL por entidad con registros {id_evento, timestamp_utc, estado}
+    en orden ascendente; en memoria sólo se guarda (timestamp, id, offset) para
+    ubicar por búsqueda binaria el último snapshot anterior a una fecha.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._entries = {}
+
+    def _path(self, entity, entity_id):
+        name = re.sub(r"[^a-z0-9_.-]", "_", f"{entity}__{entity_id}".strip().lower())
+        return os.path.join(self.base_dir, f"{name}.jsonl")
+
+    def _load(self, path):
+        if path not in self._entries:
+            entries = []
+            if os.path.exists(path):
+                offset = 0
+                with open(path, 'rb') as f:
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        record = json.loads(line)
+                        entries.append((record['timestamp_utc'], record['id_evento'], offset))
+                        offset += len(line)
+            self._entries[path] = entries
+        return self._entries[path]
+
+    def latest(self, entity, entity_id, at=None):
+        """Último snapshot con timestamp <= at ({id_evento, timestamp_utc, estado}) o None."""
+        path = self._path(entity, entity_id)
+        entries = self._load(path)
+        pos = len(entries) if at is None else bisect_right(entries, (AuditIndex._ts_key(at), float("inf")))
+        if pos == 0:
+            return None
+        with open(path, 'rb') as f:
+            f.seek(entries[pos - 1][2])
+            return json.loads(f.readline())
+
+    def add(self, entity, entity_id, event_id, timestamp, state):
+        """Agrega un snapshot posterior al último guardado (idempotente ante re-materialización)."""
+        path = self._path(entity, entity_id)
+        entries = self._load(path)
+        if entries and event_id <= entries[-1][1]:
+            return
+        ts = AuditIndex._ts_key(timestamp)
+        line = (json.dumps({"id_evento": event_id, "timestamp_utc": ts, "estado": state}, default=str) + "\n").encode('utf-8')
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(line)
+        entries.append((ts, event_id, offset))
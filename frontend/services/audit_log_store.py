@@ -0,0 +1,346 @@
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from .audit_index import AuditIndex, StateSnapshotIndex, WellTimelineIndex
+
+GENESIS_HASH = "0" * 64
+
+
+class AuditLogStore:
+    """
+    Log de auditoría append-only, segmentado y delimitado por líneas (JSONL).
+    Reemplaza la reescritura completa de audit_events.json en modo mock:
+    cada evento se agrega al final del segmento activo y el fsync se agrupa
+    por lotes (fsync_every eventos o, a lo sumo, fsync_interval segundos después
+    del último append). Mantiene en memoria el puntero a la cola (último id y hash).
+
+    legacy_path (audit_events.json) se importa sólo si el directorio no tiene
+    segmentos: regenerarlo después no cambia el log. generate_audit_mock.py borra
+    el directorio del log para que el próximo inicio lo vuelva a importar.
+    """
+
+    SEGMENT_PREFIX = "segment_"
+    SEGMENT_SUFFIX = ".jsonl"
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, base_dir, legacy_path=None, **kwargs):
+        """Retorna la instancia única del proceso para el directorio dado."""
+        key = os.path.abspath(base_dir)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls(base_dir, legacy_path=legacy_path, **kwargs)
+                cls._instances[key] = store
+            return store
+
+    def __init__(self, base_dir, legacy_path=None, max_segment_bytes=8 * 1024 * 1024,
+                 fsync_every=64, fsync_interval=1.0):
+        self.base_dir = base_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.RLock()
+
+        self._fh = None
+        self._index = None
+        self._watermark = 0
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+        self._sync_timer = None
+        self.last_id = 0
+        self.last_hash = GENESIS_HASH
+
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.timelines = WellTimelineIndex(os.path.join(self.base_dir, "wells"))
+        self.snapshots = StateSnapshotIndex(os.path.join(self.base_dir, "snapshots"))
+        self._segments = self._scan_segments()
+        if not self._segments and legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+        self._load_tail()
+        self._catch_up_timelines()
+        atexit.register(self.close)
+
+    # ─── Segmentos ──────────────────────────────────────────────
+
+    def _segment_path(self, first_id):
+        return os.path.join(self.base_dir, f"{self.SEGMENT_PREFIX}{first_id:012d}{self.SEGMENT_SUFFIX}")
+
+    def _scan_segments(self):
+        segments = []
+        for name in os.listdir(self.base_dir):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                first_id = int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)])
+                segments.append((first_id, os.path.join(self.base_dir, name)))
+        return sorted(segments)
+
+    def segments(self):
+        """Lista de (primer_id, path) de cada segmento, en orden."""
+        with self.lock:
+            return list(self._segments)
+
+    def _import_legacy(self, legacy_path):
+        """Migra una única vez el audit_events.json histórico al formato segmentado."""
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            events = json.load(f)
+        if events:
+            self.append_many(events, sync=True)
+            self._close_handle()
+            self._segments = self._scan_segments()
+
+    def _load_tail(self):
+        """Recupera último id y hash leyendo sólo el final del segmento activo."""
+        if not self._segments:
+            return
+        path = self._segments[-1][1]
+        self._truncate_partial_line(path)
+        line = self._read_last_line(path)
+        if line:
+            event = json.loads(line)
+            self.last_id = event['id']
+            self.last_hash = event['hash_evento']
+        elif len(self._segments) > 1:
+            # Segmento activo vacío (rotación interrumpida): usar el anterior
+            line = self._read_last_line(self._segments[-2][1])
+            if line:
+                event = json.loads(line)
+                self.last_id = event['id']
+                self.last_hash = event['hash_evento']
+
+    @staticmethod
+    def _truncate_partial_line(path):
+        """Descarta una última línea incompleta (escritura interrumpida por un corte)."""
+        size = os.path.getsize(path)
+        if size == 0:
+            return
+        with open(path, 'rb+') as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = size
+            block = 4096
+            while pos > 0:
+                step = min(block, pos)
+                pos -= step
+                f.seek(pos)
+                idx = f.read(step).rfind(b"\n")
+                if idx != -1:
+                    f.truncate(pos + idx + 1)
+                    return
+            f.truncate(0)
+
+    @staticmethod
+    def _read_last_line(path):
+        size = os.path.getsize(path)
+        if size == 0:
+            return None
+        with open(path, 'rb') as f:
+            block = 4096
+            pos = size
+            buf = b""
+            while pos > 0:
+                step = min(block, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+                stripped = buf.rstrip(b"\n")
+                idx = stripped.rfind(b"\n")
+                if idx != -1:
+                    return stripped[idx + 1:].decode('utf-8')
+            return buf.rstrip(b"\n").decode('utf-8') or None
+
+    # ─── Escritura ──────────────────────────────────────────────
+
+    def _active_handle(self, next_id):
+        if self._fh is None:
+            if not self._segments:
+                self._segments.append((next_id, self._segment_path(next_id)))
+            self._fh = open(self._segments[-1][1], 'ab')
+        elif self._fh.tell() >= self.max_segment_bytes:
+            self._rotate(next_id)
+        return self._fh
+
+    def _rotate(self, next_id):
+        self._close_handle()
+        self._segments.append((next_id, self._segment_path(next_id)))
+        self._fh = open(self._segments[-1][1], 'ab')
+
+    def _close_handle(self):
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            self._fh = None
+            self._pending_sync = 0
+            self._last_sync = time.monotonic()
+
+    def append(self, event, sync=False):
+        """Agrega un evento ya encadenado al final del log."""
+        return self.append_many([event], sync=sync)
+
+    def append_many(self, events, sync=False):
+        """Agrega varios eventos con un único flush; el fsync se agrupa por lotes."""
+        with self.lock:
+            count = 0
+            for event in events:
+                fh = self._active_handle(event['id'])
+                offset = fh.tell()
+                fh.write((json.dumps(event, default=str) + "\n").encode('utf-8'))
+                if self._index is not None:
+                    self._index.add(event, (self._segments[-1][1], offset))
+                self.timelines.add(event, offset)
+                self.last_id = event['id']
+                self.last_hash = event['hash_evento']
+                count += 1
+            if count == 0:
+                return 0
+            self._fh.flush()
+            self._pending_sync += count
+            if sync or self._pending_sync >= self.fsync_every or \
+                    time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+            elif self._sync_timer is None:
+                # Sin más appends el último lote igual llega a disco en fsync_interval
+                self._sync_timer = threading.Timer(self.fsync_interval, self._timed_sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+            return count
+
+    def sync(self):
+        """Fuerza a disco los eventos pendientes de fsync."""
+        with self.lock:
+            if self._fh is not None and self._pending_sync:
+                os.fsync(self._fh.fileno())
+                self._save_watermark()
+            self._pending_sync = 0
+            self._last_sync = time.monotonic()
+
+    def _timed_sync(self):
+        with self.lock:
+            self._sync_timer = None
+            self.sync()
+
+    def close(self):
+        with self.lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            self._close_handle()
+            self._save_watermark()
+
+    def _save_watermark(self):
+        if self.last_id != self._watermark:
+            self.timelines.save_watermark(self.last_id)
+            self._watermark = self.last_id
+
+    # ─── Índices ────────────────────────────────────────────────
+
+    def _segment_for(self, event_id):
+        idx = bisect_right([first_id for first_id, _ in self._segments], event_id) - 1
+        return self._segments[max(idx, 0)][1]
+
+    def _catch_up_timelines(self):
+        """Indexa en las líneas de tiempo los eventos posteriores a la última marca persistida."""
+        self._watermark = self.timelines.watermark()
+        start_id = self._watermark + 1
+        if start_id > self.last_id:
+            return
+        for idx, (first_id, path) in enumerate(self._segments):
+            if idx + 1 < len(self._segments) and self._segments[idx + 1][0] <= start_id:
+                continue
+            for offset, event in self._scan_with_offsets(path):
+                if event['id'] >= start_id:
+                    self.timelines.add(event, offset)
+        self._save_watermark()
+
+    def well_events(self, entity_id, before_id=None, limit=None):
+        """Página de la línea de tiempo de un pozo: (eventos desc, next_cursor)."""
+        with self.lock:
+            if self._fh is not None:
+                self._fh.flush()
+            records, next_cursor = self.timelines.page(entity_id, before_id=before_id, limit=limit)
+            locations = [(self._segment_for(event_id), offset) for event_id, offset in records]
+        events = self.read_at(locations)
+        # Descarta registros huérfanos (evento perdido en un corte y id reutilizado)
+        target = str(entity_id).strip().lower()
+        events = [e for e, (event_id, _) in zip(events, records)
+                  if e is not None and e['id'] == event_id and str(e.get('entidad_id')).strip().lower() == target]
+        return events, next_cursor
+
+    def get_index(self):
+        """Índice secundario del proceso; se construye una vez y luego se mantiene en cada append."""
+        with self.lock:
+            if self._index is None:
+                if self._fh is not None:
+                    self._fh.flush()
+                index = AuditIndex()
+                for _, path in self._segments:
+                    for offset, event in self._scan_with_offsets(path):
+                        index.add(event, (path, offset))
+                self._index = index
+            return self._index
+
+    @staticmethod
+    def _scan_with_offsets(path):
+        if not os.path.exists(path):
+            return
+        offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    yield offset, json.loads(line)
+                offset += len(line)
+
+    def read_at(self, locations):
+        """Lee eventos puntuales por (segmento, offset), preservando el orden pedido (None si no existe)."""
+        handles = {}
+        events = []
+        try:
+            for path, offset in locations:
+                fh = handles.get(path)
+                if fh is None:
+                    fh = handles[path] = open(path, 'rb')
+                fh.seek(offset)
+                line = fh.readline()
+                events.append(json.loads(line) if line.endswith(b"\n") else None)
+        finally:
+            for fh in handles.values():
+                fh.close()
+        return events
+
+    # ─── Lectura ────────────────────────────────────────────────
+
+    def iter_events(self, start_id=None):
+        """Itera los eventos en orden de id, saltando segmentos anteriores a start_id."""
+        with self.lock:
+            if self._fh is not None:
+                self._fh.flush()
+            segments = list(self._segments)
+        for idx, (first_id, path) in enumerate(segments):
+            if start_id is not None and idx + 1 < len(segments) and segments[idx + 1][0] <= start_id:
+                continue
+            yield from self.read_segment(path, start_id=start_id)
+
+    @staticmethod
+    def read_segment(path, start_id=None):
+        """Lee un segmento completo; usable desde otros procesos (verificación paralela)."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # Línea aún en escritura por otro hilo
+                    break
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if start_id is not None and event['id'] < start_id:
+                    continue
+                yield event
@@ -1,64 +1,184 @@
 import hashlib
+import hmac
+import itertools
 import json
 import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import get_context
 from datetime import datetime
 from .database_service import DatabaseService
+from .audit_log_store import AuditLogStore, GENESIS_HASH
+from .audit_index import AuditIndex
+from .audit_writer import AuditWriter
+from .audit_delta import DeltaMismatchError, apply_delta, encode_delta, is_delta, state_digest
+
+# Sin AUDIT_CHECKPOINT_SECRET se usa una clave propia de la instalación (ver load_install_key)
+_INSTALL_KEY = object()
+_install_keys = {}
+_install_keys_lock = threading.Lock()
+
+
+def load_install_key(path):
+    """
+    Clave HMAC de la instalación: se genera una sola vez en path (permisos 0600) y
+    luego se lee de ahí. Se cachea por proceso. Retorna None si no se puede crear.
+    """
+    path = os.path.abspath(path)
+    with _install_keys_lock:
+        if path in _install_keys:
+            return _install_keys[path]
+        key = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(secrets.token_hex(32))
+        except FileExistsError:
+            pass
+        except OSError as e:
+            print(f"[AUDIT] No se pudo crear la clave de checkpoints {path}: {e}. "
+                  "verify_integrity re-verifica siempre la cadena completa")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                key = f.read().strip().encode('utf-8') or None
+        _install_keys[path] = key
+        return key
+
+
+def calculate_event_hash(event_data, prev_hash):
+    """Hash SHA256 canónico de un evento encadenado al hash del evento anterior."""
+    # Serializamos los datos de forma consistente para el hash
+    payload = {
+        "usuario": event_data.get("id_usuario"),
+        "rol": event_data.get("rol_usuario"),
+        "tipo": event_data.get("tipo_evento"),
+        "entidad": event_data.get("entidad"),
+        "entidad_id": event_data.get("entidad_id"),
+        "anterior": event_data.get("estado_anterior"),
+        "nuevo": event_data.get("estado_nuevo"),
+        "metadata": event_data.get("metadata"),
+        "prev_hash": prev_hash
+    }
+    encoded_data = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded_data).hexdigest()
+
+
+def verify_event_chain(events, expected_prev_hash):
+    """
+    Recorre eventos consecutivos validando enlace y hash de datos.
+    Retorna (errores, último_id, último_hash, cantidad_verificada).
+    """
+    errors = []
+    last_id = None
+    count = 0
+    for event in events:
+        # Re-serializar para verificar
+        verif_info = {
+            "id_usuario": event['id_usuario'],
+            "rol_usuario": event['rol_usuario'],
+            "tipo_evento": event['tipo_evento'],
+            "entidad": event['entidad'],
+            "entidad_id": event['entidad_id'],
+            "estado_anterior": json.loads(event['estado_anterior']) if event['estado_anterior'] else None,
+            "estado_nuevo": json.loads(event['estado_nuevo']) if event['estado_nuevo'] else None,
+            "metadata": json.loads(event['metadata']) if event['metadata'] else None
+        }
+
+        # Verificar hash previo
+        if event['hash_previo'] != expected_prev_hash:
+            errors.append(f"Ruptura de cadena en ID {event['id']}: Hash previo no coincide.")
+
+        # Verificar hash actual
+        calculated_hash = calculate_event_hash(verif_info, event['hash_previo'])
+        if event['hash_evento'] != calculated_hash:
+            errors.append(f"Inconsistencia en ID {event['id']}: Hash de datos alterado.")
+
+        expected_prev_hash = event['hash_evento']
+        last_id = event['id']
+        count += 1
+
+    return errors, last_id, expected_prev_hash, count
+
+
+def _verify_chunk(events):
+    """
+    Verifica un tramo tomando como ancla su propio primer hash_previo.
+    El enlace entre tramos (frontera) lo valida el proceso coordinador.
+    """
+    events = iter(events)
+    first = next(events, None)
+    if first is None:
+        return {"first_id": None, "first_prev": None, "last_id": None, "last_hash": None,
+                "errors": [], "count": 0}
+    errors, last_id, last_hash, count = verify_event_chain(
+        itertools.chain([first], events), first['hash_previo']
+    )
+    return {"first_id": first['id'], "first_prev": first['hash_previo'], "last_id": last_id,
+            "last_hash": last_hash, "errors": errors, "count": count}
+
+
+def _verify_segment_file(path):
+    """Worker del pool: verifica un segmento JSONL del log mock."""
+    return _verify_chunk(AuditLogStore.read_segment(path))
+
+
+def _verify_id_range(start_id, end_id):
+    """Worker del pool: verifica un rango [start_id, end_id) con su propia conexión MySQL."""
+    db = DatabaseService()
+    rows = db.fetch_iter(
+        "SELECT * FROM audit_events WHERE id >= %s AND id < %s ORDER BY id ASC", (start_id, end_id)
+    )
+    return _verify_chunk(rows)
+
 
 class AuditService:
     """
     Servicio de Auditoría Regulatoria Avanzada.
     Implementa un log inmutable con integridad verificable mediante encadenamiento de Hash (Blockchain Light).
     """
+
+    # Cada cuántos eventos replayados se materializa un snapshot de estado
+    SNAPSHOT_EVERY = 50
+    # Segundos que se espera al escritor MySQL antes de dar el registro por fallido
+    WRITE_TIMEOUT = float(os.getenv("AUDIT_WRITE_TIMEOUT", 10))
     
     def __init__(self, db_service=None):
         self.db = db_service or DatabaseService()
+        # audit_events.json queda como semilla histórica; el log vivo es segmentado (JSONL)
         self.mock_db_path = "frontend/services/audit_events.json"
-        
-    def _load_mock_events(self):
-        if os.path.exists(self.mock_db_path):
-            with open(self.mock_db_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        self.mock_log_dir = "frontend/services/audit_log"
+        self._mock_store = None
+        # Clave HMAC para firmar los checkpoints de verificación incremental. Nunca hay una
+        # clave por defecto en el código (permitiría falsificarlos): sin AUDIT_CHECKPOINT_SECRET
+        # se genera una por instalación. Con varias réplicas hay que configurar la variable
+        secret = os.getenv("AUDIT_CHECKPOINT_SECRET")
+        self.checkpoint_secret = secret.encode('utf-8') if secret else _INSTALL_KEY
 
-    def _save_mock_events(self, events):
-        with open(self.mock_db_path, 'w', encoding='utf-8') as f:
-            json.dump(events, f, indent=4, default=str)
+    def _get_mock_store(self):
+        if self._mock_store is None:
+            self._mock_store = AuditLogStore.open(self.mock_log_dir, legacy_path=self.mock_db_path)
+        return self._mock_store
+
+    def _load_mock_events(self):
+        return list(self._get_mock_store().iter_events())
 
     def _calculate_hash(self, event_data, prev_hash):
         """Calcula el hash SHA256 del evento incluyendo el hash del evento anterior."""
-        # Serializamos los datos de forma consistente para el hash
-        payload = {
-            "usuario": event_data.get("id_usuario"),
-            "rol": event_data.get("rol_usuario"),
-            "tipo": event_data.get("tipo_evento"),
-            "entidad": event_data.get("entidad"),
-            "entidad_id": event_data.get("entidad_id"),
-            "anterior": event_data.get("estado_anterior"),
-            "nuevo": event_data.get("estado_nuevo"),
-            "metadata": event_data.get("metadata"),
-            "prev_hash": prev_hash
-        }
-        encoded_data = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
-        return hashlib.sha256(encoded_data).hexdigest()
+        return calculate_event_hash(event_data, prev_hash)
 
     def log_event(self, user_id, user_role, event_type, entity, entity_id, 
-                  prev_state=None, new_state=None, metadata=None, ip=None):
+                  prev_state=None, new_state=None, metadata=None, ip=None, delta=False):
         """
         Registra un evento auditable encadenado.
+        Con delta=True (estados completos) se guarda sólo el diff contra el estado previo
+        en estado_nuevo; el hash se calcula sobre esa forma canónica almacenada.
         """
-        db_available = self.db.is_available()
-        prev_hash = "0" * 64
-        
-        if db_available:
-            last_event = self.db.fetch_one("SELECT hash_evento FROM audit_events ORDER BY id DESC LIMIT 1")
-            if last_event:
-                prev_hash = last_event['hash_evento']
-        else:
-            events = self._load_mock_events()
-            if events:
-                prev_hash = events[-1]['hash_evento']
+        if delta and (prev_state is not None or new_state is not None):
+            new_state = self._encode_state_delta(event_type, entity, entity_id, prev_state, new_state)
+            prev_state = None
 
-        # 2. Preparar datos y calcular hash
         event_info = {
             "id_usuario": user_id,
             "rol_usuario": user_role,
@@ -69,102 +189,329 @@ class AuditService:
             "estado_nuevo": new_state,
             "metadata": metadata
         }
-        
-        event_hash = self._calculate_hash(event_info, prev_hash)
 
-        # 3. Persistir
-        if db_available:
-            query = """
-                INSERT INTO audit_events 
-                (id_usuario, rol_usuario, tipo_evento, entidad, entidad_id, 
-                 estado_anterior, estado_nuevo, metadata, ip_origen, hash_previo, hash_evento)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            params = (
-                user_id, user_role, event_type, entity, entity_id,
-                json.dumps(prev_state) if prev_state else None,
-                json.dumps(new_state) if new_state else None,
-                json.dumps(metadata) if metadata else None,
-                ip, prev_hash, event_hash
+        if not self.db.is_available():
+            return self._log_event_mock(event_info, ip)
+
+        # Escritor único del proceso: encadena con el último hash en memoria y
+        # confirma en lote junto con los eventos concurrentes de otras sesiones
+        writer = AuditWriter.for_database(self.db, calculate_event_hash)
+        return self._await_writer(writer.submit(event_info, ip))
+
+    def _await_writer(self, future):
+        """
+        Resultado del escritor MySQL. Un error del escritor se propaga al llamador; si no
+        confirma dentro de WRITE_TIMEOUT y el evento sigue en cola se cancela y se lanza
+        TimeoutError. Nunca se desvía al log mock: sería una segunda cadena fuera de
+        audit_events y el evento podría quedar registrado dos veces.
+        """
+        try:
+            return future.result(timeout=self.WRITE_TIMEOUT)
+        except FutureTimeoutError:
+            if future.cancel():
+                # Todavía en cola: el escritor ya no lo va a insertar
+                raise TimeoutError(
+                    f"El escritor de auditoría no tomó el evento en {self.WRITE_TIMEOUT}s; no se registró"
+                ) from None
+        # Ya forma parte de un lote en curso: se espera su resultado (o su error)
+        return future.result(timeout=self.WRITE_TIMEOUT)
+
+    def _encode_state_delta(self, event_type, entity, entity_id, prev_state, new_state):
+        """
+        Codifica el cambio como delta. Si el último evento delta de la entidad no deja
+        el estado en prev_state (historia previa sin deltas, datos editados fuera del
+        log), se incluye el estado base completo para que la reconstrucción sea exacta.
+        """
+        last = self.query_events(event_type=event_type, entity=entity, entity_id=entity_id, limit=1)['events']
+        known_digest = None
+        if last:
+            payload = last[0]['estado_nuevo']
+            payload = json.loads(payload) if isinstance(payload, str) else payload
+            if is_delta(payload):
+                known_digest = payload['state_digest']
+        include_base = prev_state is not None and known_digest != state_digest(prev_state)
+        return encode_delta(prev_state, new_state, include_base=include_base)
+
+    def log_events(self, events):
+        """
+        Registro masivo de eventos auditables (sincronización de outbox, importaciones, etc.).
+        Cada elemento es un dict con las claves de log_event (user_id, user_role, event_type,
+        entity, entity_id y opcionales prev_state, new_state, metadata, ip).
+        Los hashes se encadenan en memoria y se persisten con un único INSERT multi-fila
+        (MySQL) o un único append (mock). Retorna la lista de hashes en orden.
+        """
+        items = []
+        for ev in events:
+            event_info = {
+                "id_usuario": ev["user_id"],
+                "rol_usuario": ev["user_role"],
+                "tipo_evento": ev["event_type"],
+                "entidad": ev["entity"],
+                "entidad_id": ev["entity_id"],
+                "estado_anterior": ev.get("prev_state"),
+                "estado_nuevo": ev.get("new_state"),
+                "metadata": ev.get("metadata")
+            }
+            items.append((event_info, ev.get("ip")))
+        if not items:
+            return []
+
+        if self.db.is_available():
+            writer = AuditWriter.for_database(self.db, calculate_event_hash)
+            return self._await_writer(writer.submit_many(items))
+
+        store = self._get_mock_store()
+        hashes = []
+        new_events = []
+        with store.lock:
+            prev_hash = store.last_hash
+            next_id = store.last_id + 1
+            for event_info, ip in items:
+                event_hash = self._calculate_hash(event_info, prev_hash)
+                new_events.append(self._build_mock_event(next_id, event_info, ip, prev_hash, event_hash))
+                hashes.append(event_hash)
+                prev_hash = event_hash
+                next_id += 1
+            store.append_many(new_events)
+        return hashes
+
+    def _log_event_mock(self, event_info, ip):
+        """Persistencia mock: append al log segmentado usando el hash de cola en memoria."""
+        store = self._get_mock_store()
+        # El lock cubre lectura de cola + append para que la cadena no se bifurque
+        with store.lock:
+            prev_hash = store.last_hash
+            event_hash = self._calculate_hash(event_info, prev_hash)
+            store.append(self._build_mock_event(store.last_id + 1, event_info, ip, prev_hash, event_hash))
+        return event_hash
+
+    @staticmethod
+    def _build_mock_event(event_id, event_info, ip, prev_hash, event_hash):
+        return {
+            "id": event_id,
+            "timestamp_utc": datetime.utcnow().isoformat(),
+            "id_usuario": event_info["id_usuario"],
+            "rol_usuario": event_info["rol_usuario"],
+            "tipo_evento": event_info["tipo_evento"],
+            "entidad": event_info["entidad"],
+            "entidad_id": event_info["entidad_id"],
+            "estado_anterior": json.dumps(event_info["estado_anterior"]) if event_info["estado_anterior"] else None,
+            "estado_nuevo": json.dumps(event_info["estado_nuevo"]) if event_info["estado_nuevo"] else None,
+            "metadata": json.dumps(event_info["metadata"]) if event_info["metadata"] else None,
+            "ip_origen": ip,
+            "hash_previo": prev_hash,
+            "hash_evento": event_hash
+        }
+
+    # ─── Verificación de Integridad ─────────────────────────────
+
+    def _checkpoints_enabled(self):
+        if self.checkpoint_secret is _INSTALL_KEY:
+            key_path = os.getenv("AUDIT_CHECKPOINT_KEY_FILE") or os.path.join(
+                os.path.dirname(os.path.abspath(self.mock_log_dir)), "audit_checkpoint.key")
+            self.checkpoint_secret = load_install_key(key_path)
+        return bool(self.checkpoint_secret)
+
+    def _sign_checkpoint(self, event_id, chain_hash):
+        message = f"{event_id}:{chain_hash}".encode('utf-8')
+        return hmac.new(self.checkpoint_secret, message, hashlib.sha256).hexdigest()
+
+    def _load_checkpoint(self):
+        """Último checkpoint de verificación, o None si no existe, la firma no es válida o no hay clave."""
+        if not self._checkpoints_enabled():
+            return None
+        if self.db.is_available():
+            row = self.db.fetch_one(
+                "SELECT id_evento, hash_evento, firma FROM audit_checkpoints ORDER BY id DESC LIMIT 1"
             )
-            self.db.execute(query, params)
+            checkpoint = {"id": row['id_evento'], "hash": row['hash_evento'], "firma": row['firma']} if row else None
         else:
-            # Mock persistence
-            new_event = {
-                "id": len(events) + 1,
-                "timestamp_utc": datetime.utcnow().isoformat(),
-                "id_usuario": user_id,
-                "rol_usuario": user_role,
-                "tipo_evento": event_type,
-                "entidad": entity,
-                "entidad_id": entity_id,
-                "estado_anterior": json.dumps(prev_state) if prev_state else None,
-                "estado_nuevo": json.dumps(new_state) if new_state else None,
-                "metadata": json.dumps(metadata) if metadata else None,
-                "ip_origen": ip,
-                "hash_previo": prev_hash,
-                "hash_evento": event_hash
+            path = os.path.join(self.mock_log_dir, "checkpoint.json")
+            checkpoint = None
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    checkpoint = json.load(f)
+        if not checkpoint:
+            return None
+        expected = self._sign_checkpoint(checkpoint['id'], checkpoint['hash'])
+        if not hmac.compare_digest(expected, checkpoint.get('firma') or ""):
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, event_id, chain_hash, mode, verified_count):
+        if not self._checkpoints_enabled():
+            return
+        firma = self._sign_checkpoint(event_id, chain_hash)
+        if self.db.is_available():
+            self.db.execute(
+                """
+                INSERT INTO audit_checkpoints (id_evento, hash_evento, firma, modo, eventos_verificados)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (event_id, chain_hash, firma, mode, verified_count)
+            )
+        else:
+            checkpoint = {
+                "id": event_id,
+                "hash": chain_hash,
+                "firma": firma,
+                "modo": mode,
+                "eventos_verificados": verified_count,
+                "timestamp_utc": datetime.utcnow().isoformat()
             }
-            events.append(new_event)
-            self._save_mock_events(events)
-            
-        return event_hash
+            os.makedirs(self.mock_log_dir, exist_ok=True)
+            path = os.path.join(self.mock_log_dir, "checkpoint.json")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f, indent=4)
+            os.replace(tmp_path, path)
 
-    def verify_integrity(self):
+    def _iter_events_from(self, start_id):
+        """Eventos con id >= start_id en orden ascendente (SQL o log segmentado)."""
+        if self.db.is_available():
+            return self.db.fetch_iter(
+                "SELECT * FROM audit_events WHERE id >= %s ORDER BY id ASC", (start_id,)
+            )
+        return self._get_mock_store().iter_events(start_id=start_id)
+
+    def _verify_events(self, events, expected_prev_hash):
+        return verify_event_chain(events, expected_prev_hash)
+
+    def _verification_chunks(self, chunk_size):
+        """Tramos independientes de la cadena: segmentos JSONL o rangos de id en MySQL."""
+        if self.db.is_available():
+            bounds = self.db.fetch_one("SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM audit_events")
+            if not bounds or bounds['min_id'] is None:
+                return None, []
+            ranges = [(start, start + chunk_size)
+                      for start in range(bounds['min_id'], bounds['max_id'] + 1, chunk_size)]
+            return _verify_id_range, ranges
+        return _verify_segment_file, [(path,) for _, path in self._get_mock_store().segments()]
+
+    def _verify_parallel(self, max_workers=None, chunk_size=50000):
         """
-        Corrobora la integridad de toda la cadena de auditoría.
-        Retorna (bool, list_of_errors)
+        Re-verificación completa repartida en un pool de procesos.
+        Cada tramo se valida por separado y luego se comprueban las fronteras:
+        el hash_previo del primer evento de cada tramo debe coincidir con el
+        último hash del tramo anterior (génesis para el primero).
         """
-        if self.db.is_available():
-            events = self.db.fetch_all("SELECT * FROM audit_events ORDER BY id ASC")
+        worker, chunks = self._verification_chunks(chunk_size)
+        if len(chunks) <= 1:
+            # Un único tramo: no vale la pena levantar el pool
+            results = [worker(*chunk) for chunk in chunks]
         else:
-            events = self._load_mock_events()
+            # spawn: los workers arrancan limpios, sin heredar sockets del pool MySQL,
+            # estado del circuit breaker ni hilos (escritor de auditoría) del proceso
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+                results = list(pool.map(worker, *zip(*chunks)))
 
         errors = []
-        expected_prev_hash = "0" * 64
-
-        for event in events:
-            # Re-serializar para verificar
-            verif_info = {
-                "id_usuario": event['id_usuario'],
-                "rol_usuario": event['rol_usuario'],
-                "tipo_evento": event['tipo_evento'],
-                "entidad": event['entidad'],
-                "entidad_id": event['entidad_id'],
-                "estado_anterior": json.loads(event['estado_anterior']) if event['estado_anterior'] else None,
-                "estado_nuevo": json.loads(event['estado_nuevo']) if event['estado_nuevo'] else None,
-                "metadata": json.loads(event['metadata']) if event['metadata'] else None
-            }
-            
-            # Verificar hash previo
-            if event['hash_previo'] != expected_prev_hash:
-                errors.append(f"Ruptura de cadena en ID {event['id']}: Hash previo no coincide.")
-            
-            # Verificar hash actual
-            calculated_hash = self._calculate_hash(verif_info, event['hash_previo'])
-            if event['hash_evento'] != calculated_hash:
-                errors.append(f"Inconsistencia en ID {event['id']}: Hash de datos alterado.")
-            
-            expected_prev_hash = event['hash_evento']
+        expected_prev_hash = GENESIS_HASH
+        last_id = None
+        count = 0
+        for result in results:
+            if not result['count']:
+                continue
+            if result['first_prev'] != expected_prev_hash:
+                errors.append(f"Ruptura de cadena en ID {result['first_id']}: Hash previo no coincide.")
+            errors.extend(result['errors'])
+            expected_prev_hash = result['last_hash']
+            last_id = result['last_id']
+            count += result['count']
+        return errors, last_id, expected_prev_hash, count
+
+    def verify_integrity(self, full=False, parallel=False, max_workers=None):
+        """
+        Corrobora la integridad de la cadena de auditoría.
+        Por defecto sólo recorre los eventos posteriores al último checkpoint firmado
+        (si AUDIT_CHECKPOINT_SECRET no está configurado, siempre verifica completo);
+        con full=True (auditoría regulatoria) re-verifica desde el evento génesis.
+        parallel=True implica una re-verificación completa repartida en max_workers procesos.
+        Retorna (bool, list_of_errors)
+        """
+        checkpoint = None if (full or parallel) else self._load_checkpoint()
+
+        if parallel:
+            errors, last_id, last_hash, count = self._verify_parallel(max_workers=max_workers)
+            mode = "FULL"
+        elif checkpoint:
+            events = iter(self._iter_events_from(checkpoint['id']))
+            anchor = next(events, None)
+            # El evento del checkpoint debe seguir existiendo con el mismo hash
+            if not anchor or anchor['id'] != checkpoint['id'] or anchor['hash_evento'] != checkpoint['hash']:
+                return (False, [f"Checkpoint en ID {checkpoint['id']} no coincide con el log: posible alteración o eliminación de eventos."])
+            errors, last_id, last_hash, count = self._verify_events(events, checkpoint['hash'])
+            mode = "INCREMENTAL"
+        else:
+            errors, last_id, last_hash, count = self._verify_events(self._iter_events_from(1), GENESIS_HASH)
+            mode = "FULL"
+
+        if not errors and last_id is not None:
+            self._save_checkpoint(last_id, last_hash, mode, count)
 
         return (len(errors) == 0, errors)
 
     def get_events_for_well(self, project_id):
         """Recupera todos los eventos de auditoría para un pozo específico."""
+        return self.get_well_timeline(project_id, limit=None)['events']
+
+    def get_well_timeline(self, project_id, cursor=None, limit=20):
+        """
+        Página de la línea de tiempo de un pozo, del evento más reciente al más antiguo.
+        En modo mock lee la línea de tiempo materializada del pozo (costo O(página)).
+        limit=None devuelve la historia completa del pozo.
+        Retorna {"events": [...], "next_cursor": id | None}.
+        """
         if self.db.is_available():
-            query = "SELECT * FROM audit_events WHERE entidad = 'POZO' AND entidad_id = %s ORDER BY timestamp_utc DESC"
-            return self.db.fetch_all(query, (project_id,))
-        else:
-            events = self._load_mock_events()
-            well_events = [e for e in events if e['entidad'] == 'POZO' and e['entidad_id'] == project_id]
-            # Convert string timestamps to datetime objects for UI consistency
-            for e in well_events:
-                if isinstance(e['timestamp_utc'], str):
-                    try:
-                        e['timestamp_utc'] = datetime.fromisoformat(e['timestamp_utc'])
-                    except:
-                        pass
-            return sorted(well_events, key=lambda x: x['timestamp_utc'], reverse=True)
+            # idx_entidad (entidad, entidad_id) + PK resuelve el orden por id
+            query = "SELECT * FROM audit_events WHERE entidad = 'POZO' AND entidad_id = %s"
+            params = [project_id]
+            if cursor is not None:
+                query += " AND id < %s"
+                params.append(cursor)
+            query += " ORDER BY id DESC"
+            if limit is None:
+                return {"events": self.db.fetch_all(query, tuple(params)), "next_cursor": None}
+            query += " LIMIT %s"
+            params.append(limit + 1)
+            rows = self.db.fetch_all(query, tuple(params))
+            next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+            return {"events": rows[:limit], "next_cursor": next_cursor}
+
+        events, next_cursor = self._get_mock_store().well_events(project_id, before_id=cursor, limit=limit)
+        return {"events": self._parse_timestamps(events), "next_cursor": next_cursor}
+
+    def iter_events(self, since=None, until=None, chunk_size=1000):
+        """
+        Itera todos los eventos en orden ascendente de id sin materializarlos.
+        MySQL usa DatabaseService.fetch_iter (cursor del lado del servidor, de a
+        chunk_size filas); el modo mock lee los segmentos del log línea por línea.
+        """
+        if self.db.is_available():
+            clauses = []
+            params = []
+            if since is not None:
+                clauses.append("timestamp_utc >= %s")
+                params.append(since)
+            if until is not None:
+                clauses.append("timestamp_utc <= %s")
+                params.append(until)
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            yield from self.db.fetch_iter(
+                f"SELECT * FROM audit_events{where} ORDER BY id ASC", tuple(params), chunk_size=chunk_size
+            )
+            return
+
+        since_key = AuditIndex._ts_key(since) if since is not None else None
+        until_key = AuditIndex._ts_key(until) if until is not None else None
+        for event in self._get_mock_store().iter_events():
+            ts = AuditIndex._ts_key(event['timestamp_utc'])
+            if since_key is not None and ts < since_key:
+                continue
+            if until_key is not None and ts > until_key:
+                # El log es cronológico: no hay eventos posteriores dentro del rango
+                break
+            yield event
 
     def get_all_events(self):
         """Recupera todos los eventos del sistema."""
@@ -172,11 +519,195 @@ class AuditService:
             query = "SELECT * FROM audit_events ORDER BY timestamp_utc DESC LIMIT 200"
             return self.db.fetch_all(query)
         else:
-            events = self._load_mock_events()
-            for e in events:
-                if isinstance(e['timestamp_utc'], str):
-                    try:
-                        e['timestamp_utc'] = datetime.fromisoformat(e['timestamp_utc'])
-                    except:
-                        pass
+            events = self._parse_timestamps(self._load_mock_events())
             return sorted(events, key=lambda x: x['timestamp_utc'], reverse=True)
+
+    @staticmethod
+    def _parse_timestamps(events):
+        # Convert string timestamps to datetime objects for UI consistency
+        for e in events:
+            if isinstance(e['timestamp_utc'], str):
+                try:
+                    e['timestamp_utc'] = datetime.fromisoformat(e['timestamp_utc'])
+                except:
+                    pass
+        return events
+
+    # ─── Reconstrucción Temporal ────────────────────────────────
+
+    def get_entity_state_at(self, entity, entity_id, at=None, event_type="DATA_CHANGE"):
+        """
+        Estado completo de una entidad tal como estaba en la fecha 'at' (None = actual).
+        Parte del último snapshot materializado anterior a 'at' y replaya sólo los
+        eventos posteriores; cada SNAPSHOT_EVERY eventos replayados se materializa
+        un snapshot nuevo, así las consultas siguientes replayan a lo sumo ese tramo.
+        Cada delta se verifica contra sus digests. Si el snapshot no encaja con los
+        deltas siguientes se reconstruye desde el primer evento; si falta un evento
+        se retoma en el siguiente keyframe (delta con base), y si no hay ninguno
+        antes de 'at' se levanta DeltaMismatchError en lugar de un estado incorrecto.
+        Retorna None si la entidad no tenía historia a esa fecha.
+        """
+        snapshot = self._load_state_snapshot(entity, entity_id, at)
+        try:
+            return self._replay_state(entity, entity_id, event_type, snapshot, at)
+        except DeltaMismatchError:
+            if snapshot is None:
+                raise
+            return self._replay_state(entity, entity_id, event_type, None, at)
+
+    def _replay_state(self, entity, entity_id, event_type, snapshot, at):
+        state = snapshot['estado'] if snapshot else None
+        after_id = snapshot['id_evento'] if snapshot else 0
+
+        replayed = 0
+        broken = None
+        for event in self._state_events_after(entity, entity_id, event_type, after_id, at):
+            payload = event['estado_nuevo']
+            payload = json.loads(payload) if isinstance(payload, str) else payload
+            if broken is not None and not (is_delta(payload) and "base" in payload):
+                # Estado desconocido: sólo un keyframe permite retomar la reconstrucción
+                continue
+            try:
+                state = self._apply_state_payload(state, payload)
+            except DeltaMismatchError as e:
+                broken = DeltaMismatchError(f"Evento {event['id']}: {e}")
+                continue
+            broken = None
+            replayed += 1
+            if replayed % self.SNAPSHOT_EVERY == 0:
+                self._save_state_snapshot(entity, entity_id, event, state)
+        if broken is not None:
+            raise broken
+        return state
+
+    @staticmethod
+    def _apply_state_payload(state, payload):
+        if is_delta(payload):
+            return apply_delta(state, payload)
+        if payload:
+            # Eventos previos a los deltas: estado_nuevo es el upsert aplicado sobre el registro
+            return {**(state or {}), **payload}
+        return state
+
+    def _state_events_after(self, entity, entity_id, event_type, after_id, at):
+        """Eventos de la entidad con id > after_id y timestamp <= at, en orden ascendente."""
+        if self.db.is_available():
+            query = """
+                SELECT id, timestamp_utc, estado_nuevo FROM audit_events
+                WHERE entidad = %s AND entidad_id = %s AND tipo_evento = %s AND id > %s
+            """
+            params = [entity, entity_id, event_type, after_id]
+            if at is not None:
+                query += " AND timestamp_utc <= %s"
+                params.append(at)
+            return self.db.fetch_all(query + " ORDER BY id ASC", tuple(params))
+
+        # Mock: páginas descendentes del índice hasta alcanzar el snapshot
+        events = []
+        cursor = None
+        while True:
+            page = self.query_events(event_type=event_type, entity=entity, entity_id=entity_id,
+                                     until=at, cursor=cursor, limit=self.SNAPSHOT_EVERY)
+            newer = [e for e in page['events'] if e['id'] > after_id]
+            events.extend(newer)
+            cursor = page['next_cursor']
+            if cursor is None or len(newer) < len(page['events']):
+                break
+        events.reverse()
+        return events
+
+    def _load_state_snapshot(self, entity, entity_id, at):
+        if self.db.is_available():
+            query = "SELECT id_evento, estado FROM audit_state_snapshots WHERE entidad = %s AND entidad_id = %s"
+            params = [entity, entity_id]
+            if at is not None:
+                query += " AND timestamp_utc <= %s"
+                params.append(at)
+            row = self.db.fetch_one(query + " ORDER BY id_evento DESC LIMIT 1", tuple(params))
+            if not row:
+                return None
+            estado = row['estado']
+            return {"id_evento": row['id_evento'],
+                    "estado": json.loads(estado) if isinstance(estado, str) else estado}
+
+        store = self._get_mock_store()
+        with store.lock:
+            return store.snapshots.latest(entity, entity_id, at)
+
+    def _save_state_snapshot(self, entity, entity_id, event, state):
+        if self.db.is_available():
+            self.db.execute(
+                """
+                INSERT IGNORE INTO audit_state_snapshots (entidad, entidad_id, id_evento, timestamp_utc, estado)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (entity, entity_id, event['id'], event['timestamp_utc'], json.dumps(state, default=str))
+            )
+        else:
+            store = self._get_mock_store()
+            with store.lock:
+                store.snapshots.add(entity, entity_id, event['id'], event['timestamp_utc'], state)
+
+    # ─── Consultas Paginadas ────────────────────────────────────
+
+    @staticmethod
+    def _like_prefix(value):
+        """Patrón LIKE 'valor%' con los comodines del valor escapados."""
+        escaped = str(value).strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return escaped + "%"
+
+    def query_events(self, event_type=None, user=None, entity=None, entity_id=None,
+                     since=None, until=None, cursor=None, limit=20, match_prefix=False):
+        """
+        Consulta paginada de eventos, del más reciente al más antiguo.
+        Filtros por igualdad (case-insensitive) y rango temporal [since, until].
+        Con match_prefix=True, user y entity_id coinciden por prefijo ("jpe" -> "jperez");
+        siguen resolviéndose por índice (LIKE 'x%' en MySQL, bisect en el mock).
+        cursor es el 'next_cursor' devuelto por la página anterior.
+        Retorna {"events": [...], "next_cursor": id | None}.
+        """
+        filters = {
+            "tipo_evento": event_type,
+            "id_usuario": user,
+            "entidad": entity,
+            "entidad_id": entity_id,
+        }
+        filters = {k: v for k, v in filters.items() if v not in (None, "")}
+        prefix_fields = ("id_usuario", "entidad_id") if match_prefix else ()
+
+        if self.db.is_available():
+            # Filtros empujados a MySQL: idx_tipo, idx_usuario, idx_entidad, idx_timestamp
+            clauses = []
+            params = []
+            for column, value in filters.items():
+                if column in prefix_fields:
+                    clauses.append(f"{column} LIKE %s")
+                    params.append(self._like_prefix(value))
+                else:
+                    clauses.append(f"{column} = %s")
+                    params.append(value)
+            if cursor is not None:
+                clauses.append("id < %s")
+                params.append(cursor)
+            if since is not None:
+                clauses.append("timestamp_utc >= %s")
+                params.append(since)
+            if until is not None:
+                clauses.append("timestamp_utc <= %s")
+                params.append(until)
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            query = f"SELECT * FROM audit_events{where} ORDER BY id DESC LIMIT %s"
+            params.append(limit + 1)
+            rows = self.db.fetch_all(query, tuple(params))
+            next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+            return {"events": rows[:limit], "next_cursor": next_cursor}
+
+        store = self._get_mock_store()
+        index = store.get_index()
+        with store.lock:
+            locations, next_cursor = index.query(
+                filters, since=since, until=until, before_id=cursor, limit=limit,
+                prefix_fields=prefix_fields
+            )
+        events = self._parse_timestamps([e for e in store.read_at(locations) if e is not None])
+        return {"events": events, "next_cursor": next_cursor}
@@ -0,0 +1,178 @@
+import atexit
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from .audit_log_store import GENESIS_HASH
+from .query_stats import query_stats
+
+
+class AuditWriter:
+    """
+    Escritor único de eventos de auditoría por proceso (modo MySQL).
+    Todas las sesiones de Streamlit encolan sus eventos aquí; un solo hilo los
+    confirma en lotes dentro de una transacción. Cada lote relee la cola de la
+    cadena con SELECT ... FOR UPDATE (una consulta por lote, no por evento), así
+    la cadena sigue lineal también con varios procesos o réplicas escribiendo.
+    Las conexiones salen del pool de DatabaseService y pasan por su circuit breaker.
+    """
+
+    INSERT_QUERY = """
+        INSERT INTO audit_events
+        (id_usuario, rol_usuario, tipo_evento, entidad, entidad_id,
+         estado_anterior, estado_nuevo, metadata, ip_origen, hash_previo, hash_evento)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    TAIL_QUERY = "SELECT hash_evento FROM audit_events ORDER BY id DESC LIMIT 1 FOR UPDATE"
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def _reset_after_fork(cls):
+        # El hilo escritor no existe en el hijo de un fork
+        cls._instances = {}
+        cls._instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db, hash_fn, **kwargs):
+        """Retorna el escritor del proceso para la base de datos de db."""
+        key = (os.getpid(), db.host, db.port, db.db_name)
+        with cls._instances_lock:
+            writer = cls._instances.get(key)
+            if writer is None:
+                writer = cls(db, hash_fn, **kwargs)
+                cls._instances[key] = writer
+            return writer
+
+    def __init__(self, db, hash_fn, batch_size=200):
+        self.db = db
+        self.hash_fn = hash_fn
+        self.batch_size = batch_size
+        # Último hash confirmado por este escritor (informativo: no se usa para encadenar)
+        self.last_hash = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, event_info, ip=None):
+        """
+        Encola un evento; el Future se resuelve con su hash al confirmarse el lote.
+        Un Future cancelado antes de que el hilo lo tome no se escribe.
+        """
+        future = Future()
+        self._queue.put((event_info, ip, future))
+        return future
+
+    def submit_many(self, items):
+        """Encola varios (event_info, ip) como un bloque contiguo de la cadena; resuelve la lista de hashes."""
+        future = Future()
+        self._queue.put((list(items), None, future))
+        return future
+
+    def stop(self):
+        with self._instances_lock:
+            for key, writer in list(self._instances.items()):
+                if writer is self:
+                    del self._instances[key]
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    # ─── Hilo escritor ──────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            stop = False
+            # Group commit: se drena lo que ya esté encolado, sin demoras artificiales
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            # Se descartan los eventos cuyo llamador ya desistió (cancel tras el timeout)
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if batch:
+                self._commit(batch)
+            if stop:
+                break
+
+    def _commit(self, batch):
+        try:
+            with self.db.connection() as conn:
+                if conn is None:
+                    raise ConnectionError("MySQL no disponible para el escritor de auditoría")
+                prev_hash, results = self._insert_batch(conn, batch)
+            self.last_hash = prev_hash
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result in results:
+            future.set_result(result)
+
+    def _insert_batch(self, conn, batch):
+        conn.begin()
+        try:
+            with conn.cursor() as cursor:
+                # La cola se relee bloqueando la última fila: otro proceso pudo haber escrito
+                with query_stats.track(self.TAIL_QUERY) as timer:
+                    cursor.execute(self.TAIL_QUERY)
+                    row = cursor.fetchone()
+                    timer.rows = 1 if row else 0
+                prev_hash = row['hash_evento'] if row else GENESIS_HASH
+
+                rows = []
+                results = []
+                for payload, ip, future in batch:
+                    if isinstance(payload, list):
+                        # Bloque de log_events: se encadena completo y contiguo
+                        hashes = []
+                        for event_info, item_ip in payload:
+                            prev_hash = self._chain(event_info, item_ip, prev_hash, rows)
+                            hashes.append(prev_hash)
+                        results.append((future, hashes))
+                    else:
+                        prev_hash = self._chain(payload, ip, prev_hash, rows)
+                        results.append((future, prev_hash))
+
+                # pymysql agrupa el executemany de un INSERT ... VALUES en un INSERT multi-fila
+                if rows:
+                    with query_stats.track(self.INSERT_QUERY) as timer:
+                        cursor.executemany(self.INSERT_QUERY, rows)
+                        timer.rows = len(rows)
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        return prev_hash, results
+
+    def _chain(self, event_info, ip, prev_hash, rows):
+        event_hash = self.hash_fn(event_info, prev_hash)
+        rows.append((
+            event_info["id_usuario"], event_info["rol_usuario"], event_info["tipo_evento"],
+            event_info["entidad"], event_info["entidad_id"],
+            json.dumps(event_info["estado_anterior"]) if event_info["estado_anterior"] else None,
+            json.dumps(event_info["estado_nuevo"]) if event_info["estado_nuevo"] else None,
+            json.dumps(event_info["metadata"]) if event_info["metadata"] else None,
+            ip, prev_hash, event_hash
+        ))
+        return event_hash
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=AuditWriter._reset_after_fork)
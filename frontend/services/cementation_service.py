@@ -1,6 +1,6 @@
-import json
 import os
 from datetime import datetime
+from .local_store import LocalDocument
 
 
 class CementationService:
@@ -16,37 +16,47 @@ class CementationService:
     UMBRAL_DENSIDAD_ALERTA = 0.05  # 5%
     UMBRAL_DENSIDAD_CRITICO = 0.08  # 8%
 
+    # Colecciones del store local: (clave primaria, columnas indexadas)
+    LOCAL_NAMESPACE = "cementacion"
+    LOCAL_SCHEMA = {
+        "disenos": ("diseno_cementacion_id", ["id_pozo", "estado_diseno"]),
+        "datos_reales": ("dato_real_cementacion_id", ["diseno_cementacion_id"]),
+        "validaciones": ("validacion_cementacion_id", ["dato_real_cementacion_id", "resultado_validacion"]),
+        "eventos": ("evento_cementacion_id", ["id_pozo", "tipo_evento"]),
+    }
+
     def __init__(self, audit_service=None):
         self.audit_service = audit_service
         self.mock_data_path = os.path.join(
             os.path.dirname(__file__), "cementation_mock_data.json"
         )
         self._mock_data = None
+        self._doc = None
 
     # ─── Mock Data Access ───────────────────────────────────────
 
     def _load_mock_data(self):
         if self._mock_data is None:
-            if os.path.exists(self.mock_data_path):
-                with open(self.mock_data_path, "r", encoding="utf-8") as f:
-                    self._mock_data = json.load(f)
-            else:
-                self._mock_data = {
-                    "disenos": [],
-                    "datos_reales": [],
-                    "validaciones": [],
-                    "eventos": [],
-                }
+            self._mock_data = self._local_doc().load()
         return self._mock_data
 
+    def _local_doc(self):
+        # Store local SQLite; el JSON de mock_data_path sólo se importa como semilla
+        if self._doc is None:
+            self._doc = LocalDocument(self.LOCAL_NAMESPACE, self.LOCAL_SCHEMA, seed_path=self.mock_data_path)
+        return self._doc
+
     def _save_mock_data(self):
-        with open(self.mock_data_path, "w", encoding="utf-8") as f:
-            json.dump(self._mock_data, f, indent=4, default=str, ensure_ascii=False)
+        self._local_doc().save(self._mock_data)
 
     # ─── Diseños ───────────────────────────────────────────────
 
     def get_disenos(self, pozo_id=None):
         """Retorna diseños de cementación, filtrado opcionalmente por pozo."""
+        if pozo_id and self._mock_data is None:
+            # Lectura indexada por pozo sin cargar el documento completo
+            disenos = self._local_doc().find("disenos", id_pozo=pozo_id)
+            return [d for d in disenos if d.get("estado_diseno") != "INACTIVO"]
         data = self._load_mock_data()
         disenos = [d for d in data["disenos"] if d.get("estado_diseno") != "INACTIVO"]
         if pozo_id:
@@ -71,6 +81,7 @@ class CementationService:
                     diseno_data["actualizado_por"] = user_id
                     diseno_data["actualizado_en"] = datetime.now().isoformat()
                     data["disenos"][i] = {**d, **diseno_data}
+                    self._local_doc().mark("disenos", data["disenos"][i])
                     self._save_mock_data()
                     return data["disenos"][i]
         else:
@@ -80,6 +91,7 @@ class CementationService:
             diseno_data["creado_en"] = datetime.now().isoformat()
             diseno_data["estado_diseno"] = diseno_data.get("estado_diseno", "BORRADOR")
             data["disenos"].append(diseno_data)
+            self._local_doc().mark("disenos", diseno_data)
             self._save_mock_data()
             return diseno_data
 
@@ -93,6 +105,7 @@ class CementationService:
                 d["estado_diseno"] = "APROBADO"
                 d["fecha_aprobacion"] = datetime.now().strftime("%Y-%m-%d")
                 d["aprobado_por"] = aprobado_por
+                self._local_doc().mark("disenos", d)
 
                 self._registrar_evento(
                     d["id_pozo"], "DISENO_APROBADO",
@@ -144,6 +157,7 @@ class CementationService:
             "creado_en": datetime.now().isoformat(),
         }
         data["datos_reales"].append(nuevo_dato)
+        self._local_doc().mark("datos_reales", nuevo_dato)
 
         # Registrar evento
         self._registrar_evento(
@@ -157,6 +171,7 @@ class CementationService:
         # Ejecutar validación automática
         validacion = self._ejecutar_validacion(nuevo_dato, diseno)
         data["validaciones"].append(validacion)
+        self._local_doc().mark("validaciones", validacion)
 
         # Registrar evento de validación
         tipo_ev = {
@@ -248,6 +263,7 @@ class CementationService:
                 v["motivo_override"] = motivo
                 v["usuario_override"] = user_id
                 v["vencimiento_override"] = str(vencimiento)
+                self._local_doc().mark("validaciones", v)
 
                 # Obtener pozo_id para el evento
                 dato = next(
@@ -296,6 +312,7 @@ class CementationService:
             "fecha_evento": datetime.now().isoformat(),
             "usuario_evento": usuario,
         })
+        self._local_doc().mark("eventos", data["eventos"][-1])
 
     def get_eventos(self, pozo_id=None):
         data = self._load_mock_data()
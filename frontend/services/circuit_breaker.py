@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de disponibilidad de MySQL, alimentado por el resultado de las consultas reales.
+    CLOSED: las consultas pasan; failure_threshold fallos de red consecutivos (o un fallo de
+    conexión) lo abren. OPEN: las consultas no intentan conectar y los servicios usan su
+    fallback mock al instante. Tras reset_timeout pasa a HALF_OPEN y deja pasar una única
+    prueba: si funciona vuelve a CLOSED, si falla vuelve a OPEN.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def _reset_after_fork(cls):
+        # Un hijo creado con fork arranca con su propio estado (desconocido)
+        cls._instances = {}
+        cls._instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db, **kwargs):
+        """Retorna el breaker del proceso para la configuración de conexión de db."""
+        key = (os.getpid(), db.host, db.port, db.user, db.db_name)
+        with cls._instances_lock:
+            breaker = cls._instances.get(key)
+            if breaker is None:
+                breaker = cls(**kwargs)
+                cls._instances[key] = breaker
+            return breaker
+
+    def __init__(self, failure_threshold=3, reset_timeout=15.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        # Estado inicial desconocido: la primera consulta actúa como prueba
+        self._state = self.OPEN
+        self._opened_at = None
+        self._failures = 0
+        self._probe_in_flight = False
+        self._trips = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and (
+                self._opened_at is None or time.monotonic() - self._opened_at >= self.reset_timeout):
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow_request(self):
+        """True si la consulta puede intentar usar MySQL (en HALF_OPEN, sólo la prueba)."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Fallo de red en una consulta; abre el circuito al alcanzar el umbral."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """Fallo de conexión: el servidor no es alcanzable, se abre sin esperar el umbral."""
+        with self._lock:
+            self._failures += 1
+            self._open()
+
+    def abandon_probe(self):
+        """La prueba de HALF_OPEN terminó sin resultado (p. ej. pool saturado): se libera."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self):
+        if self._state != self.OPEN:
+            self._trips += 1
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def status(self):
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "open_for_s": round(time.monotonic() - self._opened_at, 1)
+                if state != self.CLOSED and self._opened_at is not None else 0.0,
+            }
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=CircuitBreaker._reset_after_fork)
@@ -2,6 +2,7 @@ import hashlib
 import json
 import os
 from datetime import datetime
+from .local_store import LocalDocument
 
 
 class ClosureService:
@@ -19,6 +20,16 @@ class ClosureService:
         "Control calidad OK",
     ]
 
+    # Colecciones del store local: (clave primaria, columnas indexadas)
+    LOCAL_NAMESPACE = "cierre"
+    LOCAL_SCHEMA = {
+        "documentos_evidencia": ("documento_evidencia_id", ["id_pozo", "tipo_documento"]),
+        "certificaciones": ("certificacion_digital_id", ["documento_evidencia_id"]),
+        "cierres": ("cierre_tecnico_pozo_id", ["id_pozo", "estado_cierre"]),
+        "checklists": ("checklist_cierre_id", ["cierre_tecnico_pozo_id"]),
+        "exportaciones": ("exportacion_regulatoria_id", ["id_pozo", "formato_generado"]),
+    }
+
     def __init__(self, audit_service=None, cementation_service=None, compliance_service=None):
         self.audit_service = audit_service
         self.cementation_svc = cementation_service
@@ -27,31 +38,32 @@ class ClosureService:
             os.path.dirname(__file__), "closure_mock_data.json"
         )
         self._mock_data = None
+        self._doc = None
 
     # ─── Mock Data Access ───────────────────────────────────────
 
     def _load_mock_data(self):
         if self._mock_data is None:
-            if os.path.exists(self.mock_data_path):
-                with open(self.mock_data_path, "r", encoding="utf-8") as f:
-                    self._mock_data = json.load(f)
-            else:
-                self._mock_data = {
-                    "documentos_evidencia": [], "certificaciones": [],
-                    "cierres": [], "checklists": [], "exportaciones": [],
-                }
+            self._mock_data = self._local_doc().load()
         return self._mock_data
 
+    def _local_doc(self):
+        # Store local SQLite; el JSON de mock_data_path sólo se importa como semilla
+        if self._doc is None:
+            self._doc = LocalDocument(self.LOCAL_NAMESPACE, self.LOCAL_SCHEMA, seed_path=self.mock_data_path)
+        return self._doc
+
     def _save_mock_data(self):
-        with open(self.mock_data_path, "w", encoding="utf-8") as f:
-            json.dump(self._mock_data, f, indent=4, default=str, ensure_ascii=False)
+        self._local_doc().save(self._mock_data)
 
     # ─── Documentos de Evidencia ────────────────────────────────
 
     def get_documentos(self, pozo_id):
-        data = self._load_mock_data()
-        return [d for d in data["documentos_evidencia"]
-                if d["id_pozo"] == pozo_id and d["estado"] == "ACTIVO"]
+        if self._mock_data is None:
+            documentos = self._local_doc().find("documentos_evidencia", id_pozo=pozo_id)
+        else:
+            documentos = [d for d in self._mock_data["documentos_evidencia"] if d["id_pozo"] == pozo_id]
+        return [d for d in documentos if d["estado"] == "ACTIVO"]
 
     def get_certificacion(self, doc_id):
         data = self._load_mock_data()
@@ -70,6 +82,9 @@ class ClosureService:
     # ─── Cierre Técnico ────────────────────────────────────────
 
     def get_cierre(self, pozo_id):
+        if self._mock_data is None:
+            cierres = self._local_doc().find("cierres", id_pozo=pozo_id)
+            return cierres[0] if cierres else None
         data = self._load_mock_data()
         for c in data["cierres"]:
             if c["id_pozo"] == pozo_id:
@@ -110,6 +125,8 @@ class ClosureService:
                 "validado_por": None,
                 "fecha_validacion": None,
             })
+        self._local_doc().mark("cierres", cierre)
+        self._local_doc().mark("checklists", *data["checklists"][-len(self.ITEMS_OBLIGATORIOS):])
 
         self._save_mock_data()
 
@@ -229,6 +246,8 @@ class ClosureService:
         elif items_pendientes:
             cierre["estado_cierre"] = "EN_PROCESO"
 
+        self._local_doc().mark("checklists", *checklist)
+        self._local_doc().mark("cierres", cierre)
         self._save_mock_data()
         return checklist, tiene_bloqueo, None
 
@@ -254,6 +273,7 @@ class ClosureService:
         cierre["dictamen_final"] = dictamen
         cierre["hash_consolidado"] = hash_consolidado
 
+        self._local_doc().mark("cierres", cierre)
         self._save_mock_data()
 
         if self.audit_service:
@@ -382,5 +402,6 @@ class ClosureService:
             "generado_por_sistema": "PNA_SYSTEM",
         }
         data["exportaciones"].append(exp)
+        self._local_doc().mark("exportaciones", exp)
         self._save_mock_data()
         return exp
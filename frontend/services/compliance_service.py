@@ -1,7 +1,7 @@
-import json
 import os
 from datetime import datetime
 from .database_service import DatabaseService
+from .local_store import LocalDocument
 
 
 class ComplianceService:
@@ -11,6 +11,16 @@ class ComplianceService:
     NO controla estados del workflow — solo valida y reporta.
     """
 
+    # Colecciones del store local: (clave primaria, columnas indexadas)
+    LOCAL_NAMESPACE = "cumplimiento"
+    LOCAL_SCHEMA = {
+        "jurisdicciones": ("jurisdiccion_id", ["pais"]),
+        "versiones_regulacion": ("version_regulacion_id", ["jurisdiccion_id", "estado"]),
+        "reglas_regulatorias": ("regla_regulatoria_id", ["version_regulacion_id"]),
+        "asignaciones": ("asignacion_regulacion_pozo_id", ["pozo_id", "version_regulacion_id"]),
+        "resultados": ("resultado_cumplimiento_id", ["pozo_id", "estado"]),
+    }
+
     def __init__(self, db_service=None, audit_service=None):
         self.db = db_service or DatabaseService()
         self.audit_service = audit_service
@@ -18,27 +28,23 @@ class ComplianceService:
             os.path.dirname(__file__), "compliance_mock_data.json"
         )
         self._mock_data = None
+        self._doc = None
 
     # ─── Mock Data Access ───────────────────────────────────────
 
     def _load_mock_data(self):
         if self._mock_data is None:
-            if os.path.exists(self.mock_data_path):
-                with open(self.mock_data_path, "r", encoding="utf-8") as f:
-                    self._mock_data = json.load(f)
-            else:
-                self._mock_data = {
-                    "jurisdicciones": [],
-                    "versiones_regulacion": [],
-                    "reglas_regulatorias": [],
-                    "asignaciones": [],
-                    "resultados": [],
-                }
+            self._mock_data = self._local_doc().load()
         return self._mock_data
 
+    def _local_doc(self):
+        # Store local SQLite; el JSON de mock_data_path sólo se importa como semilla
+        if self._doc is None:
+            self._doc = LocalDocument(self.LOCAL_NAMESPACE, self.LOCAL_SCHEMA, seed_path=self.mock_data_path)
+        return self._doc
+
     def _save_mock_data(self):
-        with open(self.mock_data_path, "w", encoding="utf-8") as f:
-            json.dump(self._mock_data, f, indent=4, default=str, ensure_ascii=False)
+        self._local_doc().save(self._mock_data)
 
     # ─── Jurisdicciones ────────────────────────────────────────
 
@@ -53,6 +59,7 @@ class ComplianceService:
             for i, j in enumerate(data["jurisdicciones"]):
                 if j["jurisdiccion_id"] == juris_data["jurisdiccion_id"]:
                     data["jurisdicciones"][i] = {**j, **juris_data}
+                    self._local_doc().mark("jurisdicciones", data["jurisdicciones"][i])
                     self._save_mock_data()
                     return data["jurisdicciones"][i]
         else:
@@ -61,6 +68,7 @@ class ComplianceService:
             juris_data["jurisdiccion_id"] = new_id
             juris_data["activo"] = "S"
             data["jurisdicciones"].append(juris_data)
+            self._local_doc().mark("jurisdicciones", juris_data)
             self._save_mock_data()
             return juris_data
 
@@ -85,6 +93,7 @@ class ComplianceService:
             for i, v in enumerate(data["versiones_regulacion"]):
                 if v["version_regulacion_id"] == version_data["version_regulacion_id"]:
                     data["versiones_regulacion"][i] = {**v, **version_data}
+                    self._local_doc().mark("versiones_regulacion", data["versiones_regulacion"][i])
                     self._save_mock_data()
                     return data["versiones_regulacion"][i]
         else:
@@ -93,6 +102,7 @@ class ComplianceService:
             version_data["version_regulacion_id"] = new_id
             version_data["creado_en"] = datetime.now().isoformat()
             data["versiones_regulacion"].append(version_data)
+            self._local_doc().mark("versiones_regulacion", version_data)
             self._save_mock_data()
             return version_data
 
@@ -114,6 +124,7 @@ class ComplianceService:
             for i, r in enumerate(data["reglas_regulatorias"]):
                 if r["regla_regulatoria_id"] == regla_data["regla_regulatoria_id"]:
                     data["reglas_regulatorias"][i] = {**r, **regla_data}
+                    self._local_doc().mark("reglas_regulatorias", data["reglas_regulatorias"][i])
                     self._save_mock_data()
                     return data["reglas_regulatorias"][i]
         else:
@@ -121,6 +132,7 @@ class ComplianceService:
             new_id = max((r["regla_regulatoria_id"] for r in data["reglas_regulatorias"]), default=0) + 1
             regla_data["regla_regulatoria_id"] = new_id
             data["reglas_regulatorias"].append(regla_data)
+            self._local_doc().mark("reglas_regulatorias", regla_data)
             self._save_mock_data()
             return regla_data
 
@@ -343,6 +355,7 @@ class ComplianceService:
                 r["motivo_override"] = motivo
                 r["usuario_override"] = user_id
                 r["vencimiento_override"] = str(vencimiento)
+                self._local_doc().mark("resultados", r)
                 self._save_mock_data()
 
                 # Registrar en auditoría
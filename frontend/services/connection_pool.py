@@ -0,0 +1,173 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL por proceso, compartido por todas las sesiones de Streamlit.
+    Las conexiones libres se reutilizan en orden LIFO (la más caliente primero);
+    al retirarlas se validan con ping si estuvieron ociosas más de health_check_interval
+    y se cierran las que superan idle_timeout. Si el pool está lleno, acquire espera
+    hasta checkout_timeout y retorna None, igual que una conexión no disponible.
+    Un proceso hijo creado con fork no hereda los pools: los sockets son del padre.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def _reset_after_fork(cls):
+        # El lock pudo quedar tomado por un hilo del padre que no existe en el hijo
+        cls._instances = {}
+        cls._instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db, **kwargs):
+        """Retorna el pool del proceso para la configuración de conexión de db."""
+        key = (os.getpid(), db.host, db.port, db.user, db.db_name)
+        with cls._instances_lock:
+            pool = cls._instances.get(key)
+            if pool is None:
+                pool = cls(db._get_connection, **kwargs)
+                cls._instances[key] = pool
+            return pool
+
+    def __init__(self, factory, max_size=10, idle_timeout=300.0,
+                 health_check_interval=30.0, checkout_timeout=5.0):
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self._pid = os.getpid()
+
+        self._idle = deque()  # (conexión, última devolución); derecha = más reciente
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "evicted": 0,
+            "health_check_failures": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+        atexit.register(self.close)
+
+    def acquire(self):
+        """Retira una conexión sana del pool (o crea una nueva); None si no hay conexión posible."""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            conn = None
+            idle_for = 0.0
+            with self._cond:
+                while True:
+                    self._evict_idle()
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        idle_for = time.monotonic() - last_used
+                        break
+                    if self._size < self.max_size:
+                        # Se reserva el lugar; el handshake se hace fuera del lock
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        return None
+                    self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                conn = self._factory()
+                with self._cond:
+                    if conn is None:
+                        self._size -= 1
+                        self._cond.notify()
+                        return None
+                    self._stats["created"] += 1
+                return conn
+
+            if idle_for < self.health_check_interval or self._is_healthy(conn):
+                with self._cond:
+                    self._stats["reused"] += 1
+                return conn
+
+            # Conexión muerta (wait_timeout del servidor, reinicio): se descarta y se reintenta
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            self._discard(conn)
+
+    def release(self, conn, discard=False):
+        """Devuelve una conexión al pool; discard=True la cierra (p. ej. tras un error de red)."""
+        if not discard and getattr(conn, "open", True):
+            with self._cond:
+                if not self._closed:
+                    self._idle.append((conn, time.monotonic()))
+                    self._cond.notify()
+                    return
+        # Pedido explícito, conexión ya cerrada o pool cerrado con la conexión en uso
+        self._discard(conn)
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self):
+        # Llamado con el lock tomado; la izquierda del deque es la conexión más antigua
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats["evicted"] += 1
+            self._close_quietly(conn)
+
+    def metrics(self):
+        """Estado y contadores del pool para monitoreo."""
+        with self._cond:
+            self._evict_idle()
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                **self._stats,
+            }
+
+    def close(self):
+        """Cierra las conexiones libres; las que están en uso se cierran al devolverse."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        if os.getpid() != self._pid:
+            # Pool heredado por fork: cerrar enviaría QUIT por los sockets que sigue usando el padre
+            return
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=ConnectionPool._reset_after_fork)
@@ -1,10 +1,75 @@
 import pymysql
 import os
-import streamlit as st
+import re
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from .circuit_breaker import CircuitBreaker
+from .connection_pool import ConnectionPool
+from .query_stats import query_stats
 
 load_dotenv()
 
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Fallos de red/servidor: descartan la conexión y alimentan al circuit breaker
+NETWORK_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+
+def build_insert(table, columns, row_count, replace=False):
+    """INSERT (o REPLACE) multi-fila con placeholders para row_count filas."""
+    for name in [table, *columns]:
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Identificador SQL inválido: {name}")
+    verb = "REPLACE" if replace else "INSERT"
+    row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    cols = ", ".join(f"`{c}`" for c in columns)
+    return f"{verb} INTO `{table}` ({cols}) VALUES " + ", ".join([row] * row_count)
+
+
+def _insert_rows(cursor, table, columns, rows, replace=False, chunk_size=500):
+    total = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        params = [value for row in chunk for value in row]
+        query = build_insert(table, columns, len(chunk), replace=replace)
+        with query_stats.track(query) as timer:
+            cursor.execute(query, params)
+            timer.rows = cursor.rowcount
+        total += cursor.rowcount
+    return total
+
+
+class DatabaseBatch:
+    """
+    Sentencias agrupadas en una única transacción sobre una conexión del pool.
+    Se obtiene con DatabaseService.batch(); confirma al salir del bloque y
+    revierte todo si ocurre una excepción.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        with query_stats.track(query) as timer:
+            self.cursor.execute(query, params)
+            timer.rows = self.cursor.rowcount
+        self.rowcount += self.cursor.rowcount
+        return self.cursor.rowcount
+
+    def execute_many(self, query, params_seq):
+        # pymysql reescribe un INSERT ... VALUES como un INSERT multi-fila
+        with query_stats.track(query) as timer:
+            self.cursor.executemany(query, list(params_seq))
+            timer.rows = self.cursor.rowcount
+        self.rowcount += self.cursor.rowcount
+        return self.cursor.rowcount
+
+    def insert_many(self, table, columns, rows, replace=False, chunk_size=500):
+        count = _insert_rows(self.cursor, table, columns, list(rows), replace=replace, chunk_size=chunk_size)
+        self.rowcount += count
+        return count
+
+
 class DatabaseService:
     """Servicio para interactuar con la base de datos MySQL de forma síncrona."""
     
@@ -15,6 +80,11 @@ class DatabaseService:
         self.user = os.getenv("MYSQL_USER", "pna_user")
         self.password = os.getenv("MYSQL_PASSWORD", "pna_pass")
         self.db_name = os.getenv("MYSQL_DATABASE", "pna_system")
+        # Pool de conexiones compartido por todas las sesiones del proceso
+        self.pool_size = int(os.getenv("MYSQL_POOL_SIZE", 10))
+        self.pool_idle_timeout = float(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", 300))
+        # Segundos que el circuito queda abierto antes de volver a probar MySQL
+        self.breaker_reset_timeout = float(os.getenv("MYSQL_BREAKER_RESET_TIMEOUT", 15))
 
     def _get_connection(self):
         try:
@@ -29,45 +99,218 @@ class DatabaseService:
                 connect_timeout=2 # Quick fail
             )
         except Exception:
+            # Servidor inalcanzable: el circuito se abre y los servicios pasan a mock
+            self._breaker().trip()
             return None
 
-    @st.cache_data(ttl=10, show_spinner=False) # Validar disponibilidad cada 10 seg
-    def is_available(_self):
-        conn = _self._get_connection()
-        if conn:
-            conn.close()
+    def _breaker(self):
+        return CircuitBreaker.for_database(self, reset_timeout=self.breaker_reset_timeout)
+
+    def _pool(self):
+        return ConnectionPool.for_database(
+            self, max_size=self.pool_size, idle_timeout=self.pool_idle_timeout
+        )
+
+    @contextmanager
+    def connection(self):
+        """
+        Conexión del pool del proceso (None si MySQL no está disponible).
+        Con el circuito abierto retorna None sin intentar conectar. Se devuelve al
+        pool al salir; si la conexión falló a nivel de red se descarta y el fallo
+        alimenta al circuit breaker. Si el bloque termina sin resultado (generador
+        abandonado, GeneratorExit) se libera la prueba de HALF_OPEN.
+        """
+        breaker = self._breaker()
+        if not breaker.allow_request():
+            yield None
+            return
+        pool = self._pool()
+        conn = pool.acquire()
+        if conn is None:
+            # Un fallo de conexión ya abrió el circuito; si fue saturación del pool, se libera la prueba
+            breaker.abandon_probe()
+            yield None
+            return
+        discard = False
+        recorded = False
+        try:
+            yield conn
+        except NETWORK_ERRORS:
+            discard = True
+            recorded = True
+            breaker.record_failure()
+            raise
+        except Exception:
+            # Error de SQL o de datos: el servidor respondió
+            recorded = True
+            breaker.record_success()
+            raise
+        else:
+            recorded = True
+            breaker.record_success()
+        finally:
+            if not recorded:
+                # Sin resultado: si era la prueba de HALF_OPEN, el circuito no queda trabado
+                breaker.abandon_probe()
+            pool.release(conn, discard=discard)
+
+    def pool_metrics(self):
+        return {**self._pool().metrics(), "breaker": self._breaker().status()}
+
+    @staticmethod
+    def query_stats():
+        """Estadísticas de consultas del proceso (p50/p95/p99 por sentencia normalizada)."""
+        return query_stats.snapshot()
+
+    @staticmethod
+    def slow_queries():
+        return query_stats.slow_queries()
+
+    def is_available(self):
+        """
+        Disponibilidad según el circuit breaker, sin conexiones de prueba periódicas.
+        Con el circuito cerrado responde al instante; en HALF_OPEN una única llamada
+        verifica con un ping sobre una conexión real del pool.
+        """
+        if self._breaker().state == CircuitBreaker.CLOSED:
             return True
-        return False
+        try:
+            with self.connection() as conn:
+                if conn is None:
+                    return False
+                conn.ping(reconnect=False)
+                return True
+        except Exception:
+            return False
 
     def fetch_all(self, query, params=None):
-        conn = self._get_connection()
-        if not conn:
-            return []
+        """Filas del resultado; [] si MySQL no está disponible o se cae durante la consulta."""
         try:
-            with conn.cursor() as cursor:
-                cursor.execute(query, params)
-                return cursor.fetchall()
-        finally:
-            conn.close()
+            with self.connection() as conn:
+                if not conn:
+                    return []
+                with conn.cursor() as cursor, query_stats.track(query) as timer:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+                    timer.rows = len(rows)
+                    return rows
+        except NETWORK_ERRORS:
+            # El fallo ya alimentó al breaker: se degrada igual que sin conexión
+            return []
 
     def fetch_one(self, query, params=None):
-        conn = self._get_connection()
-        if not conn:
-            return None
+        """Primera fila; None si MySQL no está disponible o se cae durante la consulta."""
         try:
-            with conn.cursor() as cursor:
-                cursor.execute(query, params)
-                return cursor.fetchone()
-        finally:
-            conn.close()
+            with self.connection() as conn:
+                if not conn:
+                    return None
+                with conn.cursor() as cursor, query_stats.track(query) as timer:
+                    cursor.execute(query, params)
+                    row = cursor.fetchone()
+                    timer.rows = 1 if row else 0
+                    return row
+        except NETWORK_ERRORS:
+            return None
 
     def execute(self, query, params=None):
-        conn = self._get_connection()
-        if not conn:
-            return 0
-        try:
-            with conn.cursor() as cursor:
+        with self.connection() as conn:
+            if not conn:
+                return 0
+            with conn.cursor() as cursor, query_stats.track(query) as timer:
                 cursor.execute(query, params)
+                timer.rows = cursor.rowcount
                 return cursor.rowcount
-        finally:
-            conn.close()
+
+    def fetch_iter(self, query, params=None, chunk_size=1000, chunks=False):
+        """
+        Generador de filas con cursor del lado del servidor (SSDictCursor): el
+        resultado se lee de a chunk_size filas y nunca se materializa completo.
+        chunks=True entrega listas de hasta chunk_size filas en lugar de filas sueltas.
+        Si el consumidor abandona la iteración, la conexión (con filas sin leer) se descarta.
+        Una caída de MySQL antes de la primera fila se trata como sin conexión (no
+        entrega filas); a mitad del resultado se propaga, para no truncarlo en silencio.
+        """
+        started = False
+        try:
+            with self.connection() as conn:
+                if not conn:
+                    return
+                completed = False
+                try:
+                    with conn.cursor(pymysql.cursors.SSDictCursor) as cursor, \
+                            query_stats.track(query) as timer:
+                        timer.rows = 0
+                        cursor.execute(query, params)
+                        while True:
+                            rows = cursor.fetchmany(chunk_size)
+                            if not rows:
+                                break
+                            started = True
+                            timer.rows += len(rows)
+                            # Sólo se mide el tiempo en MySQL, no el del consumidor
+                            timer.pause()
+                            if chunks:
+                                yield rows
+                            else:
+                                yield from rows
+                            timer.resume()
+                        completed = True
+                finally:
+                    if not completed:
+                        # Protocolo a mitad de un resultado: no puede volver al pool
+                        try:
+                            conn.close()
+                        except Exception:
+                            pass
+        except NETWORK_ERRORS:
+            if started:
+                raise
+
+    # ─── Escrituras Agrupadas ───────────────────────────────────
+
+    @contextmanager
+    def batch(self):
+        """
+        Transacción explícita: todas las sentencias del bloque viajan por la misma
+        conexión y se confirman con un único COMMIT. Retorna None si MySQL no está disponible.
+
+            with db.batch() as b:
+                if b:
+                    b.insert_many("tbl", ["a", "b"], filas)
+                    b.execute("UPDATE ...", params)
+        """
+        with self.connection() as conn:
+            if not conn:
+                yield None
+                return
+            conn.begin()
+            try:
+                with conn.cursor() as cursor:
+                    yield DatabaseBatch(cursor)
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+
+    def execute_many(self, query, params_seq):
+        """Ejecuta la misma sentencia para cada juego de parámetros en una transacción."""
+        with self.batch() as b:
+            if not b:
+                return 0
+            return b.execute_many(query, params_seq)
+
+    def insert_many(self, table, columns, rows, replace=False, chunk_size=500):
+        """
+        INSERT multi-fila (REPLACE con replace=True) de rows en chunks de chunk_size,
+        todo dentro de una transacción. Retorna las filas afectadas.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self.batch() as b:
+            if not b:
+                return 0
+            return b.insert_many(table, columns, rows, replace=replace, chunk_size=chunk_size)
@@ -1,3 +1,4 @@
+import csv
 import hashlib
 import json
 import os
@@ -6,6 +7,28 @@ from xml.etree.ElementTree import Element, SubElement, tostring
 from xml.dom.minidom import parseString
 
 
+AUDIT_EXPORT_COLUMNS = [
+    "id", "timestamp_utc", "id_usuario", "rol_usuario", "tipo_evento", "entidad", "entidad_id",
+    "estado_anterior", "estado_nuevo", "metadata", "ip_origen", "hash_previo", "hash_evento",
+]
+
+
+class _HashingWriter:
+    """Escribe texto a un archivo binario actualizando el SHA256 de lo escrito."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.sha256 = hashlib.sha256()
+        self.bytes_written = 0
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.sha256.update(data)
+        self.fh.write(data)
+        self.bytes_written += len(data)
+        return len(text)
+
+
 class ExportService:
     """
     Servicio de Exportación Regulatoria.
@@ -239,3 +262,71 @@ class ExportService:
         dossier = self._build_dossier_data(pozo_id)
         encoded = json.dumps(dossier, sort_keys=True, default=str).encode("utf-8")
         return hashlib.sha256(encoded).hexdigest()
+
+    # ─── Extracto del Log de Auditoría ─────────────────────────
+
+    def exportar_audit_log(self, audit_service, formato="JSONL", since=None, until=None):
+        """
+        Extracto completo del log de auditoría en JSONL o CSV, en streaming:
+        los eventos se leen con audit_service.iter_events y se escriben uno a uno,
+        así la memoria no depende del tamaño del log. El SHA256 se calcula a
+        medida que se escribe y se guarda en un manifiesto junto al archivo.
+        Retorna (filepath, manifiesto).
+        """
+        formato = formato.upper()
+        if formato not in ("JSONL", "CSV"):
+            raise ValueError(f"Formato de extracto no soportado: {formato}")
+
+        filename = f"audit_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato.lower()}"
+        filepath = os.path.join(self.export_path, filename)
+        tmp_path = filepath + ".tmp"
+
+        count = 0
+        first_event = last_event = None
+        with open(tmp_path, "wb") as fh:
+            out = _HashingWriter(fh)
+            if formato == "CSV":
+                writer = csv.writer(out, lineterminator="\n")
+                writer.writerow(AUDIT_EXPORT_COLUMNS)
+            for ev in audit_service.iter_events(since=since, until=until):
+                if formato == "CSV":
+                    writer.writerow([self._audit_csv_value(ev.get(col)) for col in AUDIT_EXPORT_COLUMNS])
+                else:
+                    out.write(json.dumps(ev, default=str, ensure_ascii=False) + "\n")
+                if first_event is None:
+                    first_event = ev
+                last_event = ev
+                count += 1
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, filepath)
+
+        manifest = {
+            "archivo": filename,
+            "formato": formato,
+            "generado_utc": datetime.utcnow().isoformat(),
+            "desde": str(since) if since is not None else None,
+            "hasta": str(until) if until is not None else None,
+            "eventos": count,
+            "bytes": out.bytes_written,
+            "sha256": out.sha256.hexdigest(),
+            # Extremos de la cadena: el extracto es verificable como tramo contiguo
+            "primer_id": first_event["id"] if first_event else None,
+            "hash_previo_inicial": first_event["hash_previo"] if first_event else None,
+            "ultimo_id": last_event["id"] if last_event else None,
+            "hash_evento_final": last_event["hash_evento"] if last_event else None,
+        }
+        with open(filepath + ".manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        return filepath, manifest
+
+    @staticmethod
+    def _audit_csv_value(value):
+        if value is None:
+            return ""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, sort_keys=True, default=str)
+        return value
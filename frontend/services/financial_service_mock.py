@@ -3,7 +3,6 @@ Financial Service Mock - Módulo Financiero INTEGRADO
 Integración con sistema operativo (MockApiClient)
 """
 
-import json
 import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
@@ -11,30 +10,102 @@ import pandas as pd
 # Importar servicio operativo para integración
 try:
     from .mock_api_client import MockApiClient
+    from .partitioned_store import LazyCollection, PartitionedStore
 except ImportError:
     # Fallback para cuando se ejecuta standalone
     import sys
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from mock_api_client import MockApiClient
+    from partitioned_store import LazyCollection, PartitionedStore
+
+
+def _serialize_dates(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    elif isinstance(obj, dict):
+        return {k: _serialize_dates(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_serialize_dates(item) for item in obj]
+    return obj
+
+
+def _deserialize_dates(obj):
+    # Inversa de _serialize_dates para los campos FECHA_* / fecha de los segmentos
+    if isinstance(obj, dict):
+        return {
+            k: datetime.fromisoformat(v) if isinstance(v, str) and k.upper().startswith('FECHA')
+            else _deserialize_dates(v)
+            for k, v in obj.items()
+        }
+    elif isinstance(obj, list):
+        return [_deserialize_dates(item) for item in obj]
+    return obj
+
+
+def _seeded(collection, empty=list):
+    return LazyCollection(collection, lambda self: self._mock_seed(collection),
+                          empty=empty, decode=_deserialize_dates)
 
 
 class FinancialServiceMock:
     """Servicio financiero integrado con operaciones"""
+
+    # Colecciones del dominio "finanzas", cada una en su propio segmento
+    PERSISTED_COLLECTIONS = ('contratos', 'certificaciones', 'facturas', 'cobranzas',
+                             'costos_reales', 'parametros_macro')
+
+    # Se leen del segmento en el primer acceso; sin segmento se genera la semilla mock
+    contratos = _seeded('contratos')
+    certificaciones = _seeded('certificaciones')
+    facturas = _seeded('facturas')
+    cobranzas = _seeded('cobranzas')
+    costos_reales = _seeded('costos_reales')
+    parametros_macro = _seeded('parametros_macro', empty=dict)
     
     def __init__(self, persistence_file: str = "frontend/services/persistence_db.json"):
+        # persistence_file sólo se lee una vez para migrar al almacenamiento particionado
         self.persistence_file = persistence_file
+        self._partitions = PartitionedStore.open(
+            "finanzas", self.PERSISTED_COLLECTIONS, legacy_path=persistence_file
+        )
         self.api_client = MockApiClient()  # Conexión con operaciones
-        
-        # Datos específicos de finanzas (mantenemos separados)
-        self.contratos: List[Dict] = []
-        self.certificaciones: List[Dict] = []
-        self.facturas: List[Dict] = []
-        self.cobranzas: List[Dict] = []
-        self.costos_reales: List[Dict] = []
-        self.parametros_macro: Dict = {}
-        
-        # Cargar datos iniciales
-        self._init_mock_data()
+        self._seed = None
+        self._init_contrato_pozos()
+
+    def _init_contrato_pozos(self):
+        """Tabla normalizada contrato-pozos (tbl_contrato_pozos); reemplaza el campo array pozos_asignados"""
+        base_date = datetime(2025, 1, 15)
+        self.contrato_pozos = [
+            # Contrato 1 - SureOil
+            {'id': 1, 'contrato_id': 1, 'pozo_id': 'X-123', 'fecha_asignacion': base_date, 'estado': 'ACTIVO'},
+            {'id': 2, 'contrato_id': 1, 'pozo_id': 'A-321', 'fecha_asignacion': base_date, 'estado': 'ACTIVO'},
+            {'id': 3, 'contrato_id': 1, 'pozo_id': 'Z-789', 'fecha_asignacion': base_date, 'estado': 'ACTIVO'},
+            {'id': 4, 'contrato_id': 1, 'pozo_id': 'M-555', 'fecha_asignacion': base_date, 'estado': 'ACTIVO'},
+            # Contrato 2 - YPF
+            {'id': 5, 'contrato_id': 2, 'pozo_id': 'P-001', 'fecha_asignacion': base_date - timedelta(days=30), 'estado': 'ACTIVO'},
+            {'id': 6, 'contrato_id': 2, 'pozo_id': 'P-002', 'fecha_asignacion': base_date - timedelta(days=30), 'estado': 'ACTIVO'},
+            {'id': 7, 'contrato_id': 2, 'pozo_id': 'H-101', 'fecha_asignacion': base_date - timedelta(days=30), 'estado': 'ACTIVO'},
+            # Contrato 3 - Petrobras
+            {'id': 8, 'contrato_id': 3, 'pozo_id': 'H-102', 'fecha_asignacion': base_date + timedelta(days=15), 'estado': 'ACTIVO'},
+            {'id': 9, 'contrato_id': 3, 'pozo_id': 'T-201', 'fecha_asignacion': base_date + timedelta(days=15), 'estado': 'ACTIVO'},
+            {'id': 10, 'contrato_id': 3, 'pozo_id': 'C-301', 'fecha_asignacion': base_date + timedelta(days=15), 'estado': 'ACTIVO'},
+        ]
+
+    def _mock_seed(self, collection):
+        """
+        Semilla mock de una colección que no tiene segmento. _init_mock_data genera todas
+        juntas (las facturas salen de las certificaciones) una sola vez; las colecciones
+        ya leídas del disco no se pisan y sólo se persiste la que se sembró.
+        """
+        if self._seed is None:
+            loaded = {name: self.__dict__.pop(name) for name in self.PERSISTED_COLLECTIONS
+                      if name in self.__dict__}
+            self._init_mock_data()
+            self._seed = {name: self.__dict__.pop(name) for name in self.PERSISTED_COLLECTIONS}
+            self.__dict__.update(loaded)
+        self.__dict__[collection] = self._seed[collection]
+        self._persist_data(collection)
+        return self._seed[collection]
     
     def _init_mock_data(self):
         """Inicializa datos financieros (pozos vienen de operaciones)"""
@@ -92,26 +163,6 @@ class FinancialServiceMock:
             }
         ]
         
-        # ==========================================
-        # TABLA NORMALIZADA: CONTRATO-POZOS (tbl_contrato_pozos)
-        # Reemplaza el campo array pozos_asignados
-        # ==========================================
-        self.contrato_pozos = [
-            # Contrato 1 - SureOil
-            {'id': 1, 'contrato_id': 1, 'pozo_id': 'X-123', 'fecha_asignacion': base_date, 'estado': 'ACTIVO'},
-            {'id': 2, 'contrato_id': 1, 'pozo_id': 'A-321', 'fecha_asignacion': base_date, 'estado': 'ACTIVO'},
-            {'id': 3, 'contrato_id': 1, 'pozo_id': 'Z-789', 'fecha_asignacion': base_date, 'estado': 'ACTIVO'},
-            {'id': 4, 'contrato_id': 1, 'pozo_id': 'M-555', 'fecha_asignacion': base_date, 'estado': 'ACTIVO'},
-            # Contrato 2 - YPF
-            {'id': 5, 'contrato_id': 2, 'pozo_id': 'P-001', 'fecha_asignacion': base_date - timedelta(days=30), 'estado': 'ACTIVO'},
-            {'id': 6, 'contrato_id': 2, 'pozo_id': 'P-002', 'fecha_asignacion': base_date - timedelta(days=30), 'estado': 'ACTIVO'},
-            {'id': 7, 'contrato_id': 2, 'pozo_id': 'H-101', 'fecha_asignacion': base_date - timedelta(days=30), 'estado': 'ACTIVO'},
-            # Contrato 3 - Petrobras
-            {'id': 8, 'contrato_id': 3, 'pozo_id': 'H-102', 'fecha_asignacion': base_date + timedelta(days=15), 'estado': 'ACTIVO'},
-            {'id': 9, 'contrato_id': 3, 'pozo_id': 'T-201', 'fecha_asignacion': base_date + timedelta(days=15), 'estado': 'ACTIVO'},
-            {'id': 10, 'contrato_id': 3, 'pozo_id': 'C-301', 'fecha_asignacion': base_date + timedelta(days=15), 'estado': 'ACTIVO'},
-        ]
-        
         # ==========================================
         # CERTIFICACIONES (3)
         # ==========================================
@@ -218,8 +269,6 @@ class FinancialServiceMock:
             'INFLACION_ANUAL': {'valor': 25.50, 'unidad': '%', 'fecha': base_date},
             'TASA_INTERES': {'valor': 45.00, 'unidad': '%', 'fecha': base_date},
         }
-        
-        self._persist_data()
     
     # ==========================================
     # INTEGRACIÓN CON OPERACIONES
@@ -364,7 +413,7 @@ class FinancialServiceMock:
         contrato['total_certificaciones'] += 1
         
         # Persistir
-        self._persist_data()
+        self._persist_data('certificaciones', 'facturas', 'contratos')
         
         return {
             'certificacion': nueva_cert,
@@ -387,32 +436,12 @@ class FinancialServiceMock:
     # MÉTODOS EXISTENTES (mantenidos)
     # ==========================================
     
-    def _persist_data(self):
-        """Guarda datos financieros en persistencia"""
-        data = {
-            'contratos': self.contratos,
-            'certificaciones': self.certificaciones,
-            'facturas': self.facturas,
-            'cobranzas': self.cobranzas,
-            'costos_reales': self.costos_reales,
-            'parametros_macro': self.parametros_macro,
-            'last_updated': datetime.now().isoformat()
-        }
-        
-        def serialize_dates(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            elif isinstance(obj, dict):
-                return {k: serialize_dates(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [serialize_dates(item) for item in obj]
-            return obj
-        
-        data = serialize_dates(data)
-        
-        os.makedirs(os.path.dirname(self.persistence_file), exist_ok=True)
-        with open(self.persistence_file, 'w') as f:
-            json.dump(data, f, indent=2)
+    def _persist_data(self, *collections):
+        """Guarda en persistencia las colecciones financieras dadas (por defecto, todas)"""
+        for collection in collections or self.PERSISTED_COLLECTIONS:
+            self._partitions.save(
+                collection, lambda collection=collection: _serialize_dates(getattr(self, collection))
+            )
     
     def get_contratos(self) -> List[Dict]:
         """Retorna lista de contratos"""
@@ -542,7 +571,7 @@ class FinancialServiceMock:
         
         self.cobranzas.append(nueva_cobranza)
         factura['ESTADO'] = 'COBRADA'
-        self._persist_data()
+        self._persist_data('cobranzas', 'facturas')
         
         return nueva_cobranza
 
@@ -0,0 +1,147 @@
+import math
+
+try:
+    # Viene con pandas; sin NumPy se usa la misma fórmula en Python puro
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+EARTH_RADIUS_KM = 6371.0088
+# Velocidad media de un transporte en caminos de yacimiento (ripio), para estimar ETA
+DEFAULT_SPEED_KMH = 30.0
+DEFAULT_CELL_DEG = 0.25
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distancia de gran círculo en km entre dos puntos (grados decimales)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_matrix(origins, targets):
+    """
+    Matriz de distancias en km: una fila por origen y una columna por destino,
+    ambos como secuencias de (lat, lon). Con NumPy se calcula en una sola
+    operación vectorizada.
+    """
+    if not origins or not targets:
+        return [[] for _ in origins]
+    if NUMPY_AVAILABLE:
+        o = np.radians(np.asarray(origins, dtype=float))
+        t = np.radians(np.asarray(targets, dtype=float))
+        lat1, lon1 = o[:, 0:1], o[:, 1:2]
+        lat2, lon2 = t[:, 0], t[:, 1]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return (2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))).tolist()
+    return [[haversine_km(lat1, lon1, lat2, lon2) for lat2, lon2 in targets] for lat1, lon1 in origins]
+
+
+def eta_minutes(distance_km, speed_kmh=DEFAULT_SPEED_KMH):
+    """ETA en minutos enteros para una distancia y velocidad media."""
+    return int(math.ceil(distance_km / speed_kmh * 60))
+
+
+class WellGeoIndex:
+    """
+    Índice espacial de pozos sobre una grilla de celdas de cell_deg grados
+    (lat, lon). Las consultas por radio sólo miden los pozos de las celdas que
+    cubre el bounding box del círculo; el pozo más cercano se busca en anillos
+    de celdas crecientes alrededor del punto y se confirma con una consulta por
+    radio. Los pozos sin coordenadas quedan fuera del índice.
+    """
+
+    def __init__(self, wells, cell_deg=DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._lon_cells = int(math.ceil(360 / cell_deg))
+        self.ids = []
+        self.coords = []
+        self._cells = {}
+        for well in wells:
+            lat, lon = well.get('lat'), well.get('lon')
+            if lat is None or lon is None:
+                continue
+            pos = len(self.ids)
+            self.ids.append(well['id'])
+            self.coords.append((float(lat), float(lon)))
+            self._cells.setdefault(self._cell(lat, lon), []).append(pos)
+
+    def _cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_deg)),
+                int(math.floor((lon + 180) / self.cell_deg)) % self._lon_cells)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _distances(self, lat, lon, positions):
+        targets = [self.coords[pos] for pos in positions]
+        return haversine_matrix([(lat, lon)], targets)[0]
+
+    def _candidates_in_box(self, lat, lon, radius_km):
+        """Posiciones de los pozos en las celdas que cubre el bounding box del radio."""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        lat_min, lat_max = lat - dlat, lat + dlat
+        sin_ratio = math.sin(radius_km / EARTH_RADIUS_KM) / max(math.cos(math.radians(lat)), 1e-12)
+        if lat_min <= -90 or lat_max >= 90 or sin_ratio >= 1:
+            # El círculo toca un polo: todas las longitudes
+            lon_range = range(self._lon_cells)
+        else:
+            dlon = math.degrees(math.asin(sin_ratio))
+            first = int(math.floor((lon - dlon + 180) / self.cell_deg))
+            last = int(math.floor((lon + dlon + 180) / self.cell_deg))
+            lon_range = range(first, min(last, first + self._lon_cells - 1) + 1)
+        rows = range(int(math.floor(lat_min / self.cell_deg)), int(math.floor(lat_max / self.cell_deg)) + 1)
+        if len(rows) * len(lon_range) > len(self._cells):
+            # El círculo cubre más celdas que las ocupadas: se miden todos los pozos
+            return list(range(len(self.ids)))
+        positions = []
+        for row in rows:
+            for col in lon_range:
+                positions.extend(self._cells.get((row, col % self._lon_cells), ()))
+        return positions
+
+    @staticmethod
+    def _ring(row0, col0, ring):
+        """Celdas del borde del cuadrado de lado 2*ring+1 centrado en (row0, col0)."""
+        if ring == 0:
+            return [(row0, col0)]
+        cells = []
+        for offset in range(-ring, ring + 1):
+            cells += [(row0 - ring, col0 + offset), (row0 + ring, col0 + offset)]
+        for offset in range(-ring + 1, ring):
+            cells += [(row0 + offset, col0 - ring), (row0 + offset, col0 + ring)]
+        return cells
+
+    def within(self, lat, lon, radius_km):
+        """Pozos a radius_km o menos del punto: lista de (id, km) ordenada por distancia."""
+        positions = self._candidates_in_box(lat, lon, radius_km)
+        found = [(self.ids[pos], d) for pos, d in zip(positions, self._distances(lat, lon, positions))
+                 if d <= radius_km]
+        return sorted(found, key=lambda item: item[1])
+
+    def nearest(self, lat, lon):
+        """(id, km) del pozo más cercano al punto, o None si el índice está vacío."""
+        if not self.ids:
+            return None
+        row0, col0 = self._cell(lat, lon)
+        ring = 0
+        positions = []
+        while not positions:
+            if 8 * ring > len(self._cells):
+                # Punto lejos de todos los pozos: es más barato medir contra todos
+                positions = range(len(self.ids))
+                break
+            for row, col in self._ring(row0, col0, ring):
+                positions.extend(self._cells.get((row, col % self._lon_cells), ()))
+            ring += 1
+        # Un pozo de un anillo más lejano puede estar más cerca en km: se confirma por radio
+        best = min(self._distances(lat, lon, positions))
+        return self.within(lat, lon, best)[0]
+
+    def distance_matrix(self, points):
+        """Distancias en km de cada punto (lat, lon) a todos los pozos, en el orden de self.ids."""
+        return haversine_matrix(list(points), self.coords)
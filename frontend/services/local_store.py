@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+DEFAULT_PATH = os.getenv(
+    "LOCAL_STORE_PATH", os.path.join(os.path.dirname(__file__), "local_store.db")
+)
+
+
+def _check_identifier(name):
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Identificador inválido para el store local: {name}")
+    return name
+
+
+class LocalStore:
+    """
+    Store local embebido (SQLite en modo WAL) para los fallbacks sin MySQL.
+    Cada colección de un servicio es una tabla con la clave primaria y las
+    columnas indexadas de su tabla en db/migrations; el registro completo se
+    guarda como JSON. Las escrituras son por fila y dentro de una transacción.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path=None):
+        """Retorna la instancia única del proceso para el archivo dado."""
+        key = os.path.abspath(path or DEFAULT_PATH)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls(key)
+                cls._instances[key] = store
+            return store
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Una conexión por proceso, serializada con el lock (Streamlit usa un hilo por sesión)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS _documentos ("
+            " namespace TEXT NOT NULL, clave TEXT NOT NULL, valor TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, clave))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS _namespaces (namespace TEXT PRIMARY KEY)")
+        self._tables = set()
+
+    def table_name(self, namespace, collection):
+        return f"{_check_identifier(namespace)}__{_check_identifier(collection)}"
+
+    def ensure_table(self, namespace, collection, pk, indexes=()):
+        table = self.table_name(namespace, collection)
+        if table in self._tables:
+            return table
+        with self.lock:
+            cols = "".join(f", {_check_identifier(col)} TEXT" for col in indexes)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (pk TEXT PRIMARY KEY, data TEXT NOT NULL{cols})"
+            )
+            for col in indexes:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{col} ON {table} ({col})")
+            self._tables.add(table)
+        return table
+
+    def is_initialized(self, namespace):
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM _namespaces WHERE namespace = ?", (namespace,)
+            ).fetchone()
+        return row is not None
+
+    def transaction(self):
+        return _Transaction(self)
+
+    def execute(self, query, params=()):
+        with self.lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def close(self):
+        with self.lock:
+            self._conn.close()
+
+
+class _Transaction:
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        self.store.lock.acquire()
+        self.store._conn.execute("BEGIN IMMEDIATE")
+        return self.store._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.store._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.store.lock.release()
+        return False
+
+
+class LocalDocument:
+    """
+    Documento de colecciones de un servicio mock ({colección: [registros], clave: valor})
+    respaldado por LocalStore. schema = {colección: (campo_pk, [campos_indexados])};
+    las claves que no son colecciones del schema (config, escenario) se guardan enteras.
+    Los servicios marcan con mark()/mark_removed() los registros que tocan y save() sólo
+    serializa y escribe esas filas, así dos instancias del servicio no se pisan los cambios.
+    Los registros sin clave primaria usan como clave sustituta el rowid de su fila.
+    """
+
+    def __init__(self, namespace, schema, seed_path=None, store=None):
+        self.namespace = namespace
+        self.schema = schema
+        self.seed_path = seed_path
+        self.store = store or LocalStore.open()
+        self._baseline = {}
+        self._scalars = {}
+        self._dirty = {}
+        self._removed = {}
+        # {colección: {id(registro): (clave, registro)}} para los registros sin clave primaria
+        self._surrogates = {}
+        for collection, (pk, indexes) in schema.items():
+            self.store.ensure_table(namespace, collection, pk, indexes)
+
+    def _row_key(self, collection, pk, record):
+        """Clave de la fila del registro, o None si todavía no tiene pk ni fila asignada."""
+        value = record.get(pk)
+        if value is not None:
+            return str(value)
+        entry = self._surrogates.get(collection, {}).get(id(record))
+        return entry[0] if entry else None
+
+    def mark(self, collection, *records):
+        """Marca registros nuevos o modificados de la colección para el próximo save()."""
+        dirty = self._dirty.setdefault(collection, {})
+        for record in records:
+            dirty[id(record)] = record
+
+    def mark_removed(self, collection, *records):
+        """Marca registros quitados de la colección para borrar su fila en el próximo save()."""
+        pk, _ = self.schema[collection]
+        removed = self._removed.setdefault(collection, set())
+        for record in records:
+            key = self._row_key(collection, pk, record)
+            if key is not None:
+                removed.add(key)
+            self._dirty.get(collection, {}).pop(id(record), None)
+
+    @staticmethod
+    def _dumps(value):
+        return json.dumps(value, default=str, ensure_ascii=False, sort_keys=True)
+
+    def load(self, defaults=None):
+        """Carga el documento completo; la primera vez importa el JSON semilla si existe."""
+        if not self.store.is_initialized(self.namespace):
+            self._import_seed()
+
+        data = {}
+        for collection, (pk, _) in self.schema.items():
+            table = self.store.table_name(self.namespace, collection)
+            rows = self.store.execute(f"SELECT pk, data FROM {table} ORDER BY rowid")
+            data[collection] = [json.loads(text) for _, text in rows]
+            self._baseline[collection] = {key: text for key, text in rows}
+            self._surrogates[collection] = {
+                id(record): (key, record)
+                for (key, _), record in zip(rows, data[collection]) if key.startswith("row:")
+            }
+        for clave, valor in self.store.execute(
+                "SELECT clave, valor FROM _documentos WHERE namespace = ?", (self.namespace,)):
+            data[clave] = json.loads(valor)
+            self._scalars[clave] = valor
+
+        for key, value in (defaults or {}).items():
+            data.setdefault(key, value)
+        return data
+
+    def _import_seed(self):
+        seed = {}
+        if self.seed_path and os.path.exists(self.seed_path):
+            with open(self.seed_path, "r", encoding="utf-8") as f:
+                seed = json.load(f)
+        self.save(seed, initialize=True)
+
+    def save(self, data, initialize=False):
+        """
+        Persiste en una transacción las filas marcadas y las claves sueltas de data que
+        cambiaron. Con initialize=True se comparan todas las colecciones de data (importación
+        de la semilla). Retorna filas escritas.
+        """
+        written = 0
+        with self.store.transaction() as conn:
+            for collection, (pk, indexes) in self.schema.items():
+                table = self.store.table_name(self.namespace, collection)
+                baseline = self._baseline.setdefault(collection, {})
+                surrogates = self._surrogates.setdefault(collection, {})
+                dirty = self._dirty.pop(collection, {})
+                removed = self._removed.pop(collection, set())
+                if initialize:
+                    records = data.get(collection) or []
+                    dirty.update((id(record), record) for record in records)
+                    keys = {self._row_key(collection, pk, record) for record in records}
+                    removed |= set(baseline) - keys
+
+                cols = ", ".join(["pk", "data", *indexes])
+                updates = ", ".join(f"{col} = excluded.{col}" for col in ["data", *indexes])
+                for record in dirty.values():
+                    key = self._row_key(collection, pk, record)
+                    text = self._dumps(record)
+                    removed.discard(key)
+                    if key is not None and baseline.get(key) == text:
+                        continue
+                    values = [key, text] + [
+                        None if record.get(col) is None else str(record.get(col)) for col in indexes
+                    ]
+                    cur = conn.execute(
+                        f"INSERT INTO {table} ({cols}) VALUES ({', '.join('?' * len(values))}) "
+                        f"ON CONFLICT(pk) DO UPDATE SET {updates}",
+                        values
+                    )
+                    if key is None:
+                        # Sin clave primaria: la fila se identifica por su rowid, no por su
+                        # contenido, así dos registros iguales no se fusionan
+                        key = f"row:{cur.lastrowid}"
+                        conn.execute(f"UPDATE {table} SET pk = ? WHERE rowid = ?", (key, cur.lastrowid))
+                        surrogates[id(record)] = (key, record)
+                    baseline[key] = text
+                    written += 1
+
+                for key in removed:
+                    if baseline.pop(key, None) is None:
+                        continue
+                    conn.execute(f"DELETE FROM {table} WHERE pk = ?", (key,))
+                    written += 1
+                if removed:
+                    for ref, (key, _) in list(surrogates.items()):
+                        if key in removed:
+                            del surrogates[ref]
+
+            for clave, valor in data.items():
+                if clave in self.schema:
+                    continue
+                text = self._dumps(valor)
+                if self._scalars.get(clave) != text:
+                    conn.execute(
+                        "INSERT INTO _documentos (namespace, clave, valor) VALUES (?, ?, ?) "
+                        "ON CONFLICT(namespace, clave) DO UPDATE SET valor = excluded.valor",
+                        (self.namespace, clave, text)
+                    )
+                    self._scalars[clave] = text
+                    written += 1
+
+            if initialize:
+                conn.execute("INSERT OR IGNORE INTO _namespaces (namespace) VALUES (?)", (self.namespace,))
+        return written
+
+    def find(self, collection, **filters):
+        """Lectura indexada: registros de la colección cuyos campos coinciden (pk o columnas indexadas)."""
+        if not self.store.is_initialized(self.namespace):
+            self._import_seed()
+        pk, indexes = self.schema[collection]
+        table = self.store.table_name(self.namespace, collection)
+        clauses = []
+        params = []
+        for field, value in filters.items():
+            column = "pk" if field == pk else field
+            if column != "pk" and field not in indexes:
+                raise ValueError(f"{collection}.{field} no está indexado en el store local")
+            clauses.append(f"{column} = ?")
+            params.append(str(value))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.store.execute(f"SELECT data FROM {table}{where} ORDER BY rowid", tuple(params))
+        return [json.loads(text) for (text,) in rows]
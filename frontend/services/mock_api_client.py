@@ -1,63 +1,168 @@
 import time
 import random
-import json
-import os
-import math
+from collections import Counter
 from datetime import datetime, timedelta
 from .database_service import DatabaseService
 from .audit_service import AuditService
 from .ai_service import AIService
+from .partitioned_store import LazyCollection, PartitionedStore
+from .project_index import ProjectIndex
+from .geo_engine import WellGeoIndex, eta_minutes, haversine_km
 
 class MockApiClient:
     """
     Simula la interacción con el Backend (FastAPI) y el Orquestador (Temporal).
-    Utiliza DatabaseService para MySQL y un archivo JSON local como Persistencia de Respaldo.
+    Utiliza DatabaseService para MySQL y segmentos JSON locales como Persistencia de Respaldo.
     Ahora integra AIService (Gemini Flash) para respuestas inteligentes.
     """
 
+    # Colecciones del respaldo local (dominio "operaciones"), cada una en su propio
+    # segmento y cargada recién cuando se usa
+    _db_projects = LazyCollection("projects", lambda self: self._generate_mock_projects())
+    _db_master_people = LazyCollection("people", lambda self: self._generate_mock_people())
+    _db_master_equipment = LazyCollection("equipment", lambda self: self._generate_mock_equipment())
+    _db_master_supplies = LazyCollection("supplies", lambda self: self._generate_mock_supplies())
+    _outbox = LazyCollection("sync_outbox")
+    _offline_cache = LazyCollection("offline_cache", empty=dict)
+    _emergency_inbox = LazyCollection("emergency_inbox")
+
+    # Secciones del detalle de proyecto, en el orden en que se arman (ver get_project_projection)
+    DETAIL_SECTIONS = ("gates", "transport_list", "equipment_list", "rig_telemetry",
+                       "personnel_list", "stock_list", "quotas")
+
+    # Categorías de alerta activa por proyecto, derivadas de su estado (ver _project_alerts)
+    ALERT_CATEGORIES = ("INCIDENCIA_BLOQUEANTE", "RIESGO_HSE", "DEMORA_LOGISTICA", "STOCK_BAJO", "GATE_FORZADO")
+    # Pozos sin operación en curso: no tienen stock movilizado, así que no cuentan como STOCK_BAJO
+    NON_OPERATIONAL_STATES = ("PLANIFICADO", "COMPLETADO")
+
+    PERSISTED_COLLECTIONS = {
+        "projects": "_db_projects",
+        "people": "_db_master_people",
+        "equipment": "_db_master_equipment",
+        "supplies": "_db_master_supplies",
+        "sync_outbox": "_outbox",
+        "offline_cache": "_offline_cache",
+        "emergency_inbox": "_emergency_inbox",
+    }
+
     def __init__(self, audit_service=None):
         self.db = DatabaseService()
         self.audit = audit_service or AuditService(self.db)
         self.ai = AIService() # Inicializar servicio de IA
+        # persistence_db.json sólo se lee una vez para migrar al almacenamiento particionado
         self.storage_path = "frontend/services/persistence_db.json"
-        
-        # Cargar datos iniciales desde JSON si existe
-        self._db_data = self._load_persistence()
-        
-        # Mapeo de listas internas con datos por defecto si están vacíos
-        self._db_projects = self._db_data.get('projects') or self._generate_mock_projects()
-        self._db_master_people = self._db_data.get('people') or self._generate_mock_people()
-        self._db_master_equipment = self._db_data.get('equipment') or self._generate_mock_equipment()
-        self._db_master_supplies = self._db_data.get('supplies') or self._generate_mock_supplies()
+        self._partitions = PartitionedStore.open(
+            "operaciones", self.PERSISTED_COLLECTIONS, legacy_path=self.storage_path
+        )
+
+        self._index = None
+        self._fleet_cache = {}
+        self._geo_index = None
+        # Detalle de proyecto memoizado por versión (sin telemetría, que es en vivo)
+        self._project_versions = {}
+        self._detail_cache = {}
+        # Contadores de alertas activas por categoría, mantenidos en cada mutación
+        self._alerts = None
+        self._alert_counts = Counter()
+        self._alert_total = 0
+        # Proyectos con un gate forzado en la outbox; se mantiene al encolar y al sincronizar
+        self._forced_gates = None
 
         # --- LOGICA OFFLINE ---
         self._is_online = True
-        self._outbox = self._db_data.get('sync_outbox') or []
-        self._offline_cache = self._db_data.get('offline_cache') or {}
-        self._emergency_inbox = self._db_data.get('emergency_inbox') or []
 
     def _get_distance(self, lat1, lon1, lat2, lon2):
-        """Calcula distancia en km entre dos puntos (haversine aproximado para mock)."""
-        return math.sqrt((lat1 - lat2)**2 + (lon1 - lon2)**2) * 111
-
-    def _load_persistence(self):
-        if os.path.exists(self.storage_path):
-            with open(self.storage_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-
-    def _save_persistence(self):
-        data = {
-            "projects": self._db_projects,
-            "people": self._db_master_people,
-            "equipment": self._db_master_equipment,
-            "supplies": self._db_master_supplies,
-            "sync_outbox": self._outbox,
-            "offline_cache": self._offline_cache,
-            "emergency_inbox": self._emergency_inbox
-        }
-        with open(self.storage_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+        """Calcula distancia en km entre dos puntos (haversine)."""
+        return haversine_km(lat1, lon1, lat2, lon2)
+
+    def _get_geo_index(self):
+        """Índice espacial de los pozos; se rearma cuando cambia algún proyecto."""
+        if self._geo_index is None:
+            self._geo_index = WellGeoIndex(self._get_index())
+        return self._geo_index
+
+    def _save_persistence(self, *collections):
+        """
+        Marca como sucios los segmentos de las colecciones dadas (por defecto, todas las
+        ya cargadas); se escriben en segundo plano, cada uno por separado.
+        """
+        for collection in collections or self.PERSISTED_COLLECTIONS:
+            attr = self.PERSISTED_COLLECTIONS[collection]
+            if not getattr(type(self), attr).is_loaded(self):
+                # Nunca se leyó en esta instancia: no pudo cambiar
+                continue
+            self._partitions.save(collection, lambda attr=attr: getattr(self, attr))
+
+    def flush_persistence(self):
+        """Fuerza la escritura inmediata de los cambios pendientes."""
+        return self._partitions.flush()
+
+    def _get_index(self):
+        """Índices por id, alias y campos secundarios sobre _db_projects (se construyen en el primer uso)."""
+        if self._index is None or self._index.projects is not self._db_projects:
+            self._index = ProjectIndex(self._db_projects)
+            self._alerts = None
+            self._geo_index = None
+        return self._index
+
+    # --- ALERTAS ACTIVAS (contadores incrementales) ---
+
+    def _project_alerts(self, project, forced_gates):
+        """Categorías de alerta activas de un proyecto (mismas reglas que analyze_project_status)."""
+        status = project.get('estado_proyecto', 'PLANIFICADO')
+        alerts = set()
+        if status == 'BLOQUEADO' or project.get('workflow_status') == 'BLOCKED_BY_INCIDENT':
+            alerts.add("INCIDENCIA_BLOQUEANTE")
+        if any(not p['medical_ok'] or not p['induction_ok'] for p in self._build_personnel(status)):
+            alerts.add("RIESGO_HSE")
+        if any(t['status'] == 'DEMORADO_CHECKPOINT' for t in self._build_transports(project, status)):
+            alerts.add("DEMORA_LOGISTICA")
+        if status not in self.NON_OPERATIONAL_STATES and any(
+                item['current'] < item['min'] for item in self._build_stock(status)):
+            alerts.add("STOCK_BAJO")
+        if project['id'] in forced_gates:
+            # Gate forzado offline pendiente de sincronizar
+            alerts.add("GATE_FORZADO")
+        return frozenset(alerts)
+
+    def _forced_gate_projects(self):
+        """Ids de proyecto con gates forzados pendientes; la outbox se recorre sólo la primera vez."""
+        if self._forced_gates is None:
+            self._forced_gates = {
+                self._project_key(item['project_id'])
+                for item in self._outbox if item.get('type') == 'GATE_OVERRIDE'
+            }
+        return self._forced_gates
+
+    def _project_key(self, project_id):
+        project = self._get_index().get(project_id)
+        return project['id'] if project else project_id
+
+    def _get_alert_counts(self):
+        """Conteo por categoría; se arma una vez y luego lo actualiza _refresh_alerts."""
+        index = self._get_index()
+        if self._alerts is None:
+            forced = self._forced_gate_projects()
+            self._alerts = {p['id']: self._project_alerts(p, forced) for p in index}
+            self._alert_counts = Counter(c for alerts in self._alerts.values() for c in alerts)
+            self._alert_total = sum(self._alert_counts.values())
+        return self._alert_counts
+
+    def _refresh_alerts(self, project_id):
+        """Recalcula las alertas de un único proyecto y ajusta los contadores."""
+        if self._alerts is None:
+            return
+        project = self._get_index().get(project_id)
+        key = project['id'] if project else project_id
+        new = self._project_alerts(project, self._forced_gate_projects()) if project else frozenset()
+        old = self._alerts.get(key, frozenset())
+        if new == old:
+            return
+        self._alert_counts.subtract(old)
+        self._alert_counts.update(new)
+        self._alert_counts += Counter()  # descarta categorías en cero
+        self._alert_total += len(new) - len(old)
+        self._alerts[key] = new
 
     def _generate_mock_projects(self):
         return [
@@ -355,41 +460,94 @@ class MockApiClient:
 
     def get_all_logistics(self):
         """Consolida información logística de todos los proyectos activos."""
-        logistics_data = []
-        for p in self._db_projects:
-            detail = self.get_project_detail(p['id'])
-            if detail:
-                for t in detail.get('transport_list', []):
-                    t_copy = t.copy()
-                    t_copy['project_id'] = p['id']
-                    t_copy['project_name'] = p['nombre']
-                    logistics_data.append(t_copy)
-        return logistics_data
+        return self._fleet_aggregate('transport_list')
 
     def get_all_supplies_status(self):
         """Consolida el estado de stock crítico de todos los proyectos."""
-        stock_status = []
-        for p in self._db_projects:
-            detail = self.get_project_detail(p['id'])
-            if detail:
-                for s in detail.get('stock_list', []):
-                    s_copy = s.copy()
-                    s_copy['project_id'] = p['id']
-                    s_copy['project_name'] = p['nombre']
-                    stock_status.append(s_copy)
-        return stock_status
+        return self._fleet_aggregate('stock_list')
+
+    def get_nearest_well(self, lat, lon):
+        """Pozo más cercano a un punto: {'project_id', 'dist_km'} o None sin pozos georreferenciados."""
+        found = self._get_geo_index().nearest(lat, lon)
+        return {"project_id": found[0], "dist_km": found[1]} if found else None
+
+    def get_wells_within(self, lat, lon, radius_km):
+        """Pozos a radius_km o menos de un punto, del más cercano al más lejano."""
+        return [{"project_id": pid, "dist_km": d} for pid, d in self._get_geo_index().within(lat, lon, radius_km)]
+
+    def get_transport_distance_matrix(self):
+        """
+        Distancias de todos los transportes con GPS a todos los pozos, calculadas en una
+        sola llamada (despacho): ids de transportes y pozos, matriz en km y pozo más
+        cercano de cada transporte.
+        """
+        geo = self._get_geo_index()
+        tracked = [t for t in self.get_all_logistics() if t.get('gps_active') and 'cur_lat' in t]
+        matrix = geo.distance_matrix((t['cur_lat'], t['cur_lon']) for t in tracked)
+        nearest = {}
+        for t, row in zip(tracked, matrix):
+            if row:
+                pos = min(range(len(row)), key=row.__getitem__)
+                nearest[(t['project_id'], t['id'])] = {"project_id": geo.ids[pos], "dist_km": row[pos]}
+        return {
+            "transports": [(t['project_id'], t['id']) for t in tracked],
+            "wells": list(geo.ids),
+            "distances_km": matrix,
+            "nearest": nearest,
+        }
+
+    def _fleet_aggregate(self, section):
+        """
+        Filas de una sección del detalle (transportes, stock, equipos) de toda la flota,
+        con project_id y project_name. Se arma con proyecciones (sin telemetría, personal
+        ni cupos) y se cachea hasta que cambie algún proyecto (_invalidate_project).
+        """
+        rows = self._fleet_cache.get(section)
+        if rows is None:
+            rows = []
+            for p in self._db_projects:
+                status = p.get('estado_proyecto', 'PLANIFICADO')
+                for item in self._build_detail_section(section, p, status):
+                    row = item.copy()
+                    row['project_id'] = p['id']
+                    row['project_name'] = p['nombre']
+                    rows.append(row)
+            self._fleet_cache[section] = rows
+        # Copias: quien consume puede modificar las filas sin alterar el cache
+        return [row.copy() for row in rows]
+
+    def _invalidate_project(self, project_id):
+        """
+        Incrementa la versión del proyecto (upsert, signals, overrides): su detalle
+        memoizado y los agregados de flota se vuelven a armar en la próxima lectura.
+        """
+        project = self._get_index().get(project_id)
+        key = project['id'] if project else project_id
+        self._project_versions[key] = self._project_versions.get(key, 0) + 1
+        self._detail_cache.pop(key, None)
+        self._fleet_cache.clear()
+        self._geo_index = None
+        self._refresh_alerts(key)
+
+    def get_project_version(self, project_id):
+        """Versión actual del estado derivado del proyecto (0 si nunca cambió)."""
+        project = self._get_index().get(project_id)
+        return self._project_versions.get(project['id'] if project else project_id, 0)
 
     # --- QUERIES (Lectura) ---
 
     def get_dashboard_stats(self):
         """Simula KPIs agregados para el Dashboard Gerencial."""
-        df = self._db_projects
+        # Contadores mantenidos en cada mutación: O(1) sin importar el tamaño de la flota
+        index = self._get_index()
+        alertas = self._get_alert_counts()
         return {
-            "total_activos": len(df),
-            "en_planificacion": len([p for p in df if p['estado_proyecto'] == 'PLANIFICADO']),
-            "en_ejecucion": len([p for p in df if p['estado_proyecto'] == 'EN_EJECUCION']),
-            "bloqueados": len([p for p in df if p['estado_proyecto'] == 'BLOQUEADO']),
-            "alertas_activas": 2 # Hardcoded simulation
+            "total_activos": len(index),
+            "en_planificacion": index.count('estado_proyecto', 'PLANIFICADO'),
+            "en_ejecucion": index.count('estado_proyecto', 'EN_EJECUCION'),
+            "bloqueados": index.count('estado_proyecto', 'BLOQUEADO'),
+            "alertas_activas": self._alert_total,
+            "alertas_por_categoria": dict(alertas),
         }
 
     def get_projects(self, filter_status=None):
@@ -401,10 +559,9 @@ class MockApiClient:
         # except Exception as e:
         #     print(f"[ERROR] DB: {e}")
         
-        processed = self._db_projects
         if filter_status and filter_status != 'Todos':
-            return [p for p in processed if p['estado_proyecto'] == filter_status]
-        return processed
+            return self._get_index().where('estado_proyecto', filter_status)
+        return self._db_projects
 
     def get_master_personnel(self):
         """Retorna personal (MODO MOCK EXCLUSIVO)."""
@@ -429,58 +586,93 @@ class MockApiClient:
 
     def get_project_detail(self, project_id):
         """Retorna detalle completo de un proyecto con lógica basada en el Estado."""
-        # Simula busqueda en persistencia local
-        # Robustez: Strip y comparacion case-insensitive si falla exacto
-        if not project_id: return None
-        
-        target = str(project_id).strip()
-        project = next((p for p in self._db_projects if p['id'] == target), None)
-        
-        # Fallback case-insensitive
+        # Robustez: strip y alias case-insensitive si falla exacto (ver ProjectIndex.get)
+        project = self._get_index().get(project_id)
         if not project:
-            project = next((p for p in self._db_projects if p['id'].upper() == target.upper()), None)
-            
+            return None
+
+        # Detalle memoizado por versión del proyecto; la telemetría se genera en cada lectura.
+        # Las listas internas se comparten con el cache: el detalle es de sólo lectura.
+        version = self._project_versions.get(project['id'], 0)
+        cached = self._detail_cache.get(project['id'])
+        if cached is None or cached[0] != version:
+            sections = tuple(sec for sec in self.DETAIL_SECTIONS if sec != 'rig_telemetry')
+            cached = (version, self._project_projection(project, sections))
+            self._detail_cache[project['id']] = cached
+        return self._merge_live_telemetry(cached[1], project)
+
+    def _merge_live_telemetry(self, base, project):
+        detail = {}
+        for key, value in base.items():
+            detail[key] = value
+            if key == 'equipment_list':
+                # Misma posición que en el detalle armado completo
+                detail['rig_telemetry'] = self._build_detail_section('rig_telemetry', project, base['status'])
+        return detail
+
+    def get_project_projection(self, project_id, sections):
+        """
+        Detalle parcial de un proyecto: datos base más sólo las secciones pedidas
+        (ver DETAIL_SECTIONS), sin construir el resto del detalle.
+        """
+        project = self._get_index().get(project_id)
         if not project:
             return None
-        
+        return self._project_projection(project, sections)
+
+    def _project_projection(self, project, sections):
         status = project.get('estado_proyecto', 'PLANIFICADO')
         project_copy = project.copy()
         project_copy['well'] = project['id']
         project_copy['name'] = project['nombre']
         project_copy['status'] = status
+        for section in sections:
+            if section == 'gates':
+                project_copy.update(self._build_gates(status))
+            else:
+                project_copy[section] = self._build_detail_section(section, project, status)
+        return project_copy
+
+    def _build_detail_section(self, section, project, status):
+        if section == 'transport_list':
+            return self._build_transports(project, status)
+        if section == 'equipment_list':
+            return self._build_equipment(status)
+        if section == 'rig_telemetry':
+            if status == "PLANIFICADO":
+                return None
+            return self._generate_rig_telemetry(critical_fail=status == "BLOQUEADO")
+        if section == 'personnel_list':
+            return self._build_personnel(status)
+        if section == 'stock_list':
+            return self._build_stock(status)
+        if section == 'quotas':
+            return self._build_quotas(status)
+        raise ValueError(f"Sección de detalle desconocida: {section}")
+
+    # --- LÓGICA BASADA EN ESTADO (secciones del detalle) ---
+
+    def _build_gates(self, status):
+        if status == "PLANIFICADO":
+            return {'dtm_confirmado': False, 'personal_confirmado_hoy': False, 'allowed_operations': ["ESPERA"]}
+        if status == "BLOQUEADO":
+            return {'dtm_confirmado': True, 'personal_confirmado_hoy': True, 'allowed_operations': ["ESPERA"]}
+        return {'dtm_confirmado': True, 'personal_confirmado_hoy': True, 'allowed_operations': ["ESPERA", "CEMENTACION", "DTM"]}
 
+    def _build_transports(self, project, status):
         well_lat = project.get('lat', -45.8)
         well_lon = project.get('lon', -67.4)
-
-        # --- LÓGICA BASADA EN ESTADO ---
         if status == "PLANIFICADO":
-            project_copy['dtm_confirmado'] = False
-            project_copy['personal_confirmado_hoy'] = False
-            project_copy['allowed_operations'] = ["ESPERA"]
             transports = [
-                {"id": "T01", "type": "Minibus", "driver": "Logistica Sur", "status": "CARGANDO_RECURSOS", "time_plan": "07:30", "gps_active": True, "cur_lat": well_lat - 0.2, "cur_lon": well_lon - 0.2, "dist_to_well": 25.0, "eta_minutes": 45},
+                {"id": "T01", "type": "Minibus", "driver": "Logistica Sur", "status": "CARGANDO_RECURSOS", "time_plan": "07:30", "gps_active": True, "cur_lat": well_lat - 0.2, "cur_lon": well_lon - 0.2},
                 {"id": "T02", "type": "Camion Cisterna", "driver": "Aguas Patagonicas", "status": "PROGRAMADO", "time_plan": "08:00", "gps_active": False},
             ]
-            equipment = [
-                {"name": "Pulling Unit #01", "category": "DIRECTO", "type": "PULLING", "status": "OPERATIVO", "assigned": True, "is_on_location": False},
-            ]
-            telemetry = None
         elif status == "BLOQUEADO":
-            project_copy['dtm_confirmado'] = True
-            project_copy['personal_confirmado_hoy'] = True
-            project_copy['allowed_operations'] = ["ESPERA"]
             transports = [
                 {"id": "T01", "type": "Minibus", "driver": "Logistica Sur", "status": "ARRIBO", "time_plan": "07:30", "time_arrival": "07:15", "gps_active": False},
-                {"id": "T03", "type": "Cisterna Combustible", "driver": "YPF Directo", "status": "DEMORADO_CHECKPOINT", "time_plan": "09:00", "gps_active": True, "cur_lat": well_lat + 0.05, "cur_lon": well_lon + 0.02, "dist_to_well": 5.4, "eta_minutes": 15},
-            ]
-            equipment = [
-                {"name": "Pulling Unit #01", "category": "DIRECTO", "type": "PULLING", "status": "FALLA CRITICA", "assigned": True, "is_on_location": True},
+                {"id": "T03", "type": "Cisterna Combustible", "driver": "YPF Directo", "status": "DEMORADO_CHECKPOINT", "time_plan": "09:00", "gps_active": True, "cur_lat": well_lat + 0.05, "cur_lon": well_lon + 0.02},
             ]
-            telemetry = self._generate_rig_telemetry(critical_fail=True)
-        else: # EN_EJECUCION
-            project_copy['dtm_confirmado'] = True
-            project_copy['personal_confirmado_hoy'] = True
-            project_copy['allowed_operations'] = ["ESPERA", "CEMENTACION", "DTM"]
+        else:
             transports = [
                 {"id": "T01", "type": "Minibus", "driver": "Logistica Sur", "status": "ARRIBO", "time_plan": "07:30", "time_arrival": "07:10", "gps_active": False},
                 {
@@ -491,22 +683,31 @@ class MockApiClient:
                     "gps_active": True,
                     "cur_lat": well_lat + 0.1, 
                     "cur_lon": well_lon + 0.05,
-                    "dist_to_well": 12.5,
-                    "eta_minutes": 25 
                 },
             ]
-            equipment = [
-                {"name": "Pulling Unit #01", "category": "DIRECTO", "type": "PULLING", "status": "OPERATIVO", "assigned": True, "is_on_location": True},
-                {"name": "Cementador #1", "category": "DIRECTO", "type": "CEMENTADOR", "status": "OPERATIVO", "assigned": True, "is_on_location": True},
+        # Distancia y ETA reales desde la posición GPS hasta el pozo
+        for t in transports:
+            if 'cur_lat' in t:
+                t['dist_to_well'] = round(haversine_km(t['cur_lat'], t['cur_lon'], well_lat, well_lon), 1)
+                t['eta_minutes'] = eta_minutes(t['dist_to_well'])
+        return transports
+
+    def _build_equipment(self, status):
+        if status == "PLANIFICADO":
+            return [
+                {"name": "Pulling Unit #01", "category": "DIRECTO", "type": "PULLING", "status": "OPERATIVO", "assigned": True, "is_on_location": False},
+            ]
+        if status == "BLOQUEADO":
+            return [
+                {"name": "Pulling Unit #01", "category": "DIRECTO", "type": "PULLING", "status": "FALLA CRITICA", "assigned": True, "is_on_location": True},
             ]
-            telemetry = self._generate_rig_telemetry()
+        return [
+            {"name": "Pulling Unit #01", "category": "DIRECTO", "type": "PULLING", "status": "OPERATIVO", "assigned": True, "is_on_location": True},
+            {"name": "Cementador #1", "category": "DIRECTO", "type": "CEMENTADOR", "status": "OPERATIVO", "assigned": True, "is_on_location": True},
+        ]
 
-        project_copy['transport_list'] = transports
-        project_copy['equipment_list'] = equipment
-        project_copy['rig_telemetry'] = telemetry
-        
-        # Datos comunes (Personal y Stock)
-        project_copy['personnel_list'] = [
+    def _build_personnel(self, status):
+        return [
             {"id": "PD01", "name": "Juan Perez", "role": "Supervisor", "category": "DIRECTO", "critical": True, "present": True,
              "medical_ok": True, "medical_source": "AUTOMATIC", "medical_validated_by": "Corp", "medical_validated_at": "2026-01-15 08:00",
              "induction_ok": True, "induction_source": "AUTOMATIC", "induction_validated_by": "HSE", "induction_validated_at": "2026-01-10 10:00"},
@@ -514,20 +715,19 @@ class MockApiClient:
              "medical_ok": True, "medical_source": "AUTOMATIC", "medical_validated_by": "Corp", "medical_validated_at": "2026-01-20 09:00",
              "induction_ok": status != "BLOQUEADO", "induction_source": "AUTOMATIC", "induction_validated_by": "HSE", "induction_validated_at": "2025-12-01 14:00"},
         ]
-        
-        project_copy['stock_list'] = [
+
+    def _build_stock(self, status):
+        return [
             {"item": "Cemento (Bolsas)", "current": 150 if status != "PLANIFICADO" else 0, "consumed": 0, "min": 50, "unit": "u"},
             {"item": "Agua Industrial", "current": 25.0 if status != "PLANIFICADO" else 5.0, "consumed": 0, "min": 10.0, "unit": "m3"},
         ]
 
-        # Quotas
-        project_copy['quotas'] = {
+    def _build_quotas(self, status):
+        return {
             "DIRECTO": {"PULLING": {"target": 1, "current": 1 if status != "PLANIFICADO" else 0}},
             "PERSONNEL": {"DIRECTO": {"target": 10, "current": 10 if status != "PLANIFICADO" else 0}}
         }
 
-        return project_copy
-
     def analyze_project_status(self, project_id):
         """Analiza toda la info disponible y saca una conclusión o recomendación."""
         project = self.get_project_detail(project_id)
@@ -612,16 +812,12 @@ class MockApiClient:
         """CRUD: Registro de Pozo (MODO MOCK EXCLUSIVO)."""
         print(f"[MOCK] Guardando pozo {data['id']}")
         
-        # Obtener estado anterior para el log
-        existing = next((p for p in self._db_projects if p['id'] == data['id']), None)
-        prev_state = existing.copy() if existing else None
-        
-        # Persistir en JSON local
-        if existing: existing.update(data)
-        else: self._db_projects.append(data)
-        self._save_persistence()
+        # Alta o merge manteniendo los índices; prev_state es el estado anterior para el log
+        project, prev_state = self._get_index().upsert(data)
+        self._invalidate_project(project['id'])
+        self._save_persistence("projects")
 
-        # Auditoría
+        # Auditoría (delta contra el estado previo; el estado completo es reconstruible)
         self.audit.log_event(
             user_id=user_id,
             user_role=user_role,
@@ -629,8 +825,9 @@ class MockApiClient:
             entity="POZO",
             entity_id=data['id'],
             prev_state=prev_state,
-            new_state=data,
-            metadata={"action": "upsert_well"}
+            new_state=project.copy(),
+            metadata={"action": "upsert_well"},
+            delta=True
         )
         return True
 
@@ -641,7 +838,7 @@ class MockApiClient:
         
         # Backup local
         self._db_master_people.insert(0, data)
-        self._save_persistence()
+        self._save_persistence("people")
         return True
 
     def upsert_equipment(self, data):
@@ -650,7 +847,7 @@ class MockApiClient:
         # --- BD Comentada ---
         
         self._db_master_equipment.insert(0, data)
-        self._save_persistence()
+        self._save_persistence("equipment")
         return True
 
     def upsert_supply(self, data):
@@ -659,7 +856,7 @@ class MockApiClient:
         # --- BD Comentada ---
             
         self._db_master_supplies.insert(0, data)
-        self._save_persistence()
+        self._save_persistence("supplies")
         return True
 
     def upsert_campaign(self, data):
@@ -673,27 +870,32 @@ class MockApiClient:
         """Signal: Admin carga justificación técnica."""
         print(f"[MOCK] Enviando Signal 'Justificacion' para {project_id} con archivo {file_name}")
         # En prod: grpc_client.signal_workflow(...)
+        self._invalidate_project(project_id)
         return True
 
     def send_signal_dtm(self, project_id, resources_list):
         """Signal: Admin asigna recursos (DTM)."""
         print(f"[MOCK] Enviando Signal 'AsignarRecursos' para {project_id}. Equipos: {resources_list}")
         # time.sleep(1) # Simula latencia red
+        self._invalidate_project(project_id)
         return True
 
     def send_signal_check_personal(self, project_id, personal_data):
         """Signal: Check-in de personal diario."""
         print(f"[MOCK] Enviando Signal 'CheckPersonal' para {project_id}. Data: {personal_data}")
+        self._invalidate_project(project_id)
         return True
 
     def send_signal_check_transporte(self, project_id, transporte_data):
         """Signal: Confirmación de transporte."""
         print(f"[MOCK] Enviando Signal 'CheckTransporte' para {project_id}. Data: {transporte_data}")
+        self._invalidate_project(project_id)
         return True
 
     def send_signal_check_permisos(self, project_id, permisos_data):
         """Signal: Validación de permisos diarios."""
         print(f"[MOCK] Enviando Signal 'CheckPermisos' para {project_id}. Data: {permisos_data}")
+        self._invalidate_project(project_id)
         return True
 
     # --- MOTOR DE EMERGENCIA (SMS / SATELITAL) ---
@@ -737,7 +939,8 @@ class MockApiClient:
                 "ts": datetime.now().strftime("%Y-%m-%d %H:%M")
             }
             self._outbox.append(item)
-            self._save_persistence()
+            self._invalidate_project(project_id)
+            self._save_persistence("sync_outbox")
             return {"status": "QUEUED", "msg": "Guardado en Outbox (Sin conexión)."}
 
         if channel in ["SMS", "SATELITAL"]:
@@ -754,12 +957,14 @@ class MockApiClient:
                 "decoded_data": report_data,
                 "status": "DECODED"
             })
-            self._save_persistence()
+            self._invalidate_project(project_id)
+            self._save_persistence("emergency_inbox")
             
             return {"status": "EMERGENCY_SENT", "msg": f"Enviado vía {channel}: {encoded}"}
 
         # Flujo Normal Online
         print(f"[MOCK] Enviando Signal 'ParteDiario' via {channel} para {project_id}.")
+        self._invalidate_project(project_id)
         # time.sleep(1.5)
         return {"status": "SENT", "msg": "Parte enviado exitosamente por Internet"}
 
@@ -775,7 +980,7 @@ class MockApiClient:
     def get_sync_count(self):
         return len(self._outbox)
 
-    def synchronize(self):
+    def synchronize(self, user_id="system", user_role="system"):
         """Procesa la cola de sincronización."""
         if not self._is_online:
             return False, "No hay conexión para sincronizar."
@@ -786,8 +991,26 @@ class MockApiClient:
 
         # Simular procesamiento
         # time.sleep(2)
+
+        # Auditoría en bloque: un único append/INSERT para toda la cola
+        self.audit.log_events(
+            {
+                "user_id": user_id,
+                "user_role": user_role,
+                "event_type": "SYNC_APPLIED",
+                "entity": "POZO",
+                "entity_id": item["project_id"],
+                "new_state": item["data"],
+                "metadata": {"sync_id": item["id"], "type": item["type"], "queued_at": item["ts"]}
+            }
+            for item in self._outbox
+        )
+        synced = {item["project_id"] for item in self._outbox}
         self._outbox = []
-        self._save_persistence()
+        self._forced_gates = set()
+        for project_id in synced:
+            self._invalidate_project(project_id)
+        self._save_persistence("sync_outbox")
         return True, f"Sincronizados {count} eventos exitosamente."
 
     def get_emergency_inbox(self):
@@ -823,13 +1046,15 @@ class MockApiClient:
             "ts": datetime.now().strftime("%Y-%m-%d %H:%M")
         }
         self._outbox.append(item)
+        self._forced_gate_projects().add(self._project_key(project_id))
         
         # Guardar en cache local para que la UI refleje el cambio de inmediato
         if project_id not in self._offline_cache:
             self._offline_cache[project_id] = {}
         self._offline_cache[project_id][gate_id] = True
+        self._invalidate_project(project_id)
         
-        self._save_persistence()
+        self._save_persistence("sync_outbox", "offline_cache")
         return True
 
     # --- CHAT OPERATIVO & IA ASSISTANT ---
@@ -0,0 +1,165 @@
+import json
+import os
+import shutil
+import threading
+from .snapshot_codec import encode_snapshot, read_header
+from .write_behind import WriteBehindFile, atomic_write_bytes, atomic_write_json
+
+DEFAULT_BASE_DIR = os.getenv("MOCK_PERSISTENCE_DIR", "frontend/services/persistence")
+# "json" (legible, por defecto) o "binary" (snapshot compacto: msgpack si está instalado)
+DEFAULT_FORMAT = os.getenv("MOCK_PERSISTENCE_FORMAT", "json")
+
+
+class PartitionedStore:
+    """
+    Persistencia local particionada por dominio (operaciones, finanzas). Cada
+    colección es un segmento JSON propio en <base_dir>/<dominio>/<colección>.json,
+    que se lee recién cuando se usa y se escribe por separado con escritura
+    diferida (WriteBehindFile): una certificación sólo reescribe los segmentos
+    financieros que cambió y nunca pisa los de operaciones.
+    En formato "binary" cada segmento es un snapshot <colección>.snap con un
+    header de índice legible sin decodificar el contenido; los segmentos .json
+    existentes se leen una vez y se convierten en la siguiente escritura.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, domain, collections, base_dir=None, legacy_path=None, format=None):
+        """Retorna la instancia única del proceso para el dominio dado."""
+        key = (os.path.abspath(base_dir or DEFAULT_BASE_DIR), domain)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls(domain, collections, base_dir=base_dir, legacy_path=legacy_path, format=format)
+                cls._instances[key] = store
+            return store
+
+    def __init__(self, domain, collections, base_dir=None, legacy_path=None, format=None):
+        self.domain = domain
+        self.collections = tuple(collections)
+        self.binary = (format or DEFAULT_FORMAT) == "binary"
+        self.extension = ".snap" if self.binary else ".json"
+        self.path = os.path.join(base_dir or DEFAULT_BASE_DIR, domain)
+        if not os.path.isdir(self.path):
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path):
+        """Migra una única vez las claves de este dominio desde el persistence_db.json compartido."""
+        data = {}
+        if legacy_path and os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except ValueError:
+                data = {}
+        # Se arma en un directorio temporal y se publica con un rename: una migración
+        # interrumpida no deja el dominio a medias
+        tmp_path = self.path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for collection in self.collections:
+            if collection not in data:
+                continue
+            path = os.path.join(tmp_path, f"{collection}{self.extension}")
+            if self.binary:
+                atomic_write_bytes(path, encode_snapshot(data[collection]))
+            else:
+                atomic_write_json(path, data[collection], indent=4)
+        try:
+            os.rename(tmp_path, self.path)
+        except OSError:
+            # Otro proceso publicó el dominio primero
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _segment(self, collection):
+        if collection not in self.collections:
+            raise KeyError(f"Colección desconocida en el dominio {self.domain}: {collection}")
+        return WriteBehindFile.open(
+            os.path.join(self.path, f"{collection}{self.extension}"), binary=self.binary
+        )
+
+    def load(self, collection):
+        """Contenido del segmento, o None si todavía no se escribió."""
+        segment = self._segment(collection)
+        if not os.path.exists(segment.path) and not segment.metrics()["pending"]:
+            if self.binary:
+                return self._load_json_segment(collection)
+            return None
+        return segment.load()
+
+    def _load_json_segment(self, collection):
+        """Formato binario sobre un dominio escrito en JSON: se lee y se agenda la conversión."""
+        path = os.path.join(self.path, f"{collection}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            value = json.load(f)
+        self.save(collection, lambda: value)
+        return value
+
+    def describe(self):
+        """Índice de cada segmento binario (codec, tipo, elementos, bytes) sin decodificarlo."""
+        info = {}
+        for collection in self.collections:
+            path = os.path.join(self.path, f"{collection}{self.extension}")
+            if not os.path.exists(path):
+                continue
+            if self.binary:
+                info[collection] = read_header(path)
+            else:
+                info[collection] = {"codec": "json", "length": os.path.getsize(path)}
+        return info
+
+    def save(self, collection, snapshot):
+        """Marca el segmento como sucio; snapshot es un callable que retorna su contenido."""
+        self._segment(collection).mark_dirty(snapshot)
+
+    def flush(self):
+        """Escribe todos los segmentos con cambios pendientes. Retorna cuántos escribió."""
+        return sum(1 for collection in self.collections if self._segment(collection).flush())
+
+    def metrics(self):
+        return {collection: self._segment(collection).metrics() for collection in self.collections}
+
+
+class LazyCollection:
+    """
+    Atributo de instancia respaldado por un segmento de PartitionedStore (el de
+    obj._partitions): se lee del disco en el primer acceso. Si el segmento no
+    existe se usa factory(obj) o, sin factory, empty(); un segmento guardado vacío
+    ([] o {}) se respeta. decode, si se da, convierte lo leído del segmento
+    (p. ej. fechas guardadas como texto).
+    """
+
+    def __init__(self, collection, factory=None, empty=list, decode=None):
+        self.collection = collection
+        self.factory = factory
+        self.empty = empty
+        self.decode = decode
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            pass
+        value = obj._partitions.load(self.collection)
+        if value is None:
+            value = self.factory(obj) if self.factory else self.empty()
+        elif self.decode:
+            value = self.decode(value)
+        obj.__dict__[self.name] = value
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
+    def is_loaded(self, obj):
+        return self.name in obj.__dict__
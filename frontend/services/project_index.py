@@ -0,0 +1,97 @@
+from collections import Counter
+
+
+class ProjectIndex:
+    """
+    Índices en memoria sobre la lista de proyectos de MockApiClient (que sigue
+    siendo la fuente de verdad y lo que se persiste). Índice primario por id,
+    alias por id normalizado (strip + casefold) e índices secundarios por los
+    campos de SECONDARY_FIELDS. Cada proyecto recuerda los valores con los que
+    fue indexado, así un upsert lo reubica aunque el dict se haya modificado
+    en el lugar antes de llamarlo. Los conteos por valor se mantienen al indexar.
+    """
+
+    SECONDARY_FIELDS = ("estado_proyecto", "campana", "yacimiento", "responsable")
+
+    def __init__(self, projects):
+        self.projects = projects
+        self._by_id = {}
+        self._by_alias = {}
+        self._secondary = {field: {} for field in self.SECONDARY_FIELDS}
+        self._counts = {field: Counter() for field in self.SECONDARY_FIELDS}
+        self._filed = {}
+        for project in projects:
+            self._add(project)
+
+    @staticmethod
+    def alias(project_id):
+        return str(project_id).strip().casefold()
+
+    def _add(self, project):
+        project_id = project['id']
+        self._by_id[project_id] = project
+        self._by_alias.setdefault(self.alias(project_id), project)
+        filed = {}
+        for field in self.SECONDARY_FIELDS:
+            value = project.get(field)
+            self._secondary[field].setdefault(value, {})[project_id] = project
+            self._counts[field][value] += 1
+            filed[field] = value
+        self._filed[project_id] = filed
+
+    def _unfile(self, project_id):
+        for field, value in self._filed.pop(project_id, {}).items():
+            bucket = self._secondary[field].get(value)
+            if bucket is not None and bucket.pop(project_id, None) is not None:
+                self._counts[field][value] -= 1
+                if not bucket:
+                    del self._secondary[field][value]
+                    del self._counts[field][value]
+
+    def get(self, project_id):
+        """Proyecto por id exacto o, si no existe, por id normalizado. O(1)."""
+        if not project_id:
+            return None
+        target = str(project_id).strip()
+        project = self._by_id.get(target)
+        if project is None:
+            project = self._by_alias.get(self.alias(target))
+        return project
+
+    def where(self, field, value):
+        """Proyectos con field == value, en orden de alta. O(resultado)."""
+        return list(self._secondary[field].get(value, {}).values())
+
+    def count(self, field, value):
+        """Cantidad de proyectos con field == value. O(1)."""
+        return self._counts[field].get(value, 0)
+
+    def counts(self, field):
+        """Cantidad de proyectos por valor del campo."""
+        return dict(self._counts[field])
+
+    def filed_values(self, project_id):
+        """Valores de los campos secundarios con los que está indexado el proyecto."""
+        return dict(self._filed.get(project_id, {}))
+
+    def upsert(self, data):
+        """
+        Alta o actualización (merge) de un proyecto, manteniendo los índices.
+        Retorna (proyecto, estado_previo) con estado_previo None en un alta.
+        """
+        existing = self._by_id.get(data['id'])
+        if existing is None:
+            self.projects.append(data)
+            self._add(data)
+            return data, None
+        prev_state = existing.copy()
+        self._unfile(existing['id'])
+        existing.update(data)
+        self._add(existing)
+        return existing, prev_state
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self.projects)
@@ -0,0 +1,163 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Copia deliberada de backend/db/query_stats.py: frontend y backend se
+# construyen en imágenes separadas (Containerfile.frontend copia sólo frontend/,
+# Containerfile.worker sólo backend/), así que no pueden importar un módulo común.
+# Un cambio aquí debe replicarse allá; sólo difieren _DB_LAYER_FILES y los
+# comentarios de contexto.
+
+# Archivos de la capa de datos que no cuentan como punto de llamada
+_DB_LAYER_FILES = ("/database_service.py", "/query_stats.py", "/connection_pool.py", "/contextlib.py")
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Forma canónica de una sentencia: literales y placeholders como '?', listas colapsadas."""
+    text = _STRING.sub("?", query)
+    text = text.replace("%s", "?")
+    text = _NUMBER.sub("?", text)
+    # IN (?, ?, ?) y VALUES (?, ?), (?, ?) de largo variable -> una sola forma
+    text = _PLACEHOLDER_LIST.sub("(...)", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def call_site():
+    """Primer frame fuera de la capa de datos: 'services/archivo.py:funcion'."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace("\\", "/")
+        if not filename.endswith(_DB_LAYER_FILES):
+            parts = filename.split("/")
+            return f"{'/'.join(parts[-2:])}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "desconocido"
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+class QueryTimer:
+    """Medición de una sentencia; rows se completa antes de salir del bloque."""
+
+    def __init__(self, stats, query):
+        self.stats = stats
+        self.query = query
+        self.rows = None
+        self.elapsed = 0.0
+        self.site = call_site()
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._start is not None:
+            self.elapsed += time.perf_counter() - self._start
+        self.stats.record(self.query, self.elapsed, rows=self.rows, site=self.site, error=exc_type is not None)
+        return False
+
+    def pause(self):
+        """Acumula el tiempo transcurrido (streaming: no se mide el tiempo del consumidor)."""
+        self.elapsed += time.perf_counter() - self._start
+        self._start = None
+
+    def resume(self):
+        self._start = time.perf_counter()
+
+
+class QueryStats:
+    """
+    Estadísticas de consultas del proceso, por sentencia normalizada: llamadas,
+    errores, filas, tiempo total y una muestra de las últimas duraciones para
+    p50/p95/p99. Las sentencias que superan slow_ms van al log de consultas lentas.
+    """
+
+    def __init__(self, slow_ms=200.0, sample_size=1000, slow_log_size=200):
+        self.slow_ms = slow_ms
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+
+    def track(self, query):
+        return QueryTimer(self, query)
+
+    def record(self, query, elapsed, rows=None, site=None, error=False):
+        key = normalize_query(query)
+        elapsed_ms = elapsed * 1000.0
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = {
+                    "calls": 0, "errors": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "samples": deque(maxlen=self.sample_size), "sites": {},
+                }
+            entry["calls"] += 1
+            entry["errors"] += 1 if error else 0
+            entry["rows"] += rows or 0
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["samples"].append(elapsed_ms)
+            entry["sites"][site] = entry["sites"].get(site, 0) + 1
+            if elapsed_ms >= self.slow_ms:
+                self.slow_log.append({
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "query": key,
+                    "ms": round(elapsed_ms, 1),
+                    "rows": rows,
+                    "site": site,
+                })
+        if elapsed_ms >= self.slow_ms:
+            logger.warning("Consulta lenta (%.1f ms, %s filas) en %s: %s", elapsed_ms, rows, site, key)
+
+    def snapshot(self):
+        """Tabla de estadísticas ordenada por tiempo total consumido."""
+        with self._lock:
+            items = [(key, dict(entry, samples=sorted(entry["samples"]), sites=dict(entry["sites"])))
+                     for key, entry in self._stats.items()]
+        table = []
+        for key, entry in items:
+            samples = entry["samples"]
+            table.append({
+                "query": key,
+                "calls": entry["calls"],
+                "errors": entry["errors"],
+                "avg_rows": round(entry["rows"] / entry["calls"], 1),
+                "total_ms": round(entry["total_ms"], 1),
+                "p50_ms": round(_percentile(samples, 50), 2),
+                "p95_ms": round(_percentile(samples, 95), 2),
+                "p99_ms": round(_percentile(samples, 99), 2),
+                "max_ms": round(entry["max_ms"], 2),
+                "sites": ", ".join(site for site, _ in sorted(entry["sites"].items(), key=lambda x: -x[1])[:3]),
+            })
+        return sorted(table, key=lambda row: -row["total_ms"])
+
+    def slow_queries(self):
+        with self._lock:
+            return list(reversed(self.slow_log))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow_log.clear()
+
+
+# Instancia del proceso, compartida por todas las sesiones
+query_stats = QueryStats(slow_ms=float(os.getenv("DB_SLOW_QUERY_MS", 200)))
@@ -4,17 +4,23 @@ from datetime import datetime, date
 from typing import List, Dict, Any, Optional
 import pandas as pd
 from services.database_service import DatabaseService
+from services.local_store import LocalDocument
 
 class RecursoEstadoService:
     """
     Servicio para la gestión del estado operativo diario de los recursos (Personal y Equipos).
-    Interactúa con MySQL y usa JSON local como fallback.
+    Interactúa con MySQL y usa el store local SQLite como fallback
+    (persistence_file, si existe, sólo se importa como semilla).
     """
+
+    LOCAL_SCHEMA = {"estados": ("id_estado", ["id_recurso", "fecha", "tipo_recurso"])}
+
     def __init__(self, persistence_file: str = "frontend/services/recurso_estado_db.json"):
         self.db = DatabaseService()
         self.persistence_file = persistence_file
         self.use_mock = not self.db.is_available()
         self.mock_data = []
+        self._last_id = 0
         if self.use_mock:
             self._init_mock_db()
         else:
@@ -37,15 +43,12 @@ class RecursoEstadoService:
         self.db.execute(query)
 
     def _init_mock_db(self):
-        if os.path.exists(self.persistence_file):
-            try:
-                with open(self.persistence_file, 'r') as f:
-                    self.mock_data = json.load(f)
-            except Exception:
-                self.mock_data = []
-        else:
-            self.mock_data = []
-            
+        self._doc = LocalDocument("recurso_estado", self.LOCAL_SCHEMA)
+        if not self._doc.store.is_initialized("recurso_estado"):
+            self._import_legacy_file()
+        self.mock_data = self._doc.load()["estados"]
+        self._last_id = max((r['id_estado'] for r in self.mock_data), default=0)
+
         # Si sigue vacío (primera ejecución o sin archivo), generamos datos de simulación
         # extraídos orgánicamente de MockApiClient para dar sensación de MVP vivo.
         if not self.mock_data:
@@ -60,7 +63,7 @@ class RecursoEstadoService:
         # Iteramos sobre los proyectos para simular estados coherentes
         pozos = api.get_all_wells()
         for pozo in pozos:
-            detail = api.get_project_detail(pozo['id'])
+            detail = api.get_project_projection(pozo['id'], ('equipment_list', 'personnel_list'))
             if not detail: continue
             
             estado_proj = pozo['estado_proyecto']
@@ -78,7 +81,7 @@ class RecursoEstadoService:
                     estado_op = 'STANDBY'
                     
                 self.mock_data.append({
-                    'id_estado': len(self.mock_data) + 1,
+                    'id_estado': self._next_id(),
                     'id_recurso': eq['name'], # Equipos en el mock usan nombre como ID visual
                     'tipo_recurso': 'EQUIPO',
                     'fecha': today_str,
@@ -102,7 +105,7 @@ class RecursoEstadoService:
                 recurso_id = p.get('name', 'Desconocido')
                 
                 self.mock_data.append({
-                    'id_estado': len(self.mock_data) + 1,
+                    'id_estado': self._next_id(),
                     'id_recurso': recurso_id,
                     'tipo_recurso': 'PERSONAL',
                     'fecha': today_str,
@@ -116,7 +119,7 @@ class RecursoEstadoService:
         for m_eq in api.get_master_equipment():
             if not any(r['id_recurso'] == m_eq['name'] for r in self.mock_data):
                 self.mock_data.append({
-                    'id_estado': len(self.mock_data) + 1,
+                    'id_estado': self._next_id(),
                     'id_recurso': m_eq['name'],
                     'tipo_recurso': 'EQUIPO',
                     'fecha': today_str,
@@ -129,7 +132,7 @@ class RecursoEstadoService:
         for m_pe in api.get_master_personnel():
             if not any(r['id_recurso'] == m_pe['name'] for r in self.mock_data):
                 self.mock_data.append({
-                    'id_estado': len(self.mock_data) + 1,
+                    'id_estado': self._next_id(),
                     'id_recurso': m_pe['name'],
                     'tipo_recurso': 'PERSONAL',
                     'fecha': today_str,
@@ -138,12 +141,29 @@ class RecursoEstadoService:
                     'observaciones': '',
                     'ts_creacion': datetime.now().isoformat()
                 })
-        self._persist_mock()
+        self._persist_mock(changed=self.mock_data)
+
+    def _import_legacy_file(self):
+        """Importa el JSON de versiones anteriores (una lista de estados) como semilla."""
+        estados = []
+        if os.path.exists(self.persistence_file):
+            try:
+                with open(self.persistence_file, 'r') as f:
+                    estados = json.load(f)
+            except Exception:
+                estados = []
+        self._doc.save({"estados": estados}, initialize=True)
+
+    def _persist_mock(self, changed=(), removed=()):
+        # Escritura por fila: sólo los estados nuevos, modificados o eliminados
+        self._doc.mark("estados", *changed)
+        self._doc.mark_removed("estados", *removed)
+        self._doc.save({"estados": self.mock_data})
 
-    def _persist_mock(self):
-        os.makedirs(os.path.dirname(self.persistence_file), exist_ok=True)
-        with open(self.persistence_file, 'w') as f:
-            json.dump(self.mock_data, f, indent=2)
+    def _next_id(self):
+        # Contador (no len + 1): los ids siguen siendo únicos después de un delete_estado
+        self._last_id += 1
+        return self._last_id
 
     def get_estados(self, fecha: Optional[date] = None, tipo_recurso: Optional[str] = None) -> List[Dict]:
         """Obtiene la lista de estados filtrada."""
@@ -176,7 +196,7 @@ class RecursoEstadoService:
             existing_idx = next((i for i, r in enumerate(self.mock_data) if r['id_recurso'] == id_recurso and r['fecha'] == fecha_str), None)
             
             new_record = {
-                'id_estado': len(self.mock_data) + 1 if existing_idx is None else self.mock_data[existing_idx]['id_estado'],
+                'id_estado': self._next_id() if existing_idx is None else self.mock_data[existing_idx]['id_estado'],
                 'id_recurso': id_recurso,
                 'tipo_recurso': tipo_recurso,
                 'fecha': fecha_str,
@@ -190,7 +210,7 @@ class RecursoEstadoService:
             else:
                 self.mock_data.append(new_record)
             
-            self._persist_mock()
+            self._persist_mock(changed=[new_record])
             return {"success": True, "msg": "Estado registrado localmente."}
         else:
             # MySQL REPLACE INTO to handle duplicates via UNIQUE KEY
@@ -206,10 +226,60 @@ class RecursoEstadoService:
             else:
                 return {"success": False, "msg": "No se pudo registrar en DB."}
 
+    def add_estados(self, registros: List[Dict]) -> Dict:
+        """
+        Carga masiva de estados diarios (parte diario completo, importaciones).
+        Cada registro tiene las claves de add_estado; en DB es un único REPLACE
+        multi-fila por lote dentro de una transacción.
+        """
+        columnas = ['id_recurso', 'tipo_recurso', 'fecha', 'estado_operativo', 'id_pozo', 'observaciones']
+        filas = []
+        for r in registros:
+            fecha = r['fecha']
+            filas.append({
+                'id_recurso': r['id_recurso'],
+                'tipo_recurso': r['tipo_recurso'],
+                'fecha': fecha.isoformat() if isinstance(fecha, date) else str(fecha),
+                'estado_operativo': r['estado_operativo'],
+                'id_pozo': r.get('id_pozo'),
+                'observaciones': r.get('observaciones'),
+            })
+        if not filas:
+            return {"success": True, "msg": "Sin estados para registrar.", "count": 0}
+
+        if self.use_mock:
+            index = {(r['id_recurso'], r['fecha']): i for i, r in enumerate(self.mock_data)}
+            changed = []
+            for fila in filas:
+                key = (fila['id_recurso'], fila['fecha'])
+                existing_idx = index.get(key)
+                record = {
+                    'id_estado': self._next_id() if existing_idx is None else self.mock_data[existing_idx]['id_estado'],
+                    **fila,
+                    'ts_creacion': datetime.now().isoformat()
+                }
+                if existing_idx is not None:
+                    self.mock_data[existing_idx] = record
+                else:
+                    index[key] = len(self.mock_data)
+                    self.mock_data.append(record)
+                changed.append(record)
+            self._persist_mock(changed=changed)
+            return {"success": True, "msg": f"{len(filas)} estados registrados localmente.", "count": len(filas)}
+
+        rows = self.db.insert_many(
+            'tbl_recurso_estado_diario', columnas,
+            [tuple(f[c] for c in columnas) for f in filas], replace=True
+        )
+        if rows > 0:
+            return {"success": True, "msg": f"{len(filas)} estados registrados en DB.", "count": len(filas)}
+        return {"success": False, "msg": "No se pudo registrar en DB.", "count": 0}
+
     def delete_estado(self, id_estado: int) -> bool:
         if self.use_mock:
+            removed = [r for r in self.mock_data if r['id_estado'] == id_estado]
             self.mock_data = [r for r in self.mock_data if r['id_estado'] != id_estado]
-            self._persist_mock()
+            self._persist_mock(removed=removed)
             return True
         else:
             query = "DELETE FROM tbl_recurso_estado_diario WHERE id_estado = %s"
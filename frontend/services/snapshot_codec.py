@@ -0,0 +1,70 @@
+import json
+import struct
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+MAGIC = b"PNASNAP1"
+_HEADER_LEN = struct.Struct(">I")
+_PREFIX_SIZE = len(MAGIC) + _HEADER_LEN.size
+
+
+def encode_snapshot(value, codec=None):
+    """
+    Serializa value en el formato binario de snapshot:
+    MAGIC | largo del header (uint32) | header JSON | payload.
+    El header es un índice chico (codec, tipo, cantidad de elementos, bytes del
+    payload) que se puede leer sin decodificar el contenido. El payload va en
+    msgpack si está instalado; si no, en JSON compacto.
+    """
+    codec = codec or ("msgpack" if MSGPACK_AVAILABLE else "json")
+    if codec == "msgpack":
+        payload = msgpack.packb(value, default=str, use_bin_type=True)
+    else:
+        payload = json.dumps(value, default=str, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    header = json.dumps({
+        "codec": codec,
+        "type": type(value).__name__,
+        "count": len(value) if isinstance(value, (list, dict)) else None,
+        "length": len(payload),
+    }, separators=(",", ":")).encode("utf-8")
+    return MAGIC + _HEADER_LEN.pack(len(header)) + header + payload
+
+
+def is_snapshot(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+def _split(data):
+    if not is_snapshot(data):
+        raise ValueError("No es un snapshot binario")
+    (header_len,) = _HEADER_LEN.unpack_from(data, len(MAGIC))
+    start = _PREFIX_SIZE + header_len
+    header = json.loads(bytes(data[_PREFIX_SIZE:start]).decode("utf-8"))
+    return header, start
+
+
+def read_header(path):
+    """Lee sólo el índice del snapshot (unos pocos bytes), sin el payload."""
+    with open(path, "rb") as f:
+        prefix = f.read(_PREFIX_SIZE)
+        if not is_snapshot(prefix):
+            raise ValueError(f"{path} no es un snapshot binario")
+        (header_len,) = _HEADER_LEN.unpack_from(prefix, len(MAGIC))
+        return json.loads(f.read(header_len).decode("utf-8"))
+
+
+def decode_snapshot(data):
+    """Decodifica un snapshot completo (bytes leídos de disco)."""
+    view = memoryview(data)
+    header, start = _split(view)
+    payload = view[start:start + header["length"]]
+    if header["codec"] == "msgpack":
+        if not MSGPACK_AVAILABLE:
+            raise RuntimeError("El snapshot está en msgpack y el paquete msgpack no está instalado")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    return json.loads(bytes(payload).decode("utf-8"))
@@ -0,0 +1,178 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from .snapshot_codec import decode_snapshot, encode_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_json(path, data, indent=None):
+    """Escribe JSON en un temporal del mismo directorio y lo renombra: nunca queda un archivo a medias."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def atomic_write_bytes(path, data):
+    """Como atomic_write_json, para contenido binario ya serializado."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class WriteBehindFile:
+    """
+    Persistencia diferida de un documento JSON. Cada mutación sólo marca el
+    documento como sucio y registra cómo obtener su contenido; un hilo de fondo
+    lo escribe una vez pasado flush_interval desde el primer cambio pendiente,
+    o al acumular max_pending cambios. Una ráfaga de ediciones termina en una
+    única reescritura (temporal + rename). Al cerrar el proceso se fuerza el flush.
+    Con binary=True el documento se guarda como snapshot binario (snapshot_codec).
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path, **kwargs):
+        """Retorna la instancia única del proceso para el archivo dado."""
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls(path, **kwargs)
+                cls._instances[key] = store
+            return store
+
+    def __init__(self, path, flush_interval=None, max_pending=None, indent=4, binary=False):
+        self.path = path
+        self.binary = binary
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("MOCK_PERSIST_FLUSH_INTERVAL", 2.0))
+        self.max_pending = max_pending if max_pending is not None else int(
+            os.getenv("MOCK_PERSIST_MAX_PENDING", 50))
+        self.indent = indent
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._snapshot = None
+        self._pending = 0
+        self._dirty_since = None
+        self._closed = False
+        self._thread = None
+        self._marks = 0
+        self._flushes = 0
+        self._last_flush_ms = 0.0
+        atexit.register(self.close)
+
+    def load(self, default=None):
+        """Lee el documento; los cambios pendientes se escriben antes para no leer un estado viejo."""
+        self.flush()
+        if os.path.exists(self.path):
+            if self.binary:
+                with open(self.path, 'rb') as f:
+                    return decode_snapshot(f.read())
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {} if default is None else default
+
+    def mark_dirty(self, snapshot):
+        """
+        Registra una mutación. snapshot es un callable que retorna el documento
+        completo; se invoca recién al escribir, así se serializa el último estado.
+        """
+        with self._cond:
+            self._snapshot = snapshot
+            self._pending += 1
+            self._marks += 1
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            flush_now = self._closed or self._pending >= self.max_pending
+            if not flush_now:
+                self._ensure_thread()
+                self._cond.notify()
+        if flush_now:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and self._dirty_since is None:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                remaining = self._dirty_since + self.flush_interval - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("No se pudo escribir %s; se reintenta", self.path)
+
+    def flush(self):
+        """Escribe el documento si hay cambios pendientes. Retorna True si escribió."""
+        with self._io_lock:
+            with self._cond:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    return False
+                pending = self._pending
+                self._snapshot = None
+                self._pending = 0
+                self._dirty_since = None
+            start = time.perf_counter()
+            try:
+                data = snapshot()
+                if self.binary:
+                    atomic_write_bytes(self.path, encode_snapshot(data))
+                else:
+                    atomic_write_json(self.path, data, indent=self.indent)
+            except Exception:
+                # Se reintenta en el próximo ciclo (p. ej. una lista mutada mientras se serializaba)
+                with self._cond:
+                    if self._snapshot is None:
+                        self._snapshot = snapshot
+                    self._pending += pending
+                    if self._dirty_since is None:
+                        self._dirty_since = time.monotonic()
+                raise
+            self._flushes += 1
+            self._last_flush_ms = (time.perf_counter() - start) * 1000.0
+            return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "pending": self._pending,
+                "marks": self._marks,
+                "flushes": self._flushes,
+                "coalesced": self._marks - self._flushes - self._pending,
+                "last_flush_ms": round(self._last_flush_ms, 2),
+            }
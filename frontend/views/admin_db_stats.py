@@ -0,0 +1,50 @@
+import streamlit as st
+import pandas as pd
+from services.database_service import DatabaseService
+from services.query_stats import query_stats
+
+
+def render_view():
+    st.title("📈 Rendimiento de Base de Datos")
+    st.caption("Estadísticas de consultas de este proceso, pool de conexiones y log de consultas lentas. (Solo Administradores)")
+
+    db = DatabaseService()
+
+    # --- Pool y circuit breaker ---
+    metrics = db.pool_metrics()
+    breaker = metrics.pop("breaker")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Estado MySQL", breaker["state"])
+    c2.metric("Conexiones en uso", f"{metrics['in_use']} / {metrics['max_size']}")
+    c3.metric("Conexiones libres", metrics["idle"])
+    c4.metric("Esperas por pool lleno", metrics["waits"])
+    with st.expander("Detalle del pool"):
+        st.json({**metrics, "breaker": breaker})
+
+    # --- Estadísticas por sentencia normalizada ---
+    st.subheader("Consultas por Sentencia")
+    stats = db.query_stats()
+    if not stats:
+        st.info("Todavía no se registraron consultas a MySQL en este proceso.")
+    else:
+        df = pd.DataFrame(stats)[[
+            "query", "calls", "errors", "avg_rows", "total_ms",
+            "p50_ms", "p95_ms", "p99_ms", "max_ms", "sites"
+        ]]
+        df.columns = ["Sentencia", "Llamadas", "Errores", "Filas Prom.", "Total (ms)",
+                      "p50 (ms)", "p95 (ms)", "p99 (ms)", "Máx (ms)", "Origen"]
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
+    # --- Log de consultas lentas ---
+    st.subheader(f"Consultas Lentas (≥ {query_stats.slow_ms:.0f} ms)")
+    slow = db.slow_queries()
+    if not slow:
+        st.success("Sin consultas lentas registradas.")
+    else:
+        df_slow = pd.DataFrame(slow)[["timestamp", "ms", "rows", "site", "query"]]
+        df_slow.columns = ["Fecha", "Duración (ms)", "Filas", "Origen", "Sentencia"]
+        st.dataframe(df_slow, use_container_width=True, hide_index=True)
+
+    if st.button("Reiniciar estadísticas", key="btn_reset_query_stats"):
+        query_stats.reset()
+        st.rerun()
@@ -90,11 +90,11 @@ def render_view():
             # Dinámico según tipo
             if f_tipo == "PERSONAL":
                 opciones = [p['name'] for p in api.get_master_personnel()]
-                f_recurso = c_f1.selectbox("Recurso", opciones)
+                f_recursos = c_f1.multiselect("Recursos", opciones)
                 estados_posibles = ['ACTIVO', 'STANDBY', 'LICENCIA', 'FRANCO']
             else:
                 opciones = [e['name'] for e in api.get_master_equipment()]
-                f_recurso = c_f1.selectbox("Recurso", opciones)
+                f_recursos = c_f1.multiselect("Recursos", opciones)
                 estados_posibles = ['ACTIVO', 'STANDBY', 'MANTENIMIENTO', 'ASIGNADO']
             
             f_estado = c_f2.selectbox("Estado", estados_posibles)
@@ -107,18 +107,22 @@ def render_view():
             f_obs = c_f4.text_input("Observaciones")
             
             if st.form_submit_button("Guardar Estado Diario", type="primary"):
-                if not f_recurso:
-                    st.error("Debe seleccionar un recurso válido existente en el maestro.")
+                if not f_recursos:
+                    st.error("Debe seleccionar al menos un recurso válido existente en el maestro.")
                 else:
                     pozo_val = f_pozo if f_pozo != "" else None
-                    res = recurso_estado_service.add_estado(
-                        id_recurso=f_recurso,
-                        tipo_recurso=f_tipo,
-                        fecha=fecha_filtro,
-                        estado_operativo=f_estado,
-                        id_pozo=pozo_val,
-                        observaciones=f_obs
-                    )
+                    # Parte diario de toda la cuadrilla en un único lote
+                    res = recurso_estado_service.add_estados([
+                        {
+                            'id_recurso': recurso,
+                            'tipo_recurso': f_tipo,
+                            'fecha': fecha_filtro,
+                            'estado_operativo': f_estado,
+                            'id_pozo': pozo_val,
+                            'observaciones': f_obs
+                        }
+                        for recurso in f_recursos
+                    ])
                     if res['success']:
                         st.success(res['msg'])
                         st.rerun()
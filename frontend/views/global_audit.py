@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import json
 from services.audit_service import AuditService
+from services.audit_delta import is_delta
+from services.export_service import ExportService
 
 def show_event_details(ev):
     """Muestra los detalles de un evento de auditoría con formato mejorado"""
@@ -45,7 +47,16 @@ def show_event_details(ev):
                 anterior = json.loads(ev['estado_anterior']) if isinstance(ev['estado_anterior'], str) and ev['estado_anterior'] else ev.get('estado_anterior', {})
                 nuevo = json.loads(ev['estado_nuevo']) if isinstance(ev['estado_nuevo'], str) and ev['estado_nuevo'] else ev.get('estado_nuevo', {})
                 
-                if anterior and nuevo:
+                if is_delta(nuevo):
+                    # Evento delta-encoded: sólo se muestran los campos modificados
+                    cambios = [{"Campo": k, "Valor Nuevo": str(v)} for k, v in nuevo.get('set', {}).items()]
+                    cambios += [{"Campo": k, "Valor Nuevo": "(eliminado)"} for k in nuevo.get('unset', [])]
+                    if cambios:
+                        st.dataframe(pd.DataFrame(cambios), use_container_width=True, hide_index=True)
+                    else:
+                        st.info("Sin cambios de campos respecto al estado anterior.")
+                    st.caption(f"Digest estado resultante: {nuevo.get('state_digest')}")
+                elif anterior and nuevo:
                     # Crear tabla comparativa
                     st.markdown("<table style='width:100%; border-collapse: collapse;'>", unsafe_allow_html=True)
                     st.markdown("<tr style='background-color: #1e1e1e;'>"
@@ -125,7 +136,7 @@ def render_view():
     st.divider()
     col1, col2, col3 = st.columns(3)
     
-    # Simulación de verificación global
+    # Verificación incremental desde el último checkpoint firmado
     is_ok, errors = audit.verify_integrity()
     
     if is_ok:
@@ -133,47 +144,59 @@ def render_view():
     else:
         col1.error(f"INTEGRIDAD COMPROMETIDA ({len(errors)})")
 
+    # Re-verificación completa desde el génesis (auditores / regulador)
+    if col2.button("Re-verificación Completa", key="btn_full_verify"):
+        full_ok, full_errors = audit.verify_integrity(full=True, parallel=True)
+        if full_ok:
+            col2.success("Cadena completa verificada desde el génesis")
+        else:
+            col2.error(f"Re-verificación completa: {len(full_errors)} error(es)")
+            for err in full_errors:
+                st.write(f"- {err}")
+
+    # Extracto completo para reguladores (streaming + manifiesto SHA256)
+    formato_export = col3.selectbox("Formato de extracto", ["JSONL", "CSV"], key="audit_export_fmt")
+    if col3.button("Exportar Log Completo", key="btn_audit_export"):
+        with st.spinner("Generando extracto del log de auditoría..."):
+            filepath, manifest = ExportService().exportar_audit_log(audit, formato=formato_export)
+        col3.success(f"{manifest['eventos']} eventos exportados")
+        st.caption(f"Archivo: {filepath}")
+        st.code(f"SHA256: {manifest['sha256']}\nÚltimo hash de cadena: {manifest['hash_evento_final']}", language="markdown")
+
     # Filtros
     st.subheader("Filtrar Eventos")
     f_col1, f_col2, f_col3 = st.columns(3)
     tipo = f_col1.selectbox("Tipo de Evento", ["TODOS", "LOGIN_SUCCESS", "SIGNAL_SENT", "OPERATIONAL_OVERRIDE", "EVIDENCE_UPLOAD", "DATA_CHANGE"])
-    usuario = f_col2.text_input("Filtrar por Usuario (ID)")
-    pozo = f_col3.text_input("Filtrar por Pozo (ID)")
+    usuario = f_col2.text_input("Filtrar por Usuario (ID)", help="Coincide con los IDs que empiezan con el texto ingresado")
+    pozo = f_col3.text_input("Filtrar por Pozo (ID)", help="Coincide con los IDs que empiezan con el texto ingresado")
 
-    # Consulta resiliente (Mock Fallback incluido en el servicio)
-    events = audit.get_all_events()
+    # Consulta paginada e indexada (Mock Fallback incluido en el servicio)
+    filtros = (tipo, usuario.strip(), pozo.strip())
+    if st.session_state.get('audit_filters') != filtros:
+        st.session_state['audit_filters'] = filtros
+        st.session_state['audit_cursors'] = [None]
+    cursors = st.session_state['audit_cursors']
 
-    # --- FILTRADO ROBUSTO ---
-    filtered_events = events
-    if tipo != "TODOS":
-        filtered_events = [e for e in filtered_events if e.get('tipo_evento') == tipo]
-    
-    if usuario:
-        u_query = usuario.lower().strip()
-        filtered_events = [
-            e for e in filtered_events 
-            if e.get('id_usuario') and u_query in str(e.get('id_usuario')).lower()
-        ]
-        
-    if pozo:
-        p_query = pozo.lower().strip()
-        filtered_events = [
-            e for e in filtered_events 
-            if e.get('entidad') == 'POZO' and e.get('entidad_id') and p_query in str(e.get('entidad_id')).lower()
-        ]
+    page = audit.query_events(
+        event_type=None if tipo == "TODOS" else tipo,
+        user=usuario.strip() or None,
+        entity="POZO" if pozo.strip() else None,
+        entity_id=pozo.strip() or None,
+        cursor=cursors[-1],
+        limit=20,
+        match_prefix=True
+    )
+    filtered_events = page['events']
 
     if not filtered_events:
         st.info("No se encontraron eventos coincidentes con los filtros aplicados.")
         return
 
-    # Ordenar eventos por fecha (más reciente primero)
-    filtered_events = sorted(filtered_events, key=lambda x: x['timestamp_utc'], reverse=True)
-
     # Visualización en Timeline
     st.subheader("Timeline de Eventos")
     st.caption("Visualizacion cronologica de operaciones con trazabilidad completa")
 
-    for idx, ev in enumerate(filtered_events[:20]):  # Mostrar últimos 20 eventos
+    for idx, ev in enumerate(filtered_events):  # Página actual (20 eventos)
         timestamp = ev['timestamp_utc'].strftime("%d/%m/%Y %H:%M:%S")
         usuario = ev.get('id_usuario', 'Sistema')
         tipo = ev['tipo_evento']
@@ -230,6 +253,16 @@ def render_view():
         
         st.divider()
 
+    # Paginación por cursor
+    nav1, nav2, nav3 = st.columns([1, 2, 1])
+    if len(cursors) > 1 and nav1.button("Página anterior", key="btn_audit_prev"):
+        cursors.pop()
+        st.rerun()
+    nav2.caption(f"Página {len(cursors)}")
+    if page['next_cursor'] is not None and nav3.button("Página siguiente", key="btn_audit_next"):
+        cursors.append(page['next_cursor'])
+        st.rerun()
+
     # Si hay un evento seleccionado, mostrar detalle
     if 'selected_audit_event' in st.session_state:
         ev = st.session_state['selected_audit_event']
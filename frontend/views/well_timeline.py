@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import datetime
 from services.audit_service import AuditService
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,7 +20,11 @@ def render_timeline(project_id):
     st.markdown("### 📜 Línea de Tiempo Regulatoria (Truth Log)")
     st.caption("Registro inmutable de eventos encadenados por Hash SHA256.")
 
-    events = audit.get_events_for_well(project_id)
+    # Página de la línea de tiempo materializada del pozo (cursor por pozo)
+    cursors_key = f"timeline_cursors_{project_id}"
+    cursors = st.session_state.setdefault(cursors_key, [None])
+    page = audit.get_well_timeline(project_id, cursor=cursors[-1], limit=20)
+    events = page['events']
 
     if not events:
         st.info("No hay eventos registrados para este pozo.")
@@ -35,6 +40,18 @@ def render_timeline(project_id):
             for err in errors:
                 st.write(f"- {err}")
 
+    # Reconstrucción del estado del pozo a una fecha (snapshot + replay de deltas)
+    with st.expander("🕰️ Estado del pozo a una fecha"):
+        c_date, c_time = st.columns(2)
+        at_date = c_date.date_input("Fecha (UTC)", key=f"tt_date_{project_id}")
+        at_time = c_time.time_input("Hora (UTC)", value=datetime.time(23, 59, 59), key=f"tt_time_{project_id}")
+        if st.button("Reconstruir estado", key=f"tt_run_{project_id}"):
+            state = audit.get_entity_state_at("POZO", project_id, datetime.datetime.combine(at_date, at_time))
+            if state is None:
+                st.info("El pozo no tenía datos registrados a esa fecha.")
+            else:
+                st.json(state)
+
     st.markdown("---")
 
     for event in events:
@@ -109,5 +126,14 @@ def render_timeline(project_id):
                     except:
                         st.write(event['metadata'])
 
+    # Paginación por cursor
+    nav1, nav2 = st.columns(2)
+    if len(cursors) > 1 and nav1.button("⬅️ Eventos más recientes", key=f"tl_prev_{project_id}"):
+        cursors.pop()
+        st.rerun()
+    if page['next_cursor'] is not None and nav2.button("Eventos anteriores ➡️", key=f"tl_next_{project_id}"):
+        cursors.append(page['next_cursor'])
+        st.rerun()
+
     st.markdown("---")
     st.caption("v0.1.0 | Blockchain-Light Audit Trail enabled")
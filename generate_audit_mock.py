@@ -1,6 +1,7 @@
 import hashlib
 import json
 import os
+import shutil
 from datetime import datetime, timedelta
 
 def calculate_hash(event_data, prev_hash):
@@ -84,6 +85,8 @@ def generate_mock_audit():
     os.makedirs("frontend/services", exist_ok=True)
     with open("frontend/services/audit_events.json", "w", encoding='utf-8') as f:
         json.dump(events, f, indent=4)
+    # El log segmentado sólo importa audit_events.json cuando está vacío
+    shutil.rmtree("frontend/services/audit_log", ignore_errors=True)
 
     # Create dummy evidence files
     storage_path = "storage/evidence"
@@ -1,8 +1,34 @@
+import csv
 import hashlib
 import json
+import os
+import tempfile
+import threading
 import unittest
-from services.audit_service import AuditService
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
+from services.audit_delta import DeltaMismatchError, apply_delta, is_delta, state_digest
+from services.audit_log_store import AuditLogStore
+from services.audit_service import AuditService, verify_event_chain
+from services.audit_writer import AuditWriter
 from services.database_service import DatabaseService
+from services.export_service import ExportService
+from services.query_stats import query_stats
+
+
+class OfflineDB:
+    """DatabaseService sin MySQL: fuerza el modo mock del AuditService."""
+    def is_available(self):
+        return False
+
+
+def make_offline_audit(tmp_dir):
+    audit = AuditService(OfflineDB())
+    audit.mock_db_path = os.path.join(tmp_dir, "audit_events.json")
+    audit.mock_log_dir = os.path.join(tmp_dir, "audit_log")
+    return audit
 
 class TestAuditIntegrity(unittest.TestCase):
     def setUp(self):
@@ -37,5 +63,533 @@ class TestAuditIntegrity(unittest.TestCase):
         self.assertFalse(is_ok, "La integridad debería fallar tras una modificación manual.")
         self.assertIn(f"Inconsistencia en ID {last_id}", errors[0])
 
+
+class TestAuditLogStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audit = make_offline_audit(self.tmp.name)
+
+    def tearDown(self):
+        self.audit._get_mock_store().close()
+        self.tmp.cleanup()
+
+    def test_append_keeps_chain(self):
+        """Los eventos se agregan al log segmentado sin romper la cadena."""
+        h1 = self.audit.log_event("user1", "Admin", "TEST_START", "POZO", "X-1")
+        h2 = self.audit.log_event("user1", "Admin", "TEST_STEP", "POZO", "X-1", new_state={"step": 1})
+        events = self.audit._load_mock_events()
+        self.assertEqual([e['id'] for e in events], [1, 2])
+        self.assertEqual(events[1]['hash_previo'], h1)
+        self.assertEqual(events[1]['hash_evento'], h2)
+        self.assertEqual(self.audit.verify_integrity(), (True, []))
+
+    def test_bulk_log_events_single_append(self):
+        """log_events encadena en memoria y persiste el lote completo."""
+        self.audit.log_event("user1", "Admin", "TEST", "POZO", "X-1")
+        hashes = self.audit.log_events(
+            {"user_id": "sync", "user_role": "system", "event_type": "SYNC_APPLIED",
+             "entity": "POZO", "entity_id": "X-1", "new_state": {"i": i}}
+            for i in range(5)
+        )
+        events = self.audit._load_mock_events()
+        self.assertEqual([e['hash_evento'] for e in events[1:]], hashes)
+        self.assertEqual(self.audit.verify_integrity(full=True), (True, []))
+
+    def test_tail_recovered_after_reopen(self):
+        """Una nueva instancia recupera la cola leyendo sólo el final del segmento."""
+        self.audit.log_event("user1", "Admin", "TEST", "POZO", "X-1")
+        last = self.audit.log_event("user1", "Admin", "TEST", "POZO", "X-1")
+        self.audit._get_mock_store().close()
+        store = AuditLogStore(self.audit.mock_log_dir)
+        self.assertEqual((store.last_id, store.last_hash), (2, last))
+        store.close()
+
+    def test_segment_rotation(self):
+        store = AuditLogStore(os.path.join(self.tmp.name, "rot"), max_segment_bytes=200)
+        for i in range(1, 9):
+            store.append({"id": i, "hash_evento": str(i), "payload": "x" * 80})
+        self.assertGreater(len(store.segments()), 1)
+        self.assertEqual([e['id'] for e in store.iter_events(start_id=5)], [5, 6, 7, 8])
+        store.close()
+
+    def test_last_batch_is_synced_without_further_appends(self):
+        store = AuditLogStore(os.path.join(self.tmp.name, "timer"), fsync_every=100, fsync_interval=0.2)
+        store.append({"id": 1, "hash_evento": "1"})
+        timer = store._sync_timer
+        self.assertIsNotNone(timer)
+        timer.join(2)
+        self.assertEqual(store._pending_sync, 0)
+        self.assertIsNone(store._sync_timer)
+        store.close()
+
+
+class TestAuditCheckpoints(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audit = make_offline_audit(self.tmp.name)
+        self.audit.checkpoint_secret = b"clave-de-test"
+        for i in range(3):
+            self.audit.log_event("user1", "Admin", "TEST", "POZO", "X-1", new_state={"step": i})
+
+    def tearDown(self):
+        self.audit._get_mock_store().close()
+        self.tmp.cleanup()
+
+    def _tamper_first_event(self):
+        store = self.audit._get_mock_store()
+        store.close()
+        path = store.segments()[0][1]
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        first = json.loads(lines[0])
+        first['estado_nuevo'] = json.dumps({"step": 99})
+        lines[0] = json.dumps(first) + "\n"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+
+    def test_incremental_walks_only_new_events(self):
+        self.assertEqual(self.audit.verify_integrity(), (True, []))
+        self.audit.log_event("user1", "Admin", "TEST", "POZO", "X-1")
+        self.assertEqual(self.audit.verify_integrity(), (True, []))
+        checkpoint = self.audit._load_checkpoint()
+        self.assertEqual(checkpoint['id'], 4)
+        self.assertEqual(checkpoint['eventos_verificados'], 1)
+
+    def test_full_mode_detects_tamper_before_checkpoint(self):
+        self.assertTrue(self.audit.verify_integrity()[0])
+        self._tamper_first_event()
+        self.assertTrue(self.audit.verify_integrity()[0])
+        is_ok, errors = self.audit.verify_integrity(full=True)
+        self.assertFalse(is_ok)
+        self.assertIn("Inconsistencia en ID 1", errors[0])
+
+    def test_forged_checkpoint_is_ignored(self):
+        self.assertTrue(self.audit.verify_integrity()[0])
+        path = os.path.join(self.audit.mock_log_dir, "checkpoint.json")
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        checkpoint['firma'] = "0" * 64
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        self._tamper_first_event()
+        self.assertFalse(self.audit.verify_integrity()[0])
+
+    def test_without_secret_always_verifies_fully(self):
+        self.audit.checkpoint_secret = None
+        self.assertTrue(self.audit.verify_integrity()[0])
+        self.assertFalse(os.path.exists(os.path.join(self.audit.mock_log_dir, "checkpoint.json")))
+        self._tamper_first_event()
+        self.assertFalse(self.audit.verify_integrity()[0])
+
+    def test_install_key_enables_checkpoints_by_default(self):
+        with mock.patch.dict("os.environ", {"AUDIT_CHECKPOINT_SECRET": ""}):
+            audit = make_offline_audit(self.tmp.name)
+        self.assertTrue(audit.verify_integrity()[0])
+        key_path = os.path.join(self.tmp.name, "audit_checkpoint.key")
+        self.assertEqual(os.stat(key_path).st_mode & 0o777, 0o600)
+        self.assertIsNotNone(audit._load_checkpoint())
+
+        with mock.patch.dict("os.environ", {"AUDIT_CHECKPOINT_SECRET": ""}):
+            reopened = make_offline_audit(self.tmp.name)
+        self.assertEqual(reopened._load_checkpoint()['id'], 3)
+
+
+class TestParallelVerification(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audit = make_offline_audit(self.tmp.name)
+        self.audit._mock_store = AuditLogStore(self.audit.mock_log_dir, max_segment_bytes=2000)
+        for i in range(60):
+            self.audit.log_event("user1", "Admin", "TEST", "POZO", f"X-{i % 3}", new_state={"step": i})
+
+    def tearDown(self):
+        self.audit._get_mock_store().close()
+        self.tmp.cleanup()
+
+    def test_parallel_matches_sequential(self):
+        store = self.audit._get_mock_store()
+        self.assertGreater(len(store.segments()), 2)
+        self.assertEqual(self.audit.verify_integrity(parallel=True, max_workers=2), (True, []))
+
+        # Alterar el enlace en la frontera de un segmento intermedio
+        store.close()
+        first_id, path = store.segments()[2]
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        event = json.loads(lines[0])
+        event['hash_previo'] = "f" * 64
+        lines[0] = json.dumps(event) + "\n"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+
+        sequential = self.audit.verify_integrity(full=True)
+        parallel = self.audit.verify_integrity(parallel=True, max_workers=2)
+        self.assertFalse(parallel[0])
+        self.assertEqual(parallel, sequential)
+        self.assertIn(f"Ruptura de cadena en ID {first_id}", parallel[1][0])
+
+
+class TestAuditQuery(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audit = make_offline_audit(self.tmp.name)
+        for i in range(30):
+            self.audit.log_event(f"user{i % 2}", "Admin", "DATA_CHANGE" if i % 3 else "SIGNAL_SENT",
+                                 "POZO", f"X-{i % 5}", new_state={"step": i})
+
+    def tearDown(self):
+        self.audit._get_mock_store().close()
+        self.tmp.cleanup()
+
+    def test_filters_match_full_scan(self):
+        expected = [e['id'] for e in reversed(self.audit._load_mock_events())
+                    if e['id_usuario'] == "user1" and e['tipo_evento'] == "DATA_CHANGE"]
+        page = self.audit.query_events(event_type="DATA_CHANGE", user="USER1", limit=100)
+        self.assertEqual([e['id'] for e in page['events']], expected)
+        self.assertIsNone(page['next_cursor'])
+
+    def test_prefix_filters(self):
+        self.audit.log_event("jperez", "Admin", "DATA_CHANGE", "POZO", "X-10")
+        exact = self.audit.query_events(user="USER", limit=100)
+        self.assertEqual(exact['events'], [])
+        page = self.audit.query_events(user="USER", entity_id="x-1", match_prefix=True, limit=100)
+        expected = [e['id'] for e in reversed(self.audit._load_mock_events())
+                    if e['id_usuario'].startswith("user") and e['entidad_id'].lower().startswith("x-1")]
+        self.assertEqual([e['id'] for e in page['events']], expected)
+        self.assertEqual(len(expected), 6)
+        # Un valor nuevo queda alcanzable por prefijo
+        self.audit.log_event("user10", "Admin", "DATA_CHANGE", "POZO", "X-1")
+        page = self.audit.query_events(user="user1", match_prefix=True, limit=100)
+        self.assertEqual(page['events'][0]['id_usuario'], "user10")
+        self.assertEqual(AuditService._like_prefix("x_1%"), "x\\_1\\%%")
+
+    def test_cursor_pagination(self):
+        seen = []
+        cursor = None
+        while True:
+            page = self.audit.query_events(entity="POZO", entity_id="X-2", cursor=cursor, limit=4)
+            seen.extend(e['id'] for e in page['events'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [i + 1 for i in reversed(range(30)) if i % 5 == 2])
+
+    def test_well_timeline_pages(self):
+        expected = [i + 1 for i in reversed(range(30)) if i % 5 == 3]
+        first = self.audit.get_well_timeline("X-3", limit=4)
+        self.assertEqual([e['id'] for e in first['events']], expected[:4])
+        second = self.audit.get_well_timeline("X-3", cursor=first['next_cursor'], limit=4)
+        self.assertEqual([e['id'] for e in second['events']], expected[4:])
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual([e['id'] for e in self.audit.get_events_for_well("X-3")], expected)
+
+    def test_well_timeline_rebuilt_from_watermark(self):
+        """Si se pierden las líneas de tiempo, se reconstruyen al reabrir el log."""
+        store = self.audit._get_mock_store()
+        store.close()
+        for name in os.listdir(store.timelines.base_dir):
+            os.remove(os.path.join(store.timelines.base_dir, name))
+        reopened = AuditLogStore(self.audit.mock_log_dir)
+        events, _ = reopened.well_events("X-1", limit=2)
+        self.assertEqual([e['id'] for e in events], [27, 22])
+        reopened.close()
+
+    def test_index_follows_new_appends(self):
+        self.audit.query_events(limit=1)
+        self.audit.log_event("nuevo", "HSE", "LOGIN_SUCCESS", "USUARIO", "nuevo")
+        page = self.audit.query_events(user="nuevo")
+        self.assertEqual([e['id'] for e in page['events']], [31])
+
+
+class TestAuditDelta(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audit = make_offline_audit(self.tmp.name)
+
+    def tearDown(self):
+        self.audit._get_mock_store().close()
+        self.tmp.cleanup()
+
+    def test_deltas_replay_to_full_state(self):
+        states = [{"id": "D-1", "estado": "PLANIFICADO", "pct": 0}]
+        states.append({**states[-1], "estado": "EN_EJECUCION", "pct": 10})
+        states.append({"id": "D-1", "estado": "EN_EJECUCION", "pct": 55, "obs": "cementando"})
+        prev = None
+        for state in states:
+            self.audit.log_event("u", "Admin", "DATA_CHANGE", "POZO", "D-1",
+                                 prev_state=prev, new_state=state, delta=True)
+            prev = state
+
+        events = self.audit.get_events_for_well("D-1")[::-1]
+        deltas = [json.loads(e['estado_nuevo']) for e in events]
+        self.assertTrue(all(is_delta(d) for d in deltas))
+        self.assertEqual(deltas[1]['set'], {"estado": "EN_EJECUCION", "pct": 10})
+        self.assertNotIn("base", deltas[1])
+
+        state = None
+        for d in deltas:
+            state = apply_delta(state, d)
+            self.assertEqual(state_digest(state), d['state_digest'])
+        self.assertEqual(state, states[-1])
+        self.assertTrue(self.audit.verify_integrity(full=True)[0])
+
+    def test_keyframe_when_history_has_no_delta(self):
+        self.audit.log_event("u", "Admin", "DATA_CHANGE", "POZO", "D-2", new_state={"pct": 5})
+        self.audit.log_event("u", "Admin", "DATA_CHANGE", "POZO", "D-2",
+                             prev_state={"pct": 5}, new_state={"pct": 6}, delta=True)
+        last = json.loads(self.audit.get_events_for_well("D-2")[0]['estado_nuevo'])
+        self.assertEqual(last['base'], {"pct": 5})
+        self.assertEqual(apply_delta(None, last), {"pct": 6})
+
+    def test_state_at_uses_snapshots(self):
+        self.audit.SNAPSHOT_EVERY = 4
+        prev = None
+        history = []
+        for i in range(11):
+            state = {"id": "D-3", "pct": i * 10, "fase": "A" if i < 6 else "B"}
+            self.audit.log_event("u", "Admin", "DATA_CHANGE", "POZO", "D-3",
+                                 prev_state=prev, new_state=state, delta=True)
+            history.append((self.audit.get_events_for_well("D-3")[0]['timestamp_utc'], state))
+            prev = state
+
+        self.assertIsNone(self.audit.get_entity_state_at("POZO", "D-3", history[0][0] - timedelta(seconds=1)))
+        self.assertEqual(self.audit.get_entity_state_at("POZO", "D-3"), history[-1][1])
+        snapshots = self.audit._get_mock_store().snapshots
+        self.assertEqual(snapshots.latest("POZO", "D-3")['id_evento'], 8)
+        for ts, state in history:
+            self.assertEqual(self.audit.get_entity_state_at("POZO", "D-3", ts), state)
+
+    def _log_states(self, entity_id, count):
+        prev = None
+        for i in range(count):
+            state = {"id": entity_id, "pct": i * 10}
+            self.audit.log_event("u", "Admin", "DATA_CHANGE", "POZO", entity_id,
+                                 prev_state=prev, new_state=state, delta=True)
+            prev = state
+        return prev
+
+    def test_digests_reject_out_of_order_deltas(self):
+        self._log_states("D-4", 3)
+        deltas = [json.loads(e['estado_nuevo']) for e in self.audit.get_events_for_well("D-4")[::-1]]
+        with self.assertRaises(DeltaMismatchError):
+            apply_delta(apply_delta(None, deltas[0]), deltas[2])
+
+        # Un evento faltante sin keyframe posterior no devuelve un estado incorrecto
+        original = self.audit._state_events_after
+        def missing_second(*args):
+            events = original(*args)
+            return events[:1] + events[2:]
+        with mock.patch.object(self.audit, "_state_events_after", side_effect=missing_second):
+            with self.assertRaises(DeltaMismatchError):
+                self.audit.get_entity_state_at("POZO", "D-4")
+
+        # Con un keyframe posterior la reconstrucción se retoma desde él
+        self.audit.log_event("u", "Admin", "DATA_CHANGE", "POZO", "D-4",
+                             prev_state={"id": "D-4", "pct": 99}, new_state={"id": "D-4", "pct": 100}, delta=True)
+        with mock.patch.object(self.audit, "_state_events_after", side_effect=missing_second):
+            self.assertEqual(self.audit.get_entity_state_at("POZO", "D-4"), {"id": "D-4", "pct": 100})
+
+    def test_inconsistent_snapshot_is_rebuilt_from_history(self):
+        last = self._log_states("D-5", 4)
+        store = self.audit._get_mock_store()
+        second = self.audit.get_events_for_well("D-5")[-2]
+        store.snapshots.add("POZO", "D-5", second['id'], second['timestamp_utc'], {"id": "D-5", "pct": -1})
+        self.assertEqual(self.audit.get_entity_state_at("POZO", "D-5"), last)
+
+
+class TestAuditExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audit = make_offline_audit(self.tmp.name)
+        for i in range(25):
+            self.audit.log_event("u", "Admin", "DATA_CHANGE", "POZO", f"E-{i % 3}",
+                                 new_state={"step": i, "nota": "línea, con \"comillas\""})
+        self.exporter = ExportService()
+        self.exporter.export_path = self.tmp.name
+
+    def tearDown(self):
+        self.audit._get_mock_store().close()
+        self.tmp.cleanup()
+
+    def test_jsonl_export_manifest(self):
+        path, manifest = self.exporter.exportar_audit_log(self.audit, formato="JSONL")
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(manifest['sha256'], hashlib.sha256(data).hexdigest())
+        events = [json.loads(line) for line in data.decode('utf-8').splitlines()]
+        self.assertEqual([e['id'] for e in events], list(range(1, 26)))
+        errors, last_id, last_hash, _ = verify_event_chain(events, manifest['hash_previo_inicial'])
+        self.assertEqual(errors, [])
+        self.assertEqual(last_hash, manifest['hash_evento_final'])
+
+    def test_csv_export_round_trips(self):
+        path, manifest = self.exporter.exportar_audit_log(self.audit, formato="CSV")
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(manifest['eventos'], 25)
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(json.loads(rows[-1]['estado_nuevo'])['step'], 24)
+        self.assertTrue(os.path.exists(path + ".manifest.json"))
+
+
+class FakeMySQL:
+    """Conexión MySQL en memoria: registra filas de audit_events y commits."""
+    def __init__(self, fail=False):
+        self.rows = []
+        self.commits = 0
+        self.fail = fail
+        self.host, self.port, self.db_name = "fake", 0, f"fake_{id(self)}"
+
+    def is_available(self):
+        return True
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def ping(self, reconnect=True):
+        pass
+
+    def begin(self):
+        self._pending = []
+
+    def commit(self):
+        self.rows.extend(self._pending)
+        self.commits += 1
+
+    def rollback(self):
+        self._pending = []
+
+    def close(self):
+        pass
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self._last = self.rows[-1] if self.rows else None
+
+    def fetchone(self):
+        return self._last
+
+    def executemany(self, query, rows):
+        if self.fail:
+            raise ConnectionError("Lost connection to MySQL server")
+        columns = ("id_usuario", "rol_usuario", "tipo_evento", "entidad", "entidad_id",
+                   "estado_anterior", "estado_nuevo", "metadata", "ip_origen", "hash_previo", "hash_evento")
+        for values in rows:
+            row = dict(zip(columns, values))
+            row['id'] = len(self.rows) + len(self._pending) + 1
+            self._pending.append(row)
+
+
+class TestAuditWriter(unittest.TestCase):
+    def test_concurrent_appends_stay_linear(self):
+        fake = FakeMySQL()
+        from services.audit_service import calculate_event_hash
+        writer = AuditWriter.for_database(fake, calculate_event_hash)
+
+        def worker(n):
+            for i in range(25):
+                info = {"id_usuario": f"u{n}", "rol_usuario": "Admin", "tipo_evento": "TEST",
+                        "entidad": "POZO", "entidad_id": "X-1", "estado_anterior": None,
+                        "estado_nuevo": {"i": i}, "metadata": None}
+                writer.submit(info).result()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.stop()
+
+        self.assertEqual(len(fake.rows), 200)
+        self.assertLessEqual(fake.commits, 200)
+        errors, _, last_hash, _ = verify_event_chain(fake.rows, "0" * 64)
+        self.assertEqual(errors, [])
+        self.assertEqual(writer.last_hash, last_hash)
+
+    def test_bulk_block_is_contiguous(self):
+        fake = FakeMySQL()
+        from services.audit_service import calculate_event_hash
+        writer = AuditWriter.for_database(fake, calculate_event_hash)
+        info = {"id_usuario": "u", "rol_usuario": "Admin", "tipo_evento": "TEST", "entidad": "POZO",
+                "entidad_id": "X-1", "estado_anterior": None, "estado_nuevo": None, "metadata": None}
+        hashes = writer.submit_many([(info, None)] * 10).result()
+        writer.stop()
+        self.assertEqual(fake.commits, 1)
+        self.assertEqual([r['hash_evento'] for r in fake.rows], hashes)
+
+    def test_writers_of_different_processes_share_one_chain(self):
+        fake = FakeMySQL()
+        from services.audit_service import calculate_event_hash
+        # Dos escritores sobre la misma base, como dos réplicas de la app
+        writers = [AuditWriter(fake, calculate_event_hash), AuditWriter(fake, calculate_event_hash)]
+        info = {"id_usuario": "u", "rol_usuario": "Admin", "tipo_evento": "TEST", "entidad": "POZO",
+                "entidad_id": "X-1", "estado_anterior": None, "estado_nuevo": None, "metadata": None}
+        query_stats.reset()
+        for i in range(6):
+            writers[i % 2].submit(info).result()
+        for writer in writers:
+            writer.stop()
+        errors, _, _, count = verify_event_chain(fake.rows, "0" * 64)
+        self.assertEqual((errors, count), ([], 6))
+        # Lectura de la cola e inserción pasan por las estadísticas de consultas
+        calls = {row["query"].split()[0]: row["calls"] for row in query_stats.snapshot()}
+        self.assertEqual(calls, {"SELECT": 6, "INSERT": 6})
+
+    def test_failed_write_raises_instead_of_diverting(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            audit = make_offline_audit(tmp)
+            audit.db = FakeMySQL(fail=True)
+            with self.assertRaises(ConnectionError):
+                audit.log_event("u", "Admin", "TEST", "POZO", "X-1", new_state={"a": 1})
+            with self.assertRaises(ConnectionError):
+                audit.log_events([{"user_id": "u", "user_role": "Admin", "event_type": "TEST",
+                                   "entity": "POZO", "entity_id": "X-1"}] * 2)
+            events = list(audit._get_mock_store().iter_events())
+            audit._get_mock_store().close()
+            AuditWriter.for_database(audit.db, None).stop()
+        self.assertEqual(events, [])
+        self.assertEqual(audit.db.rows, [])
+
+    def test_timed_out_event_is_not_written_twice(self):
+        fake = FakeMySQL()
+        from services.audit_service import calculate_event_hash
+        writer = AuditWriter.for_database(fake, calculate_event_hash)
+        gate = threading.Event()
+        writer._queue.put(([], None, _BlockingFuture(gate)))
+        with tempfile.TemporaryDirectory() as tmp:
+            audit = make_offline_audit(tmp)
+            audit.db = fake
+            with mock.patch.object(AuditService, "WRITE_TIMEOUT", 0.05):
+                with self.assertRaises(TimeoutError):
+                    audit.log_event("u", "Admin", "TEST", "POZO", "X-1")
+            gate.set()
+            writer.stop()
+            events = list(audit._get_mock_store().iter_events())
+            audit._get_mock_store().close()
+        # El escritor estaba ocupado: el evento cancelado no se escribe en ningún lado
+        self.assertEqual(events, [])
+        self.assertEqual(fake.rows, [])
+
+
+class _BlockingFuture(Future):
+    """Future que retiene al hilo escritor hasta que se libera gate."""
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+
+    def set_running_or_notify_cancel(self):
+        self.gate.wait(5)
+        return super().set_running_or_notify_cancel()
+
+
 if __name__ == "__main__":
     unittest.main()
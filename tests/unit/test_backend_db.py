@@ -0,0 +1,249 @@
+import asyncio
+import importlib.util
+import sys
+import types
+import unittest
+from unittest import mock
+
+try:
+    import aiomysql
+except ImportError:
+    # Sólo para poder importar el módulo; cada test reemplaza aiomysql por FakeAiomysql
+    aiomysql = types.ModuleType("aiomysql")
+    aiomysql.Pool = aiomysql.DictCursor = aiomysql.SSDictCursor = object
+    sys.modules["aiomysql"] = aiomysql
+
+from backend.db import connection
+from backend.db.connection import Database
+
+FASTAPI_AVAILABLE = importlib.util.find_spec("fastapi") is not None
+
+
+class FakeCursor:
+    def __init__(self, conn, kind):
+        self.conn = conn
+        self.kind = kind
+        self.rowcount = -1
+        self._rows = []
+        self.closed = False
+
+    async def execute(self, query, params=()):
+        self.conn.log.append(("execute", query, params))
+        if "FAIL" in query:
+            raise RuntimeError("Error de SQL")
+        self._rows = list(self.conn.rows)
+        self.rowcount = len(self._rows) if query.startswith("SELECT") else 1
+
+    async def executemany(self, query, params_seq):
+        self.conn.log.append(("executemany", query, params_seq))
+        self.rowcount = len(params_seq)
+
+    async def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    async def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    async def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCursorContext:
+    """Como el de aiomysql: se puede usar con await o con async with."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __await__(self):
+        async def _cursor():
+            return self.cursor
+        return _cursor().__await__()
+
+    async def __aenter__(self):
+        return self.cursor
+
+    async def __aexit__(self, *exc):
+        await self.cursor.close()
+
+
+class FakeConnection:
+    def __init__(self):
+        self.rows = []
+        self.log = []
+        self.closed = False
+        self.cursors = []
+
+    def cursor(self, kind=None):
+        cursor = FakeCursor(self, kind)
+        self.cursors.append(cursor)
+        return FakeCursorContext(cursor)
+
+    async def begin(self):
+        self.log.append(("begin",))
+
+    async def commit(self):
+        self.log.append(("commit",))
+
+    async def rollback(self):
+        self.log.append(("rollback",))
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, minsize, maxsize, **kwargs):
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.kwargs = kwargs
+        self._free = [FakeConnection() for _ in range(minsize)]
+        self._used = set()
+        self._cond = asyncio.Condition()
+        self.closed = False
+
+    @property
+    def size(self):
+        return len(self._free) + len(self._used)
+
+    @property
+    def freesize(self):
+        return len(self._free)
+
+    async def acquire(self):
+        async with self._cond:
+            while not self._free and self.size >= self.maxsize:
+                await self._cond.wait()
+            conn = self._free.pop() if self._free else FakeConnection()
+            self._used.add(conn)
+            return conn
+
+    def release(self, conn):
+        self._used.discard(conn)
+        if not conn.closed:
+            self._free.append(conn)
+
+        async def _notify():
+            async with self._cond:
+                self._cond.notify()
+        return asyncio.ensure_future(_notify())
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+class FakeAiomysql:
+    DictCursor = "DictCursor"
+    SSDictCursor = "SSDictCursor"
+    created = []
+
+    @classmethod
+    async def create_pool(cls, **kwargs):
+        await asyncio.sleep(0)
+        pool = FakePool(**kwargs)
+        cls.created.append(pool)
+        return pool
+
+
+class TestAsyncDatabase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        FakeAiomysql.created = []
+        patcher = mock.patch.object(connection, "aiomysql", FakeAiomysql)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with mock.patch.dict("os.environ", {"MYSQL_POOL_MIN": "1", "MYSQL_POOL_MAX": "2"}):
+            self.db = Database()
+
+    async def test_connect_is_idempotent_and_sized_from_env(self):
+        await asyncio.gather(self.db.connect(), self.db.connect(), self.db.connect())
+        self.assertEqual(len(FakeAiomysql.created), 1)
+        self.assertEqual((self.db.pool.minsize, self.db.pool.maxsize), (1, 2))
+        await self.db.close()
+        self.assertIsNone(self.db.pool)
+
+    async def test_execute_and_executemany(self):
+        cur = await self.db.execute("UPDATE pozos SET estado = %s", ("OK",))
+        self.assertEqual(cur.rowcount, 1)
+        self.assertTrue(cur.closed)
+
+        count = await self.db.executemany("INSERT INTO t (a) VALUES (%s)", [(1,), (2,), (3,)])
+        self.assertEqual(count, 3)
+        conn = self.db.pool._free[0]
+        self.assertEqual([entry[0] for entry in conn.log[-3:]], ["begin", "executemany", "commit"])
+        self.assertEqual(await self.db.executemany("INSERT INTO t (a) VALUES (%s)", []), 0)
+
+    async def test_transaction_rolls_back_on_exception(self):
+        with self.assertRaises(RuntimeError):
+            async with self.db.transaction() as cur:
+                await cur.execute("INSERT INTO t VALUES (1)")
+                await cur.execute("FAIL")
+        conn = self.db.pool._free[0]
+        ops = [entry[0] for entry in conn.log]
+        self.assertEqual(ops[0], "begin")
+        self.assertEqual(ops[-1], "rollback")
+        self.assertNotIn("commit", ops)
+        self.assertEqual(self.db.metrics()["in_use"], 0)
+
+    async def test_abandoned_iterate_discards_the_connection(self):
+        await self.db.connect()
+        conn = self.db.pool._free[0]
+        conn.rows = [{"id": i} for i in range(10)]
+
+        rows = [row async for row in self.db.iterate("SELECT * FROM audit_events", chunk_size=3)]
+        self.assertEqual(len(rows), 10)
+        self.assertFalse(conn.closed)
+        self.assertIn(conn, self.db.pool._free)
+
+        stream = self.db.iterate("SELECT * FROM audit_events", chunk_size=3)
+        self.assertEqual(await stream.__anext__(), {"id": 0})
+        await stream.aclose()
+        self.assertTrue(conn.closed)
+        # El cursor sin buffer no se cierra: eso leería las filas pendientes
+        self.assertFalse(conn.cursors[-1].closed)
+        self.assertNotIn(conn, self.db.pool._free)
+        self.assertEqual(self.db.pool.size, 0)
+
+    async def test_metrics_report_saturation(self):
+        await self.db.connect()
+        release = asyncio.Event()
+
+        async def hold():
+            async with self.db.acquire():
+                await release.wait()
+
+        holders = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0)
+        metrics = self.db.metrics()
+        self.assertEqual((metrics["size"], metrics["in_use"], metrics["saturation"]), (2, 2, 1.0))
+
+        waiter = asyncio.create_task(self.db.fetch_one("SELECT 1"))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(waiter, *holders)
+
+        metrics = self.db.metrics()
+        self.assertEqual(metrics["acquires"], 3)
+        self.assertEqual(metrics["waits"], 1)
+        self.assertEqual(metrics["peak_in_use"], 2)
+        self.assertEqual(metrics["in_use"], 0)
+        self.assertEqual(metrics["free"], 2)
+        self.assertGreater(metrics["max_wait_ms"], 0)
+
+    @unittest.skipUnless(FASTAPI_AVAILABLE, "fastapi no instalado")
+    async def test_pool_endpoint_reports_metrics(self):
+        from backend.app import main
+        await self.db.fetch_all("SELECT 1")
+        with mock.patch.object(main, "db", self.db):
+            metrics = await main.get_pool_metrics()
+        self.assertEqual((metrics["acquires"], metrics["in_use"], metrics["maxsize"]), (1, 0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
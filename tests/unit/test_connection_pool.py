@@ -0,0 +1,132 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from services.circuit_breaker import CircuitBreaker
+from services.connection_pool import ConnectionPool
+from services.database_service import DatabaseService
+
+
+class FakeConnection:
+    def __init__(self):
+        self.open = True
+        self.alive = True
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise ConnectionError("gone away")
+
+    def close(self):
+        self.open = False
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            conn = FakeConnection()
+            self.created.append(conn)
+            return conn
+
+        self.pool = ConnectionPool(factory, max_size=2, checkout_timeout=0.2)
+
+    def test_reuses_warm_connections(self):
+        for _ in range(5):
+            conn = self.pool.acquire()
+            self.pool.release(conn)
+        metrics = self.pool.metrics()
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(metrics["reused"], 4)
+        self.assertEqual((metrics["size"], metrics["idle"], metrics["in_use"]), (1, 1, 0))
+
+    def test_size_limit_blocks_until_release(self):
+        a = self.pool.acquire()
+        self.pool.acquire()
+        self.assertIsNone(self.pool.acquire())
+        self.assertEqual(self.pool.metrics()["timeouts"], 1)
+
+        threading.Timer(0.05, self.pool.release, args=(a,)).start()
+        self.assertIs(self.pool.acquire(), a)
+        self.assertEqual(len(self.created), 2)
+
+    def test_dead_connection_replaced_on_checkout(self):
+        self.pool.health_check_interval = 0
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        conn.alive = False
+        fresh = self.pool.acquire()
+        self.assertIsNot(fresh, conn)
+        self.assertFalse(conn.open)
+        self.assertEqual(self.pool.metrics()["health_check_failures"], 1)
+
+    def test_idle_eviction(self):
+        self.pool.idle_timeout = 0.01
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        time.sleep(0.03)
+        metrics = self.pool.metrics()
+        self.assertEqual((metrics["size"], metrics["evicted"]), (0, 1))
+        self.assertFalse(conn.open)
+
+    def test_connection_in_use_is_closed_on_release_after_close(self):
+        busy = self.pool.acquire()
+        self.pool.release(self.pool.acquire())
+        self.pool.close()
+        self.pool.release(busy)
+        self.assertFalse(busy.open)
+        self.assertEqual((self.pool.metrics()["size"], self.pool.metrics()["idle"]), (0, 0))
+
+    def test_forked_child_gets_its_own_pool(self):
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        # En el hijo de un fork close() no debe enviar QUIT por los sockets del padre
+        with mock.patch("services.connection_pool.os.getpid", return_value=-1):
+            self.pool.close()
+        self.assertTrue(conn.open)
+
+        db = DatabaseService()
+        db.host = "fork-test.invalid"
+        parent = ConnectionPool.for_database(db)
+        with mock.patch("services.connection_pool.os.getpid", return_value=-1):
+            self.assertIsNot(ConnectionPool.for_database(db), parent)
+        ConnectionPool._reset_after_fork()
+        self.assertIsNot(ConnectionPool.for_database(db), parent)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_state_transitions(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        self.assertTrue(breaker.allow_request())  # prueba inicial
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())  # una sola prueba a la vez
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.status()["trips"], 2)
+
+    def test_unreachable_server_is_not_probed_again(self):
+        db = DatabaseService()
+        db.host = "breaker-test.invalid"
+        with mock.patch("services.database_service.pymysql.connect",
+                        side_effect=Exception("unreachable")) as connect:
+            self.assertFalse(db.is_available())
+            self.assertEqual(db.fetch_all("SELECT 1"), [])
+            self.assertIsNone(db.fetch_one("SELECT 1"))
+            self.assertFalse(db.is_available())
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(db.pool_metrics()["breaker"]["state"], CircuitBreaker.OPEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
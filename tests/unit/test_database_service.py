@@ -0,0 +1,232 @@
+import unittest
+import uuid
+from unittest import mock
+import pymysql
+from services.circuit_breaker import CircuitBreaker
+from services.database_service import DatabaseService, build_insert
+from services.query_stats import QueryStats, normalize_query, query_stats
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if "FAIL" in query:
+            raise ValueError("sql error")
+        if self.conn.gone:
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+        self.conn.pending.append((query, params))
+        self.rowcount = query.count("(%s") if "VALUES" in query else 1
+
+    def fetchall(self):
+        rows, self.conn.results = self.conn.results, []
+        return rows
+
+    def fetchone(self):
+        return self.conn.results.pop(0) if self.conn.results else None
+
+    def fetchmany(self, size):
+        self.conn.fetches += 1
+        rows, self.conn.results = self.conn.results[:size], self.conn.results[size:]
+        return rows
+
+    def executemany(self, query, params_seq):
+        for params in params_seq:
+            self.execute(query, params)
+        self.rowcount = len(params_seq)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.open = True
+        self.pending = []
+        self.committed = []
+        self.commits = 0
+        self.results = []
+        self.fetches = 0
+        self.gone = False
+
+    def cursor(self, *args):
+        return FakeCursor(self)
+
+    def begin(self):
+        self.pending = []
+
+    def commit(self):
+        self.committed.extend(self.pending)
+        self.pending = []
+        self.commits += 1
+
+    def rollback(self):
+        self.pending = []
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+class TestDatabaseBatch(unittest.TestCase):
+    def setUp(self):
+        self.conn = FakeConnection()
+        patcher = mock.patch("services.database_service.pymysql.connect", return_value=self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = DatabaseService()
+        self.db.host = f"batch-{uuid.uuid4().hex}"  # pool y breaker propios del test
+
+    def test_build_insert(self):
+        self.assertEqual(
+            build_insert("tbl", ["a", "b"], 2, replace=True),
+            "REPLACE INTO `tbl` (`a`, `b`) VALUES (%s, %s), (%s, %s)"
+        )
+        with self.assertRaises(ValueError):
+            build_insert("tbl; DROP", ["a"], 1)
+
+    def test_insert_many_chunks_in_one_commit(self):
+        rows = [(i, f"r{i}") for i in range(5)]
+        affected = self.db.insert_many("tbl", ["id", "nombre"], rows, chunk_size=2)
+        self.assertEqual(affected, 5)
+        self.assertEqual(self.conn.commits, 1)
+        self.assertEqual([len(p) for _, p in self.conn.committed], [4, 4, 2])
+
+    def test_batch_rolls_back_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.db.batch() as b:
+                b.execute("UPDATE tbl SET a = 1")
+                b.execute("FAIL")
+        self.assertEqual(self.conn.committed, [])
+
+        with self.db.batch() as b:
+            b.execute("UPDATE tbl SET a = 1")
+            b.execute_many("INSERT INTO tbl (a) VALUES (%s)", [(1,), (2,)])
+        self.assertEqual(len(self.conn.committed), 3)
+        self.assertEqual(self.conn.commits, 1)
+
+
+class TestFetchIter(unittest.TestCase):
+    def setUp(self):
+        self.conns = []
+
+        def connect(**kwargs):
+            conn = FakeConnection()
+            conn.results = [{"id": i} for i in range(10)]
+            self.conns.append(conn)
+            return conn
+
+        patcher = mock.patch("services.database_service.pymysql.connect", side_effect=connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = DatabaseService()
+        self.db.host = f"iter-{uuid.uuid4().hex}"
+
+    def test_streams_rows_and_chunks(self):
+        self.assertEqual([r["id"] for r in self.db.fetch_iter("SELECT id FROM t", chunk_size=3)], list(range(10)))
+        self.assertEqual(self.conns[0].fetches, 5)  # 4 chunks + fin del resultado
+        self.conns[0].results = [{"id": i} for i in range(10)]
+        sizes = [len(c) for c in self.db.fetch_iter("SELECT id FROM t", chunk_size=4, chunks=True)]
+        self.assertEqual(sizes, [4, 4, 2])
+        self.assertEqual(len(self.conns), 1)  # conexión devuelta al pool y reutilizada
+
+    def test_abandoned_iteration_discards_connection(self):
+        rows = self.db.fetch_iter("SELECT id FROM t", chunk_size=3)
+        next(rows)
+        rows.close()
+        self.assertFalse(self.conns[0].open)
+        self.assertEqual(self.db.pool_metrics()["size"], 0)
+
+
+class TestDegradedReads(unittest.TestCase):
+    def setUp(self):
+        self.conns = []
+        self.server_down = False
+
+        def connect(**kwargs):
+            if self.server_down:
+                raise ConnectionRefusedError("Can't connect to MySQL server")
+            conn = FakeConnection()
+            conn.results = [{"id": i} for i in range(5)]
+            self.conns.append(conn)
+            return conn
+
+        patcher = mock.patch("services.database_service.pymysql.connect", side_effect=connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = DatabaseService()
+        self.db.host = f"degraded-{uuid.uuid4().hex}"
+        self.breaker = self.db._breaker()
+
+    def test_server_drop_returns_empty_results(self):
+        self.assertEqual(len(self.db.fetch_all("SELECT id FROM t")), 5)  # prueba inicial
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        # MySQL se cae: la conexión del pool falla en medio de la consulta
+        self.conns[-1].gone = True
+        self.server_down = True
+        self.assertEqual(self.db.fetch_all("SELECT id FROM t"), [])
+        self.assertIsNone(self.db.fetch_one("SELECT id FROM t"))
+        self.assertEqual(list(self.db.fetch_iter("SELECT id FROM t")), [])
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_drop_mid_stream_is_not_silent(self):
+        rows = self.db.fetch_iter("SELECT id FROM t", chunk_size=2)
+        self.assertEqual(next(rows), {"id": 0})
+        next(rows)
+        with mock.patch.object(FakeCursor, "fetchmany",
+                               side_effect=pymysql.err.OperationalError(2013, "Lost connection")):
+            with self.assertRaises(pymysql.err.OperationalError):
+                next(rows)
+
+    def test_abandoned_probe_releases_half_open(self):
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        rows = self.db.fetch_iter("SELECT id FROM t")
+        next(rows)
+        self.assertFalse(self.breaker.allow_request())  # prueba en curso
+        rows.close()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+
+
+class TestQueryStats(unittest.TestCase):
+    def test_normalize_query(self):
+        self.assertEqual(
+            normalize_query("SELECT *  FROM t\n WHERE a = 'x' AND b IN (1, 2, 3) LIMIT %s"),
+            "SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?"
+        )
+        self.assertEqual(
+            normalize_query(build_insert("t", ["a", "b"], 3)),
+            normalize_query(build_insert("t", ["a", "b"], 1))
+        )
+
+    def test_percentiles_and_slow_log(self):
+        stats = QueryStats(slow_ms=50)
+        for ms in range(1, 101):
+            stats.record("SELECT * FROM t WHERE id = %s", ms / 1000.0, rows=1, site="x.py:f")
+        row = stats.snapshot()[0]
+        self.assertEqual((row["calls"], row["p50_ms"], row["p99_ms"], row["max_ms"]), (100, 51.0, 99.0, 100.0))
+        self.assertEqual(len(stats.slow_queries()), 51)
+        self.assertEqual(stats.slow_queries()[0]["ms"], 100.0)
+
+    def test_database_service_tags_call_site(self):
+        conn = FakeConnection()
+        conn.results = []
+        with mock.patch("services.database_service.pymysql.connect", return_value=conn):
+            db = DatabaseService()
+            db.host = f"stats-{uuid.uuid4().hex}"
+            query_stats.reset()
+            db.execute("UPDATE t SET a = %s WHERE id = %s", (1, 7))
+        row = query_stats.snapshot()[0]
+        self.assertEqual(row["query"], "UPDATE t SET a = ? WHERE id = ?")
+        self.assertEqual(row["sites"], "unit/test_database_service.py:test_database_service_tags_call_site")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import random
+import unittest
+from services.geo_engine import WellGeoIndex, eta_minutes, haversine_km, haversine_matrix
+
+
+def _wells(n, seed=7):
+    rnd = random.Random(seed)
+    wells = [{"id": f"W-{i}", "lat": rnd.uniform(-47, -45), "lon": rnd.uniform(-69, -66)} for i in range(n)]
+    wells.append({"id": "W-180", "lat": -45.5, "lon": 179.95})
+    wells.append({"id": "SIN-GPS", "lat": None, "lon": None})
+    return wells
+
+
+class TestGeoEngine(unittest.TestCase):
+    def test_haversine_and_matrix(self):
+        self.assertAlmostEqual(haversine_km(-45.0, -67.0, -46.0, -67.0), 111.195, places=2)
+        self.assertAlmostEqual(haversine_km(-45.5, 179.9, -45.5, -179.9), 15.57, places=1)
+        origins = [(-45.9, -67.1), (-46.5, -67.6)]
+        targets = [(-45.8, -67.2), (-53.8, -67.9), (-45.9, -67.1)]
+        matrix = haversine_matrix(origins, targets)
+        for (lat1, lon1), row in zip(origins, matrix):
+            for (lat2, lon2), d in zip(targets, row):
+                self.assertAlmostEqual(d, haversine_km(lat1, lon1, lat2, lon2), places=6)
+        self.assertEqual(eta_minutes(12.5), 25)
+
+    def test_index_queries_match_brute_force(self):
+        wells = _wells(300)
+        index = WellGeoIndex(wells)
+        self.assertEqual(len(index), 301)
+        rnd = random.Random(3)
+        points = [(rnd.uniform(-48, -44), rnd.uniform(-70, -65)) for _ in range(40)] + [(-45.5, -179.98), (-10.0, 0.0)]
+        for lat, lon in points:
+            brute = sorted((haversine_km(lat, lon, w["lat"], w["lon"]), w["id"]) for w in wells if w["lat"] is not None)
+            well_id, dist = index.nearest(lat, lon)
+            self.assertAlmostEqual(dist, brute[0][0], places=6)
+            expected = {wid for d, wid in brute if d <= 40}
+            self.assertEqual({wid for wid, _ in index.within(lat, lon, 40)}, expected)
+
+    def test_distance_matrix_follows_index_order(self):
+        index = WellGeoIndex(_wells(5))
+        matrix = index.distance_matrix([(-46.0, -67.5)])
+        self.assertEqual(len(matrix[0]), len(index.ids))
+        self.assertIsNone(WellGeoIndex([]).nearest(-46.0, -67.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from services.local_store import LocalDocument, LocalStore
+
+SCHEMA = {"disenos": ("diseno_cementacion_id", ["id_pozo"])}
+
+
+class TestLocalStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = LocalStore(os.path.join(self.tmpdir, "store.db"))
+        self.seed_path = os.path.join(self.tmpdir, "seed.json")
+        with open(self.seed_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "disenos": [
+                    {"diseno_cementacion_id": "D-1", "id_pozo": "X-123", "volumen": 10},
+                    {"diseno_cementacion_id": "D-2", "id_pozo": "A-321", "volumen": 20},
+                ],
+                "config": {"ultimo_id": 2},
+            }, f)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _doc(self):
+        return LocalDocument("cementacion", SCHEMA, seed_path=self.seed_path, store=self.store)
+
+    def test_seed_imported_once(self):
+        data = self._doc().load()
+        self.assertEqual([d["diseno_cementacion_id"] for d in data["disenos"]], ["D-1", "D-2"])
+        self.assertEqual(data["config"], {"ultimo_id": 2})
+
+        os.remove(self.seed_path)
+        self.assertEqual(len(self._doc().load()["disenos"]), 2)
+
+    def test_save_writes_only_changed_rows(self):
+        doc = self._doc()
+        data = doc.load()
+        data["disenos"][0]["volumen"] = 11
+        data["disenos"].append({"diseno_cementacion_id": "D-3", "id_pozo": "X-123"})
+        doc.mark("disenos", data["disenos"][0], data["disenos"][2])
+        self.assertEqual(doc.save(data), 2)
+        self.assertEqual(doc.save(data), 0)
+        # Marcado pero sin cambios: no se reescribe
+        doc.mark("disenos", data["disenos"][1])
+        self.assertEqual(doc.save(data), 0)
+
+        doc.mark_removed("disenos", data["disenos"].pop(1))
+        self.assertEqual(doc.save(data), 1)
+        reloaded = self._doc().load()
+        self.assertEqual([d["diseno_cementacion_id"] for d in reloaded["disenos"]], ["D-1", "D-3"])
+        self.assertEqual(reloaded["disenos"][0]["volumen"], 11)
+
+    def test_find_uses_indexed_columns(self):
+        doc = self._doc()
+        self.assertEqual([d["diseno_cementacion_id"] for d in doc.find("disenos", id_pozo="X-123")], ["D-1"])
+        self.assertEqual(len(doc.find("disenos", diseno_cementacion_id="D-2")), 1)
+        with self.assertRaises(ValueError):
+            doc.find("disenos", volumen=10)
+
+    def test_documents_do_not_clobber_each_other(self):
+        first, second = self._doc(), self._doc()
+        data_first, data_second = first.load(), second.load()
+        data_first["disenos"].append({"diseno_cementacion_id": "D-3", "id_pozo": "M-555"})
+        first.mark("disenos", data_first["disenos"][-1])
+        data_second["disenos"][1]["volumen"] = 25
+        second.mark("disenos", data_second["disenos"][1])
+        first.save(data_first)
+        second.save(data_second)
+
+        reloaded = {d["diseno_cementacion_id"]: d for d in self._doc().load()["disenos"]}
+        self.assertIn("D-3", reloaded)
+        self.assertEqual(reloaded["D-2"]["volumen"], 25)
+
+    def test_records_without_pk_keep_their_own_rows(self):
+        doc = self._doc()
+        data = doc.load()
+        first = {"id_pozo": "X-123", "volumen": 5}
+        duplicate = dict(first)
+        data["disenos"] += [first, duplicate]
+        doc.mark("disenos", first, duplicate)
+        self.assertEqual(doc.save(data), 2)
+
+        first["volumen"] = 6
+        doc.mark("disenos", first)
+        self.assertEqual(doc.save(data), 1)
+
+        other = self._doc()
+        reloaded = other.load()
+        self.assertEqual([d.get("volumen") for d in reloaded["disenos"]], [10, 20, 6, 5])
+        other.mark_removed("disenos", reloaded["disenos"].pop(2))
+        self.assertEqual(other.save(reloaded), 1)
+        self.assertEqual([d.get("volumen") for d in self._doc().load()["disenos"]], [10, 20, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
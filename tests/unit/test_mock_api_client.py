@@ -0,0 +1,138 @@
+import tempfile
+import unittest
+from unittest import mock
+from services import partitioned_store
+from services.mock_api_client import MockApiClient
+from tests.unit.test_audit_service import make_offline_audit
+
+
+class MockApiClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(partitioned_store, "DEFAULT_BASE_DIR", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.audit = make_offline_audit(self.tmp.name)
+        self.api = MockApiClient(audit_service=self.audit)
+
+    def tearDown(self):
+        self.audit._get_mock_store().close()
+        self.tmp.cleanup()
+
+
+class TestProjections(MockApiClientTestCase):
+    def test_projection_builds_only_requested_sections(self):
+        projection = self.api.get_project_projection("x-123", ("stock_list",))
+        self.assertEqual(projection["well"], "X-123")
+        self.assertIn("stock_list", projection)
+        self.assertNotIn("transport_list", projection)
+        self.assertNotIn("rig_telemetry", projection)
+
+        detail = self.api.get_project_detail("X-123")
+        self.assertEqual(detail["stock_list"], projection["stock_list"])
+        self.assertTrue(set(MockApiClient.DETAIL_SECTIONS) - {"gates"} <= set(detail))
+
+    def test_fleet_aggregates_are_cached_until_a_project_changes(self):
+        with mock.patch.object(self.api, "get_project_detail") as detail:
+            logistics = self.api.get_all_logistics()
+            detail.assert_not_called()
+        self.assertTrue(all("project_id" in t for t in logistics))
+
+        with mock.patch.object(self.api, "_build_transports", wraps=self.api._build_transports) as build:
+            self.api.get_all_logistics()
+            build.assert_not_called()
+            self.api.upsert_well({"id": "A-321", "estado_proyecto": "EN_EJECUCION"})
+            en_ruta = [t for t in self.api.get_all_logistics() if t["project_id"] == "A-321"]
+            self.assertTrue(build.called)
+        self.assertIn("EN RUTA", [t["status"] for t in en_ruta])
+
+    def test_aggregate_rows_are_copies(self):
+        self.api.get_all_supplies_status()[0]["current"] = -1
+        self.assertNotEqual(self.api.get_all_supplies_status()[0]["current"], -1)
+
+
+class TestDetailCache(MockApiClientTestCase):
+    def test_repeated_reads_reuse_the_memoized_detail(self):
+        with mock.patch.object(self.api, "_build_personnel", wraps=self.api._build_personnel) as build:
+            first = self.api.get_project_detail("X-123")
+            second = self.api.get_project_detail("x-123")
+        self.assertEqual(build.call_count, 1)
+        self.assertIs(first["personnel_list"], second["personnel_list"])
+        # La telemetría se genera en cada lectura
+        self.assertIsNot(first["rig_telemetry"], second["rig_telemetry"])
+        self.assertEqual(list(first), list(second))
+
+    def test_mutations_bump_the_project_version(self):
+        detail = self.api.get_project_detail("A-321")
+        self.assertEqual(self.api.get_project_version("A-321"), 0)
+
+        self.api.send_signal_dtm("A-321", ["Pulling Unit #01"])
+        self.api.manual_override_gate("a-321", "DTM", "Sin conexión")
+        self.assertEqual(self.api.get_project_version("A-321"), 2)
+
+        self.api.upsert_well({"id": "A-321", "estado_proyecto": "BLOQUEADO"})
+        updated = self.api.get_project_detail("A-321")
+        self.assertEqual(self.api.get_project_version("A-321"), 3)
+        self.assertEqual(detail["status"], "PLANIFICADO")
+        self.assertEqual(updated["status"], "BLOQUEADO")
+
+
+class TestDashboardCounters(MockApiClientTestCase):
+    def test_alert_counts_follow_mutations(self):
+        stats = self.api.get_dashboard_stats()
+        por_categoria = stats["alertas_por_categoria"]
+        self.assertEqual(stats["alertas_activas"], sum(por_categoria.values()))
+        self.assertNotIn("GATE_FORZADO", por_categoria)
+        # Los pozos planificados no tienen stock movilizado: no son STOCK_BAJO
+        self.assertNotIn("STOCK_BAJO", por_categoria)
+        self.assertLess(stats["alertas_activas"], stats["en_planificacion"])
+        bloqueantes = por_categoria.get("INCIDENCIA_BLOQUEANTE", 0)
+
+        self.api.upsert_well({"id": "A-321", "estado_proyecto": "BLOQUEADO"})
+        self.api.manual_override_gate("X-123", "DTM", "Sin conexión")
+        stats = self.api.get_dashboard_stats()
+        self.assertEqual(stats["bloqueados"], 1 + (bloqueantes and 1))
+        self.assertEqual(stats["alertas_por_categoria"]["INCIDENCIA_BLOQUEANTE"], bloqueantes + 1)
+        self.assertEqual(stats["alertas_por_categoria"]["GATE_FORZADO"], 1)
+
+        with mock.patch.object(MockApiClient, "_outbox") as outbox:
+            # El gate forzado siguiente no vuelve a recorrer la outbox
+            self.api.manual_override_gate("M-555", "DTM", "Sin conexión")
+            outbox.__iter__.assert_not_called()
+        self.assertEqual(self.api.get_dashboard_stats()["alertas_por_categoria"]["GATE_FORZADO"], 2)
+
+        self.api.synchronize()
+        self.assertNotIn("GATE_FORZADO", self.api.get_dashboard_stats()["alertas_por_categoria"])
+
+    def test_stats_do_not_rebuild_project_sections(self):
+        total = self.api.get_dashboard_stats()["total_activos"]
+        with mock.patch.object(self.api, "_build_stock", wraps=self.api._build_stock) as build:
+            self.api.get_dashboard_stats()
+            build.assert_not_called()
+            self.api.upsert_well({"id": "Q-900", "estado_proyecto": "EN_EJECUCION"})
+            self.assertEqual(self.api.get_dashboard_stats()["total_activos"], total + 1)
+            self.assertEqual(build.call_count, 1)
+
+
+class TestGeoQueries(MockApiClientTestCase):
+    def test_transport_distances_are_geodesic(self):
+        en_ruta = [t for t in self.api.get_project_detail("X-123")["transport_list"] if t["gps_active"]][0]
+        self.assertEqual(en_ruta["dist_to_well"], 11.8)
+        self.assertEqual(en_ruta["eta_minutes"], 24)
+
+        dispatch = self.api.get_transport_distance_matrix()
+        self.assertEqual(len(dispatch["distances_km"]), len(dispatch["transports"]))
+        key = ("X-123", en_ruta["id"])
+        row = dispatch["distances_km"][dispatch["transports"].index(key)]
+        self.assertAlmostEqual(row[dispatch["wells"].index("X-123")], en_ruta["dist_to_well"], places=1)
+        self.assertEqual(dispatch["nearest"][key]["dist_km"], min(row))
+
+    def test_nearest_well_follows_upserts(self):
+        self.assertEqual(self.api.get_nearest_well(-46.4328, -67.5267)["project_id"], "X-123")
+        self.api.upsert_well({"id": "Q-900", "nombre": "Nuevo", "lat": -46.4329, "lon": -67.5267})
+        self.assertEqual(self.api.get_nearest_well(-46.4329, -67.5267)["project_id"], "Q-900")
+        self.assertEqual([w["project_id"] for w in self.api.get_wells_within(-46.4329, -67.5267, 1)], ["Q-900", "X-123"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from services.partitioned_store import LazyCollection, PartitionedStore
+from services.snapshot_codec import decode_snapshot, encode_snapshot, read_header
+
+
+class Operaciones:
+    projects = LazyCollection("projects", lambda self: [{"id": "X-123"}])
+    offline_cache = LazyCollection("offline_cache", empty=dict)
+
+    def __init__(self, partitions):
+        self._partitions = partitions
+
+
+class Finanzas:
+    contratos = LazyCollection(
+        "contratos", empty=list,
+        decode=lambda rows: [{**r, "FECHA_INICIO": datetime.fromisoformat(r["FECHA_INICIO"])} for r in rows]
+    )
+
+    def __init__(self, partitions):
+        self._partitions = partitions
+
+
+class TestPartitionedStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.legacy_path = os.path.join(self.tmpdir, "persistence_db.json")
+        with open(self.legacy_path, "w", encoding="utf-8") as f:
+            json.dump({"projects": [{"id": "A-321"}], "contratos": [{"ID_CONTRATO": 1}]}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _store(self, domain, collections):
+        return PartitionedStore(domain, collections, base_dir=self.tmpdir, legacy_path=self.legacy_path)
+
+    def test_legacy_document_is_split_per_domain(self):
+        ops = self._store("operaciones", ["projects", "offline_cache"])
+        fin = self._store("finanzas", ["contratos", "facturas"])
+        self.assertEqual(ops.load("projects"), [{"id": "A-321"}])
+        self.assertIsNone(ops.load("offline_cache"))
+        self.assertEqual(fin.load("contratos"), [{"ID_CONTRATO": 1}])
+        self.assertFalse(os.path.exists(os.path.join(fin.path, "projects.json")))
+
+    def test_domains_persist_independently(self):
+        ops = self._store("operaciones", ["projects"])
+        fin = self._store("finanzas", ["contratos", "facturas"])
+        projects_path = os.path.join(ops.path, "projects.json")
+        mtime = os.path.getmtime(projects_path)
+
+        fin.save("facturas", lambda: [{"ID_FACTURA": 1}])
+        self.assertEqual(fin.flush(), 1)
+        self.assertEqual(fin.load("facturas"), [{"ID_FACTURA": 1}])
+        self.assertEqual(fin.load("contratos"), [{"ID_CONTRATO": 1}])
+        self.assertEqual(os.path.getmtime(projects_path), mtime)
+        self.assertEqual(ops.load("projects"), [{"id": "A-321"}])
+
+    def test_lazy_collection_loads_on_first_access(self):
+        os.remove(self.legacy_path)
+        ops = Operaciones(self._store("operaciones", ["projects", "offline_cache"]))
+        self.assertFalse(Operaciones.projects.is_loaded(ops))
+        self.assertEqual(ops.projects, [{"id": "X-123"}])
+        self.assertTrue(Operaciones.projects.is_loaded(ops))
+        self.assertEqual(ops.offline_cache, {})
+
+        ops.projects.append({"id": "M-555"})
+        ops._partitions.save("projects", lambda: ops.projects)
+        ops._partitions.flush()
+        self.assertEqual(len(Operaciones(ops._partitions).projects), 2)
+
+        # Una colección vaciada no vuelve a la semilla
+        ops.projects.clear()
+        ops._partitions.save("projects", lambda: ops.projects)
+        ops._partitions.flush()
+        self.assertEqual(Operaciones(ops._partitions).projects, [])
+
+    def test_lazy_collection_decodes_loaded_segment(self):
+        fin = self._store("finanzas", ["contratos"])
+        fin.save("contratos", lambda: [{"ID_CONTRATO": 1, "FECHA_INICIO": "2025-01-15T00:00:00"}])
+        fin.flush()
+        self.assertEqual(Finanzas(fin).contratos[0]["FECHA_INICIO"], datetime(2025, 1, 15))
+
+    def test_binary_snapshot_round_trip(self):
+        value = [{"id": "X-123", "lat": -38.9, "tags": ["a", "b"]}, {"id": "A-321", "data": {"1": None}}]
+        for codec in (None, "json"):
+            blob = encode_snapshot(value, codec=codec)
+            self.assertEqual(decode_snapshot(blob), value)
+
+        path = os.path.join(self.tmpdir, "projects.snap")
+        with open(path, "wb") as f:
+            f.write(encode_snapshot(value))
+        header = read_header(path)
+        self.assertEqual((header["type"], header["count"]), ("list", 2))
+
+    def test_binary_format_converts_json_segments(self):
+        self._store("operaciones", ["projects"])
+        binary = PartitionedStore("operaciones", ["projects"], base_dir=self.tmpdir, format="binary")
+        self.assertEqual(binary.load("projects"), [{"id": "A-321"}])
+        binary.flush()
+        self.assertEqual(binary.describe()["projects"]["count"], 1)
+        self.assertEqual(binary.load("projects"), [{"id": "A-321"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from services.project_index import ProjectIndex
+
+
+def _projects():
+    return [
+        {"id": "X-123", "estado_proyecto": "EN_EJECUCION", "campana": "Norte", "yacimiento": "Los Perales", "responsable": "Juan Pérez"},
+        {"id": "A-321", "estado_proyecto": "PLANIFICADO", "campana": "Norte", "yacimiento": "Las Heras", "responsable": "Maria Gonzalez"},
+        {"id": "Z-789", "estado_proyecto": "PLANIFICADO", "campana": "Sur", "yacimiento": "El Tordillo", "responsable": "Juan Pérez"},
+    ]
+
+
+class TestProjectIndex(unittest.TestCase):
+    def test_lookup_by_id_and_alias(self):
+        index = ProjectIndex(_projects())
+        self.assertEqual(index.get("A-321")["id"], "A-321")
+        self.assertEqual(index.get(" x-123 ")["id"], "X-123")
+        self.assertIsNone(index.get("Q-000"))
+        self.assertIsNone(index.get(""))
+
+    def test_secondary_indexes_follow_upserts(self):
+        projects = _projects()
+        index = ProjectIndex(projects)
+        self.assertEqual([p["id"] for p in index.where("estado_proyecto", "PLANIFICADO")], ["A-321", "Z-789"])
+        self.assertEqual(len(index.where("responsable", "Juan Pérez")), 2)
+
+        project, prev = index.upsert({"id": "A-321", "estado_proyecto": "BLOQUEADO"})
+        self.assertEqual(prev["estado_proyecto"], "PLANIFICADO")
+        self.assertEqual(project["campana"], "Norte")
+        self.assertEqual(index.counts("estado_proyecto"), {"EN_EJECUCION": 1, "PLANIFICADO": 1, "BLOQUEADO": 1})
+        self.assertEqual(index.count("estado_proyecto", "BLOQUEADO"), 1)
+        self.assertEqual(index.count("estado_proyecto", "COMPLETADO"), 0)
+
+        _, prev = index.upsert({"id": "M-555", "estado_proyecto": "PLANIFICADO", "campana": "Sur"})
+        self.assertIsNone(prev)
+        self.assertEqual(len(projects), 4)
+        self.assertEqual([p["id"] for p in index.where("campana", "Sur")], ["Z-789", "M-555"])
+
+    def test_in_place_mutation_is_refiled_on_upsert(self):
+        index = ProjectIndex(_projects())
+        project = index.get("X-123")
+        project["estado_proyecto"] = "COMPLETADO"
+        index.upsert(project)
+        self.assertEqual(index.where("estado_proyecto", "EN_EJECUCION"), [])
+        self.assertEqual(index.where("estado_proyecto", "COMPLETADO"), [project])
+
+
+if __name__ == "__main__":
+    unittest.main()
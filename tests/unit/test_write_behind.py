@@ -0,0 +1,61 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from services.write_behind import WriteBehindFile
+
+
+class TestWriteBehindFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "persistence.json")
+        self.data = {"projects": []}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_burst_is_coalesced_into_one_write(self):
+        store = WriteBehindFile(self.path, flush_interval=0.05, max_pending=1000)
+        for i in range(20):
+            self.data["projects"].append({"id": i})
+            store.mark_dirty(lambda: self.data)
+        self.assertFalse(os.path.exists(self.path))
+
+        deadline = time.monotonic() + 2.0
+        while not os.path.exists(self.path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        store.close()
+        self.assertEqual(len(self._read()["projects"]), 20)
+        self.assertEqual(store.metrics()["flushes"], 1)
+        self.assertEqual(store.metrics()["coalesced"], 19)
+
+    def test_size_threshold_flushes_synchronously(self):
+        store = WriteBehindFile(self.path, flush_interval=60, max_pending=3)
+        for i in range(3):
+            self.data["projects"].append({"id": i})
+            store.mark_dirty(lambda: self.data)
+        self.assertEqual(len(self._read()["projects"]), 3)
+        self.assertEqual(store.metrics()["pending"], 0)
+        store.close()
+
+    def test_load_and_close_flush_pending_changes(self):
+        store = WriteBehindFile(self.path, flush_interval=60, max_pending=1000)
+        self.data["projects"].append({"id": "X-123"})
+        store.mark_dirty(lambda: self.data)
+        self.assertEqual(store.load()["projects"], [{"id": "X-123"}])
+
+        self.data["projects"].append({"id": "A-321"})
+        store.mark_dirty(lambda: self.data)
+        store.close()
+        self.assertEqual(len(self._read()["projects"]), 2)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+
+if __name__ == "__main__":
+    unittest.main()